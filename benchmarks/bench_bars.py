@@ -0,0 +1,38 @@
+"""
+asv benchmarks of the bar functions, see cases.py. Run with ``asv run`` from the root of the repo, or without asv
+with ``python -m benchmarks.run``.
+"""
+
+# Imports
+from .cases import CASES, SIZES
+
+
+class Bars:
+    """
+    Time, peak memory and throughput of every case of cases.py at every size.
+    """
+
+    params = (list(CASES), SIZES)
+    param_names = ["case", "num_ticks"]
+    timeout = 1800
+
+    def setup(self, case, num_ticks):
+        make_data, self.function = CASES[case]
+        self.data = make_data(num_ticks)
+        # Compile the numba kernels outside of the timings
+        self.function(self.data.iloc[:10000])
+
+    def time_bars(self, case, num_ticks):
+        self.function(self.data)
+
+    def peakmem_bars(self, case, num_ticks):
+        self.function(self.data)
+
+    def track_ticks_per_second(self, case, num_ticks):
+        import time
+
+        start = time.perf_counter()
+        self.function(self.data)
+        return num_ticks / (time.perf_counter() - start)
+
+    track_ticks_per_second.unit = "ticks/s"
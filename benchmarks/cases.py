@@ -0,0 +1,98 @@
+"""
+The public functions benchmarked, each with the synthetic data it runs on.
+
+The standard bars are set for about a thousand ticks (or rows) per bar on the synthetic data, whatever its size.
+On a random walk without drift the expected number of ticks of the imbalance and run bars shrinks within a few
+bars to one or two ticks per bar, so those cases also measure the cost of writing the bars out.
+"""
+
+# Imports
+from mlfinlab.bars.agg_ohlcv import agg_ohlcv
+from mlfinlab.bars.dollar_imbalance_bars import compute_imbalance_bars
+from mlfinlab.bars.pct import pct
+from mlfinlab.datastructures import balance, imbalance, run
+from .synthetic import synthetic_ohlcv, synthetic_ticks
+
+SIZES = [10**5, 10**6, 10**7]
+
+# Ticks given to a bar builder per update()
+UPDATE_SIZE = 1000
+
+_IMBALANCE = dict(exp_num_ticks_init=1000, num_prev_bars=3, num_ticks_ewma_window=20)
+
+
+def _update_all(builder, ticks):
+    """
+    Streams the ticks through a bar builder, UPDATE_SIZE ticks at a time.
+
+    :param builder: BarBuilder, ImbalanceBarBuilder or RunBarBuilder.
+    :param ticks: DataFrame with 3 columns - date_time, price, and volume.
+    """
+    date_time = ticks.iloc[:, 0].to_numpy()
+    price = ticks.iloc[:, 1].to_numpy()
+    volume = ticks.iloc[:, 2].to_numpy()
+    for start in range(0, len(ticks), UPDATE_SIZE):
+        end = start + UPDATE_SIZE
+        builder.update(date_time[start:end], price[start:end], volume[start:end])
+    builder.flush()
+
+
+# Name: (generator of the input data, function run on it)
+CASES = {
+    "get_dollar_bars": (
+        synthetic_ticks,
+        lambda ticks: balance.get_dollar_bars(ticks, threshold=1.1e6),
+    ),
+    "get_volume_bars": (
+        synthetic_ticks,
+        lambda ticks: balance.get_volume_bars(ticks, threshold=1.1e4),
+    ),
+    "get_tick_bars": (
+        synthetic_ticks,
+        lambda ticks: balance.get_tick_bars(ticks, threshold=1000),
+    ),
+    "BarBuilder.update": (
+        synthetic_ticks,
+        lambda ticks: _update_all(balance.BarBuilder("cum_dollar_value", 1.1e6), ticks),
+    ),
+    "get_dollar_imbalance_bars": (
+        synthetic_ticks,
+        lambda ticks: imbalance.get_dollar_imbalance_bars(ticks, **_IMBALANCE),
+    ),
+    "get_volume_imbalance_bars": (
+        synthetic_ticks,
+        lambda ticks: imbalance.get_volume_imbalance_bars(ticks, **_IMBALANCE),
+    ),
+    "get_tick_imbalance_bars": (
+        synthetic_ticks,
+        lambda ticks: imbalance.get_tick_imbalance_bars(ticks, **_IMBALANCE),
+    ),
+    "ImbalanceBarBuilder.update": (
+        synthetic_ticks,
+        lambda ticks: _update_all(
+            imbalance.ImbalanceBarBuilder("dollar_imbalance", **_IMBALANCE), ticks
+        ),
+    ),
+    "get_dollar_run_bars": (
+        synthetic_ticks,
+        lambda ticks: run.get_dollar_run_bars(ticks, **_IMBALANCE),
+    ),
+    "get_volume_run_bars": (
+        synthetic_ticks,
+        lambda ticks: run.get_volume_run_bars(ticks, **_IMBALANCE),
+    ),
+    "get_tick_run_bars": (
+        synthetic_ticks,
+        lambda ticks: run.get_tick_run_bars(ticks, **_IMBALANCE),
+    ),
+    "RunBarBuilder.update": (
+        synthetic_ticks,
+        lambda ticks: _update_all(run.RunBarBuilder("dollar_run", **_IMBALANCE), ticks),
+    ),
+    "agg_ohlcv": (synthetic_ohlcv, lambda ohlcv: agg_ohlcv(ohlcv, interval=5)),
+    "pct": (synthetic_ohlcv, pct),
+    "compute_imbalance_bars": (
+        synthetic_ohlcv,
+        lambda ohlcv: compute_imbalance_bars(ohlcv, bucket_size=5e5),
+    ),
+}
@@ -0,0 +1,144 @@
+"""
+Runs the benchmarks of cases.py without asv, each case in a fresh process so its peak RSS is its own, and
+compares them with a previous run to catch performance regressions:
+
+    python -m benchmarks.run --output new.json --baseline old.json
+"""
+
+# Imports
+import argparse
+import json
+import multiprocessing
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from .cases import CASES, SIZES
+
+# Rows run once before the timings to compile the numba kernels
+WARMUP_SIZE = 10000
+
+
+def run_case(case, num_ticks, repeat=1, seed=0):
+    """
+    Times one case, in the calling process.
+
+    :param case: Name of the case in cases.CASES.
+    :param num_ticks: Number of ticks (or rows) of the synthetic data.
+    :param repeat: Number of timed runs, the fastest is kept.
+    :param seed: Seed of the synthetic data.
+    :return: Dict of the case, num_ticks, seconds, ticks_per_second, peak RSS of the process and its growth
+             while running the case, in MB.
+    """
+    make_data, function = CASES[case]
+    data = make_data(num_ticks, seed=seed)
+    function(data.iloc[:WARMUP_SIZE])
+
+    rss_before = _peak_rss_mb()
+    seconds = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(data)
+        seconds = min(seconds, time.perf_counter() - start)
+    peak_rss = _peak_rss_mb()
+    return {
+        "case": case,
+        "num_ticks": num_ticks,
+        "seconds": seconds,
+        "ticks_per_second": num_ticks / seconds,
+        "peak_rss_mb": peak_rss,
+        "rss_growth_mb": peak_rss - rss_before,
+    }
+
+
+def run_cases(cases=None, sizes=None, repeat=1, seed=0):
+    """
+    Times the cases, each in a new process.
+
+    :param cases: Names of the cases, None for all of them.
+    :param sizes: Numbers of ticks, None for cases.SIZES.
+    :param repeat: Number of timed runs of each case, the fastest is kept.
+    :param seed: Seed of the synthetic data.
+    :return: List of the results of run_case().
+    """
+    context = multiprocessing.get_context("spawn")
+    results = []
+    for num_ticks in SIZES if sizes is None else sizes:
+        for case in CASES if cases is None else cases:
+            with ProcessPoolExecutor(1, mp_context=context) as executor:
+                result = executor.submit(run_case, case, num_ticks, repeat, seed)
+                results.append(result.result())
+    return results
+
+
+def compare(results, baseline, tolerance=0.25):
+    """
+    :param results: Results of run_cases().
+    :param baseline: Results of a previous run_cases().
+    :param tolerance: Relative loss of throughput, or growth of peak RSS, allowed.
+    :return: List of messages, one per regression.
+    """
+    previous = {(b["case"], b["num_ticks"]): b for b in baseline}
+    regressions = []
+    for result in results:
+        before = previous.get((result["case"], result["num_ticks"]))
+        if before is None:
+            continue
+        name = "{} at {} ticks".format(result["case"], result["num_ticks"])
+        if result["ticks_per_second"] < before["ticks_per_second"] * (1 - tolerance):
+            regressions.append(
+                "{}: {:,.0f} ticks/s, was {:,.0f}".format(
+                    name, result["ticks_per_second"], before["ticks_per_second"]
+                )
+            )
+        if result["peak_rss_mb"] > before["peak_rss_mb"] * (1 + tolerance):
+            regressions.append(
+                "{}: peak RSS {:.0f} MB, was {:.0f} MB".format(
+                    name, result["peak_rss_mb"], before["peak_rss_mb"]
+                )
+            )
+    return regressions
+
+
+def _peak_rss_mb():
+    """
+    :return: Peak resident set size of the process in MB.
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, kilobytes elsewhere
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--cases", nargs="+", choices=list(CASES))
+    parser.add_argument("--sizes", nargs="+", type=lambda size: int(float(size)))
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="json file to write the results to")
+    parser.add_argument(
+        "--baseline", help="json file of a previous run to compare with"
+    )
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    results = run_cases(args.cases, args.sizes, args.repeat, args.seed)
+    for result in results:
+        print(
+            "{case:<28} {num_ticks:>10,} ticks {seconds:9.3f}s {ticks_per_second:>14,.0f} ticks/s "
+            "peak RSS {peak_rss_mb:8.1f} MB (+{rss_growth_mb:.1f})".format(**result)
+        )
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressions = compare(results, json.load(file), args.tolerance)
+        for regression in regressions:
+            print("REGRESSION", regression)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
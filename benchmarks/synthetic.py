@@ -0,0 +1,48 @@
+"""
+Seeded synthetic market data for the benchmarks.
+
+Prices are a random walk on a 0.01 tick grid and volumes are heavy tailed (Pareto), so the bars have the uneven
+sizes of real ticks. The same seed gives the same data on every machine.
+"""
+
+# Imports
+import numpy as np
+import pandas as pd
+
+
+def synthetic_ticks(num_ticks, seed=0):
+    """
+    :param num_ticks: Number of ticks.
+    :param seed: Seed of the random generator.
+    :return: DataFrame with 3 columns - date_time, price, and volume, one tick every 100ms.
+    """
+    rng = np.random.default_rng(seed)
+    steps = rng.choice([-0.01, 0.0, 0.01], size=num_ticks, p=[0.3, 0.4, 0.3])
+    price = np.round(100 + np.cumsum(steps), 2)
+    volume = np.round(rng.pareto(2.0, num_ticks) * 10 + 1, 0)
+    date_time = pd.date_range("2024-01-01", periods=num_ticks, freq="100ms", unit="ns")
+    return pd.DataFrame({"date_time": date_time, "price": price, "volume": volume})
+
+
+def synthetic_ohlcv(num_rows, seed=0):
+    """
+    :param num_rows: Number of rows.
+    :param seed: Seed of the random generator.
+    :return: DataFrame of 1 minute bars with columns Open, High, Low, Close, Volume and Number, indexed by time.
+    """
+    rng = np.random.default_rng(seed)
+    close = np.round(100 * np.exp(np.cumsum(rng.standard_normal(num_rows) * 1e-3)), 2)
+    open_price = np.concatenate([[close[0]], close[:-1]])
+    spread = np.round(np.abs(rng.standard_normal((2, num_rows))) * 0.05, 2)
+    number = rng.poisson(50, num_rows) + 1
+    return pd.DataFrame(
+        {
+            "Open": open_price,
+            "High": np.maximum(open_price, close) + spread[0],
+            "Low": np.minimum(open_price, close) - spread[1],
+            "Close": close,
+            "Volume": np.round(rng.pareto(2.0, num_rows) * 10 + 1, 0) * number,
+            "Number": number,
+        },
+        index=pd.date_range("2024-01-01", periods=num_rows, freq="1min", unit="ns"),
+    )
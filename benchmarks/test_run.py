@@ -0,0 +1,25 @@
+from benchmarks.cases import CASES
+from benchmarks.run import compare, run_case
+
+
+def test_every_case_runs():
+    for case in CASES:
+        result = run_case(case, 20000)
+        assert result["ticks_per_second"] > 0 and result["peak_rss_mb"] > 0
+
+
+def test_compare_flags_slower_and_larger_runs():
+    baseline = [
+        {
+            "case": "pct",
+            "num_ticks": 10,
+            "ticks_per_second": 100.0,
+            "peak_rss_mb": 100.0,
+        }
+    ]
+    assert compare(baseline, baseline) == []
+    slower = [dict(baseline[0], ticks_per_second=70.0)]
+    larger = [dict(baseline[0], peak_rss_mb=130.0)]
+    assert len(compare(slower, baseline)) == 1
+    assert len(compare(larger, baseline)) == 1
+    assert compare(slower, baseline, tolerance=0.5) == []
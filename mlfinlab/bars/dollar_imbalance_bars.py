@@ -1,63 +1,79 @@
 import numpy as np
 import pandas as pd
+from numba import njit
 
 
-def compute_imbalance_bars(ohlcv, bucket_size=1e7):
+@njit(nogil=True, cache=True)
+def _bucket_kernel(signed_volume, bucket_size):
     """
-    Compute imbalance bars based on OHLCV data and VPIN concept.
+    Finds the rows closing each bucket, i.e. where the running absolute signed volume since the last
+    bucket reaches ``bucket_size``.
 
-    :param ohlcv: DataFrame with columns ['Open', 'High', 'Low', 'Close', 'Volume']
-    :param bucket_size: Desired volume for each bucket (bar)
-    :return: Imbalance bars (OHLC format)
+    :param signed_volume: np.ndarray, float64. Volume signed by the direction of the close to close return
+    :param bucket_size: float64. Desired volume for each bucket (bar)
+    :return: Positions of the closing rows, volume, buy volume and sell volume of each bucket
     """
+    num_rows = signed_volume.shape[0]
+    ends = np.empty(num_rows, dtype=np.int64)
+    sums = np.empty((num_rows, 3), dtype=np.float64)
+    num_buckets = 0
+    running_volume, running_buy_volume, running_sell_volume = 0.0, 0.0, 0.0
+    for i in range(num_rows):
+        running_volume += abs(signed_volume[i])
+        if signed_volume[i] > 0:
+            running_buy_volume += signed_volume[i]
+        elif signed_volume[i] < 0:
+            running_sell_volume -= signed_volume[i]
 
-    ohlcv["Return"] = ohlcv["Close"].pct_change()
-    ohlcv.dropna(inplace=True)
+        if running_volume >= bucket_size:
+            ends[num_buckets] = i
+            sums[num_buckets, 0] = running_volume
+            sums[num_buckets, 1] = running_buy_volume
+            sums[num_buckets, 2] = running_sell_volume
+            num_buckets += 1
 
-    ohlcv["SignedVolume"] = np.where(
-        ohlcv["Return"] > 0,
-        ohlcv["Volume"],
-        np.where(ohlcv["Return"] < 0, -ohlcv["Volume"], 0),
-    )
+            # Reset counters
+            running_volume, running_buy_volume, running_sell_volume = 0.0, 0.0, 0.0
 
-    bars = []
-    running_volume = 0
-    running_buy_volume = 0
-    running_sell_volume = 0
-    open_price = ohlcv.iloc[0]["Open"]
+    return ends[:num_buckets], sums[:num_buckets]
 
-    index = []
 
-    for idx, row in ohlcv.iterrows():
-        running_volume += abs(row["SignedVolume"])
-        running_buy_volume += row["SignedVolume"] if row["SignedVolume"] > 0 else 0
-        running_sell_volume -= row["SignedVolume"] if row["SignedVolume"] < 0 else 0
+def compute_imbalance_bars(ohlcv, bucket_size=1e7):
+    """
+    Compute imbalance bars based on OHLCV data and VPIN concept.
 
-        if running_volume >= bucket_size:
-            close_price = row["Close"]
-            high_price = max(ohlcv.loc[idx:idx]["High"])
-            low_price = min(ohlcv.loc[idx:idx]["Low"])
-            number_bars = sum(ohlcv.loc[idx:idx]["Number"])
-
-            bars.append(
-                {
-                    "Open": open_price,
-                    "High": high_price,
-                    "Low": low_price,
-                    "Close": close_price,
-                    "Volume": running_volume,
-                    "BuyVolume": np.log1p(running_buy_volume),
-                    "SellVolume": np.log1p(running_sell_volume),
-                    "Number": number_bars,
-                }
-            )
-
-            index.append(idx)
+    The bucket boundaries are found in a single compiled pass over the signed volume and High, Low and
+    Number are aggregated over every row of the bucket. ``ohlcv`` is left untouched.
 
-            # Reset counters
-            running_volume = 0
-            running_buy_volume = 0
-            running_sell_volume = 0
-            open_price = close_price
+    :param ohlcv: DataFrame with columns ['Open', 'High', 'Low', 'Close', 'Volume', 'Number']
+    :param bucket_size: Desired volume for each bucket (bar)
+    :return: Imbalance bars (OHLC format)
+    """
+    returns = ohlcv["Close"].pct_change()
+    valid = (ohlcv.notna().all(axis=1) & returns.notna()).to_numpy()
+    data = ohlcv[valid]
+    returns = returns.to_numpy()[valid]
 
-    return pd.DataFrame(bars, index=index)
+    volume = data["Volume"].to_numpy(dtype=np.float64)
+    signed_volume = np.where(returns > 0, volume, np.where(returns < 0, -volume, 0))
+
+    ends, sums = _bucket_kernel(signed_volume, np.float64(bucket_size))
+    starts = np.concatenate([[0], ends + 1])[: len(ends)]
+    last = ends[-1] + 1 if len(ends) else 0
+
+    close = data["Close"].to_numpy()
+    open_price = np.concatenate([data["Open"].to_numpy()[:1], close[ends[:-1]]])
+
+    return pd.DataFrame(
+        {
+            "Open": open_price[: len(ends)],
+            "High": np.maximum.reduceat(data["High"].to_numpy()[:last], starts),
+            "Low": np.minimum.reduceat(data["Low"].to_numpy()[:last], starts),
+            "Close": close[ends],
+            "Volume": sums[:, 0],
+            "BuyVolume": np.log1p(sums[:, 1]),
+            "SellVolume": np.log1p(sums[:, 2]),
+            "Number": np.add.reduceat(data["Number"].to_numpy()[:last], starts),
+        },
+        index=data.index[ends],
+    )
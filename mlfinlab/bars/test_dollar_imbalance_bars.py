@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+from mlfinlab.bars.dollar_imbalance_bars import compute_imbalance_bars
+
+
+def _ohlcv(n=2000, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.standard_normal(n) * 0.1)
+    return pd.DataFrame(
+        {
+            "Open": close + rng.standard_normal(n) * 0.05,
+            "High": close + np.abs(rng.standard_normal(n)),
+            "Low": close - np.abs(rng.standard_normal(n)),
+            "Close": close,
+            "Volume": rng.integers(0, 1000, n).astype(float),
+            "Number": rng.integers(1, 50, n),
+        },
+        index=pd.date_range("2024-01-01", periods=n, freq="min"),
+    )
+
+
+def test_input_is_not_modified():
+    ohlcv = _ohlcv()
+    expected = ohlcv.copy()
+    compute_imbalance_bars(ohlcv, bucket_size=20000)
+    pd.testing.assert_frame_equal(ohlcv, expected)
+
+
+def test_buckets_aggregate_every_row():
+    ohlcv = _ohlcv()
+    bars = compute_imbalance_bars(ohlcv, bucket_size=20000)
+    assert len(bars) > 10
+    start = ohlcv.index[1]
+    for end, bar in bars.iterrows():
+        bucket = ohlcv.loc[start:end]
+        assert bar["High"] == bucket["High"].max()
+        assert bar["Low"] == bucket["Low"].min()
+        assert bar["Number"] == bucket["Number"].sum()
+        assert bar["Close"] == bucket["Close"].iloc[-1]
+        assert bar["Volume"] >= 20000
+        start = end + pd.Timedelta(minutes=1)
+    assert (bars["Open"].iloc[1:].values == bars["Close"].iloc[:-1].values).all()
@@ -15,85 +15,186 @@ Many of the projects going forward will require Dollar and Volume bars.
 """
 
 # Imports
-from collections import namedtuple
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 import pandas as pd
 import numpy as np
+from numba import njit
+from .columns import _BAR_COLUMNS, BarColumns, _check_output
+from .progress import _ProgressMeter
+from .tick_store import TickStore
+
+# Metric codes understood by the compiled bar kernel
+_METRICS = {"cum_ticks": 0, "cum_dollar_value": 1, "cum_volume": 2}
+
+# Positions of the bar in progress in the counters array, shared by the imbalance and run bar kernels
+_OPEN, _HIGH, _LOW, _CUM_VOLUME, _CUM_DOLLAR, _CUM_TICKS = range(6)
+
+# Fewest ticks per chunk of the parallel bar kernel, smaller batches are run by a single thread
+_MIN_CHUNK = 65536
+
+
+@dataclass
+class BarState:
+    """
+    Carry-over state of the bar in progress, passed from one batch to the next.
+
+    Its size does not depend on how many ticks the open bar spans and it can be pickled, so a run can be resumed
+    in another batch or process. A NaN open_price means no tick has been seen yet.
+    """
+
+    open_price: float = np.nan
+    high_price: float = -np.inf
+    low_price: float = np.inf
+    cum_volume: float = 0.0
+    cum_dollar_value: float = 0.0
+    cum_ticks: int = 0
+    date_time: object = None
+    close_price: float = np.nan
+
+    @property
+    def nbytes(self):
+        """
+        :return: Bytes taken by the counters of the state.
+        """
+        return self.to_counters().nbytes
+
+    def to_counters(self):
+        """
+        :return: np.ndarray, float64. The counters in the layout used by the compiled bar kernel.
+        """
+        return np.array(
+            [
+                self.open_price,
+                self.high_price,
+                self.low_price,
+                self.cum_volume,
+                self.cum_dollar_value,
+                self.cum_ticks,
+            ],
+            dtype=np.float64,
+        )
+
+    @classmethod
+    def from_counters(cls, counters, date_time=None, close_price=np.nan):
+        """
+        :param counters: np.ndarray, float64. Counters updated by the compiled bar kernel.
+        :param date_time: Timestamp of the last tick seen.
+        :param close_price: Price of the last tick seen.
+        :return: BarState
+        """
+        return cls(
+            open_price=float(counters[0]),
+            high_price=float(counters[1]),
+            low_price=float(counters[2]),
+            cum_volume=float(counters[3]),
+            cum_dollar_value=float(counters[4]),
+            cum_ticks=int(counters[5]),
+            date_time=date_time,
+            close_price=float(close_price),
+        )
 
 
 def _update_counters(cache, flag):
     """
     Updates the counters by resetting them or making use of the cache to update them based on a previous batch.
 
-    :param cache: Contains information from the previous batch that is relevant in this batch.
+    :param cache: BarState from the previous batch.
     :param flag: A flag which signals to use the cache.
-    :return: Updated counters - cum_ticks, cum_dollar_value, cum_volume, high_price, low_price
+    :return: Updated counters - open_price, high_price, low_price, cum_volume, cum_dollar_value, cum_ticks
     """
     # Check flag
-    if flag and cache:
+    if flag and cache is not None:
         # Update variables based on cache
-        cum_ticks = int(cache[-1].cum_ticks)
-        cum_dollar_value = np.float64(cache[-1].cum_dollar_value)
-        cum_volume = cache[-1].cum_volume
-        low_price = np.float64(cache[-1].low)
-        high_price = np.float64(cache[-1].high)
-    else:
-        # Reset counters
-        cum_ticks, cum_dollar_value, cum_volume, high_price, low_price = (
-            0,
-            0,
-            0,
-            -np.inf,
-            np.inf,
-        )
+        return cache.to_counters()
 
-    return cum_ticks, cum_dollar_value, cum_volume, high_price, low_price
+    # Reset counters, the open price is taken from the first tick
+    return BarState().to_counters()
 
 
-def _extract_bars(data, metric, threshold=50000, cache=None, flag=False):
+@njit(nogil=True, cache=True)
+def _bar_buffers(capacity):
     """
-    For loop which compiles the various bars: dollar, volume, or tick.
-
-    We did investigate the use of trying to solve this in a vectorised manner but found that a For loop worked well.
-
-    :param data: Contains 3 columns - date_time, price, and volume.
-    :param metric: cum_ticks, cum_dollar_value, cum_volume
-    :param threshold: A cumulative value above this threshold triggers a sample to be taken.
-    :param cache: contains information from the previous batch that is relevant in this batch.
-    :param flag: A flag which signals to use the cache.
-    :return: The financial data structure with the cache of short term history.
-    """
-
-    cache_tup = namedtuple(
-        "CacheData",
-        [
-            "date_time",
-            "price",
-            "high",
-            "low",
-            "cum_volume",
-            "cum_dollar_value",
-            "cum_ticks",
-        ],
+    :param capacity: int64. Number of bars the buffers can hold.
+    :return: Empty output buffers of the bar kernels: positions of the closing ticks, float64 columns
+             (open, high, low, close, cum_vol, cum_dollar) and int64 column cum_ticks.
+    """
+    return (
+        np.empty(capacity, dtype=np.int64),
+        np.empty((capacity, 6), dtype=np.float64),
+        np.empty(capacity, dtype=np.int64),
     )
-    if cache is None:
-        cache = []
 
-    list_bars = []
-    cum_ticks, cum_dollar_value, cum_volume, high_price, low_price = _update_counters(
-        cache, flag
-    )
 
-    # Iterate over rows
-    for row in data.values:
-        # Set variables
-        date_time = row[0]
-        price = np.float64(row[1])
-        volume = row[2]
+@njit(nogil=True, cache=True)
+def _grow_bars(end_idx, values, ticks, num_bars):
+    """
+    :param end_idx: np.ndarray, int64. Positions of the closing ticks.
+    :param values: np.ndarray, float64. Columns open, high, low, close, cum_vol and cum_dollar of the bars.
+    :param ticks: np.ndarray, int64. Column cum_ticks of the bars.
+    :param num_bars: int64. Number of bars in the buffers.
+    :return: Buffers of twice the capacity holding the same bars.
+    """
+    end_idx_new, values_new, ticks_new = _bar_buffers(2 * end_idx.shape[0])
+    end_idx_new[:num_bars] = end_idx[:num_bars]
+    values_new[:num_bars] = values[:num_bars]
+    ticks_new[:num_bars] = ticks[:num_bars]
+    return end_idx_new, values_new, ticks_new
+
+
+@njit(nogil=True, cache=True)
+def _bar_loop(
+    prices,
+    volumes,
+    first,
+    last,
+    metric,
+    threshold,
+    counters,
+    end_idx,
+    values,
+    ticks,
+    num_bars,
+):
+    """
+    Runs the ticks from ``first`` up to ``last`` into the bar in progress, writing the bars closed into the
+    output buffers until they are full.
+
+    The buffers are not reallocated here: arrays reassigned inside the loop keep numba from holding the
+    counters in registers, which made the loop an order of magnitude slower.
+
+    :param prices: np.ndarray, float64. Price of each tick.
+    :param volumes: np.ndarray, float64. Volume of each tick.
+    :param first: int64. Position of the first tick to run.
+    :param last: int64. Position after the last tick to run.
+    :param metric: int64. 0 - cum_ticks, 1 - cum_dollar_value, 2 - cum_volume
+    :param threshold: float64. A cumulative value above this threshold triggers a sample to be taken.
+    :param counters: np.ndarray, float64. Counters of the bar in progress, updated in place:
+                     open_price, high_price, low_price, cum_volume, cum_dollar_value, cum_ticks
+    :param end_idx: np.ndarray, int64. Positions of the closing ticks.
+    :param values: np.ndarray, float64. Columns open, high, low, close, cum_vol and cum_dollar of the bars.
+    :param ticks: np.ndarray, int64. Column cum_ticks of the bars.
+    :param num_bars: int64. Number of bars already in the buffers.
+    :return: Position of the next tick to run and number of bars in the buffers.
+    """
+    open_price = counters[_OPEN]
+    high_price = counters[_HIGH]
+    low_price = counters[_LOW]
+    cum_volume = counters[_CUM_VOLUME]
+    cum_dollar_value = counters[_CUM_DOLLAR]
+    cum_ticks = np.int64(counters[_CUM_TICKS])
+
+    i = first
+    while i < last and num_bars < end_idx.shape[0]:
+        price = prices[i]
+        volume = volumes[i]
+        if np.isnan(open_price):
+            open_price = price
 
         # Calculations
         cum_ticks += 1
-        dollar_value = price * volume
-        cum_dollar_value = cum_dollar_value + dollar_value
+        cum_dollar_value = cum_dollar_value + price * volume
         cum_volume = cum_volume + volume
 
         # Check min max
@@ -102,59 +203,531 @@ def _extract_bars(data, metric, threshold=50000, cache=None, flag=False):
         if price <= low_price:
             low_price = price
 
-        # Update cache
-        cache_data = cache_tup(
+        if metric == 0:
+            value = np.float64(cum_ticks)
+        elif metric == 1:
+            value = cum_dollar_value
+        else:
+            value = cum_volume
+
+        # If threshold reached then take a sample
+        if value >= threshold:
+            end_idx[num_bars] = i
+            values[num_bars, 0] = open_price
+            values[num_bars, 1] = high_price
+            values[num_bars, 2] = min(low_price, open_price)
+            values[num_bars, 3] = price
+            values[num_bars, 4] = cum_volume
+            values[num_bars, 5] = cum_dollar_value
+            ticks[num_bars] = cum_ticks
+            num_bars += 1
+
+            # Reset counters, the close of this bar is the open of the next one
+            open_price = price
+            high_price, low_price = -np.inf, np.inf
+            cum_volume, cum_dollar_value, cum_ticks = 0.0, 0.0, 0
+        i += 1
+
+    counters[_OPEN] = open_price
+    counters[_HIGH] = high_price
+    counters[_LOW] = low_price
+    counters[_CUM_VOLUME] = cum_volume
+    counters[_CUM_DOLLAR] = cum_dollar_value
+    counters[_CUM_TICKS] = cum_ticks
+    return i, num_bars
+
+
+@njit(nogil=True, cache=True)
+def _bar_kernel(prices, volumes, metric, threshold, counters):
+    """
+    Compiled loop which compiles the various bars: dollar, volume, or tick.
+
+    The open price of a bar is the close price of the previous bar and the bar columns are written into
+    buffers which grow as bars are closed, so the cost is a single pass over the ticks.
+
+    :param prices: np.ndarray, float64. Price of each tick.
+    :param volumes: np.ndarray, float64. Volume of each tick.
+    :param metric: int64. 0 - cum_ticks, 1 - cum_dollar_value, 2 - cum_volume
+    :param threshold: float64. A cumulative value above this threshold triggers a sample to be taken.
+    :param counters: np.ndarray, float64. Counters of the bar in progress, updated in place:
+                     open_price, high_price, low_price, cum_volume, cum_dollar_value, cum_ticks
+    :return: Positions of the closing ticks, float64 columns (open, high, low, close, cum_vol, cum_dollar)
+             and int64 column cum_ticks.
+    """
+    end_idx, values, ticks = _bar_buffers(64)
+    num_bars = 0
+
+    i = 0
+    while True:
+        i, num_bars = _bar_loop(
+            prices,
+            volumes,
+            i,
+            prices.shape[0],
+            metric,
+            threshold,
+            counters,
+            end_idx,
+            values,
+            ticks,
+            num_bars,
+        )
+        if i == prices.shape[0]:
+            break
+
+        # The buffers are full
+        end_idx, values, ticks = _grow_bars(end_idx, values, ticks, num_bars)
+
+    return end_idx[:num_bars], values[:num_bars], ticks[:num_bars]
+
+
+@njit(nogil=True, cache=True)
+def _multi_bar_kernel(prices, volumes, metric, thresholds, counters):
+    """
+    Compiled loop which compiles the bars of several thresholds in a single pass over the ticks.
+
+    Each threshold has its own counters, updated by _bar_loop() as for a single threshold, so its bars are
+    identical to those of a separate run. The ticks are read from memory once: they are run in blocks small
+    enough to stay in cache, each threshold running over the block in turn.
+
+    :param prices: np.ndarray, float64. Price of each tick.
+    :param volumes: np.ndarray, float64. Volume of each tick.
+    :param metric: int64. 0 - cum_ticks, 1 - cum_dollar_value, 2 - cum_volume
+    :param thresholds: np.ndarray, float64. A cumulative value above a threshold triggers a sample to be taken.
+    :param counters: np.ndarray, float64. Counters of the bar in progress of each threshold, one row per
+                     threshold, updated in place.
+    :return: Positions of the closing ticks, positions of the thresholds, float64 columns
+             (open, high, low, close, cum_vol, cum_dollar) and int64 column cum_ticks. The bars of each
+             threshold are in order, those of different thresholds are not.
+    """
+    block_size = 4096
+    capacity = 64
+    end_idx = np.empty(capacity, dtype=np.int64)
+    bar_threshold = np.empty(capacity, dtype=np.int64)
+    values = np.empty((capacity, 6), dtype=np.float64)
+    ticks = np.empty(capacity, dtype=np.int64)
+    num_bars = 0
+
+    for block_start in range(0, prices.shape[0], block_size):
+        block_end = min(block_start + block_size, prices.shape[0])
+        for k in range(thresholds.shape[0]):
+            i = block_start
+            while True:
+                first_bar = num_bars
+                i, num_bars = _bar_loop(
+                    prices,
+                    volumes,
+                    i,
+                    block_end,
+                    metric,
+                    thresholds[k],
+                    counters[k],
+                    end_idx,
+                    values,
+                    ticks,
+                    num_bars,
+                )
+                bar_threshold[first_bar:num_bars] = k
+                if i == block_end:
+                    break
+
+                # The buffers are full
+                capacity *= 2
+                end_idx_new = np.empty(capacity, dtype=np.int64)
+                bar_threshold_new = np.empty(capacity, dtype=np.int64)
+                values_new = np.empty((capacity, 6), dtype=np.float64)
+                ticks_new = np.empty(capacity, dtype=np.int64)
+                end_idx_new[:num_bars] = end_idx[:num_bars]
+                bar_threshold_new[:num_bars] = bar_threshold[:num_bars]
+                values_new[:num_bars] = values[:num_bars]
+                ticks_new[:num_bars] = ticks[:num_bars]
+                end_idx, bar_threshold = end_idx_new, bar_threshold_new
+                values, ticks = values_new, ticks_new
+
+    return (
+        end_idx[:num_bars],
+        bar_threshold[:num_bars],
+        values[:num_bars],
+        ticks[:num_bars],
+    )
+
+
+@njit(nogil=True, cache=True)
+def _stitch_bars(
+    prices, volumes, first, last, metric, threshold, counters, chunk_end_idx
+):
+    """
+    Runs the ticks of a chunk from the true bar in progress, one bar at a time, until a bar closes on a closing
+    tick of the speculative run of the chunk.
+
+    Past such a tick both runs start a bar from the same tick with reset counters, so the remaining bars of the
+    speculative run are the true ones, bit for bit.
+
+    :param prices: np.ndarray, float64. Price of each tick.
+    :param volumes: np.ndarray, float64. Volume of each tick.
+    :param first: int64. Position of the first tick of the chunk.
+    :param last: int64. Position after the last tick of the chunk.
+    :param metric: int64. 0 - cum_ticks, 1 - cum_dollar_value, 2 - cum_volume
+    :param threshold: float64. A cumulative value above this threshold triggers a sample to be taken.
+    :param counters: np.ndarray, float64. Counters of the bar in progress at the start of the chunk, updated in
+                     place.
+    :param chunk_end_idx: np.ndarray, int64. Positions of the closing ticks of the speculative run, in order.
+    :return: Positions of the closing ticks, float64 columns (open, high, low, close, cum_vol, cum_dollar),
+             int64 column cum_ticks and whether the runs met before the end of the chunk.
+    """
+    end_idx, values, ticks = _bar_buffers(16)
+    num_bars = 0
+
+    i = first
+    k = 0
+    while i < last:
+        if num_bars == end_idx.shape[0]:
+            end_idx, values, ticks = _grow_bars(end_idx, values, ticks, num_bars)
+
+        # Buffers with room for one more bar stop the loop at the next closing tick
+        i, num_bars = _bar_loop(
+            prices,
+            volumes,
+            i,
+            last,
+            metric,
+            threshold,
+            counters,
+            end_idx[: num_bars + 1],
+            values[: num_bars + 1],
+            ticks[: num_bars + 1],
+            num_bars,
+        )
+        if num_bars > 0 and end_idx[num_bars - 1] == i - 1:
+            while k < chunk_end_idx.shape[0] and chunk_end_idx[k] < i - 1:
+                k += 1
+            if k < chunk_end_idx.shape[0] and chunk_end_idx[k] == i - 1:
+                return end_idx[:num_bars], values[:num_bars], ticks[:num_bars], True
+
+    return end_idx[:num_bars], values[:num_bars], ticks[:num_bars], False
+
+
+def _parallel_bar_kernel(prices, volumes, metric, threshold, counters, n_jobs):
+    """
+    Parallel version of _bar_kernel(), with the same output bit for bit.
+
+    The ticks are cut into one chunk per thread and the bars of every chunk are built at once by _bar_kernel(),
+    which releases the GIL, as if a bar opened on the first tick of the chunk. The true bar in progress at the
+    start of a chunk is then carried over from the previous chunk by _stitch_bars(), which reruns the ticks only
+    until the two runs close a bar on the same tick, usually within a few bars. Sums restarted at every bar can
+    not be derived from global prefix sums without changing their rounding, this keeps the sums of the
+    sequential run. Tick bars close every ceil(threshold) ticks, so their chunks start from the true tick count
+    and meet on the first bar.
+
+    :param prices: np.ndarray, float64. Price of each tick.
+    :param volumes: np.ndarray, float64. Volume of each tick.
+    :param metric: int64. 0 - cum_ticks, 1 - cum_dollar_value, 2 - cum_volume
+    :param threshold: float64. A cumulative value above this threshold triggers a sample to be taken.
+    :param counters: np.ndarray, float64. Counters of the bar in progress, updated in place.
+    :param n_jobs: Number of threads.
+    :return: Positions of the closing ticks, float64 columns (open, high, low, close, cum_vol, cum_dollar)
+             and int64 column cum_ticks.
+    """
+    num_ticks = prices.shape[0]
+    bounds = np.linspace(0, num_ticks, min(n_jobs, num_ticks // _MIN_CHUNK) + 1)
+    bounds = bounds.astype(np.int64)
+    if len(bounds) <= 2:
+        return _bar_kernel(prices, volumes, metric, threshold, counters)
+
+    ticks_per_bar = max(int(np.ceil(threshold)), 1)
+    chunk_counters = [counters.copy()]
+    for first in bounds[1:-1]:
+        chunk = BarState().to_counters()
+        if metric == _METRICS["cum_ticks"]:
+            chunk[_CUM_TICKS] = (counters[_CUM_TICKS] + first) % ticks_per_bar
+        chunk_counters.append(chunk)
+
+    def run_chunk(k):
+        first, last = bounds[k], bounds[k + 1]
+        end_idx, values, ticks = _bar_kernel(
+            prices[first:last],
+            volumes[first:last],
+            metric,
+            threshold,
+            chunk_counters[k],
+        )
+        return end_idx + first, values, ticks
+
+    with ThreadPoolExecutor(len(bounds) - 1) as executor:
+        chunks = list(executor.map(run_chunk, range(len(bounds) - 1)))
+
+    # Carry the bar in progress over the chunks
+    parts = [chunks[0]]
+    carried = chunk_counters[0]
+    for k in range(1, len(chunks)):
+        end_idx, values, ticks = chunks[k]
+        stitched = _stitch_bars(
+            prices,
+            volumes,
+            bounds[k],
+            bounds[k + 1],
+            metric,
+            threshold,
+            carried,
+            end_idx,
+        )
+        parts.append(stitched[:3])
+        if stitched[3]:
+            rest = end_idx > stitched[0][-1]
+            parts.append((end_idx[rest], values[rest], ticks[rest]))
+            carried = chunk_counters[k]
+
+    counters[:] = carried
+    return tuple(np.concatenate(columns) for columns in zip(*parts))
+
+
+def _extract_bars(data, metric, threshold=50000, cache=None, flag=False, n_jobs=1):
+    """
+    Runs the compiled bar kernel over one batch of ticks: dollar, volume, or tick bars.
+
+    :param data: Contains 3 columns - date_time, price, and volume.
+    :param metric: cum_ticks, cum_dollar_value, cum_volume
+    :param threshold: A cumulative value above this threshold triggers a sample to be taken.
+    :param cache: BarState of the bar in progress at the end of the previous batch.
+    :param flag: A flag which signals to use the cache.
+    :param n_jobs: Number of threads building the bars of the batch.
+    :return: The financial data structure with the BarState of the bar in progress.
+    """
+    *bars, cache = _extract_columns(data, metric, threshold, cache, flag, n_jobs)
+    columns = BarColumns(len(bars[2]))
+    columns.append(*bars)
+    return columns.frame(), cache
+
+
+def _extract_columns(data, metric, threshold=50000, cache=None, flag=False, n_jobs=1):
+    """
+    Runs the compiled bar kernel over one batch of ticks, see _extract_bars().
+
+    The price and volume columns are handed to the kernel as float64 arrays, the date_time of each bar is taken
+    from the closing tick so any date_time dtype is preserved.
+
+    :return: date_time, float64 columns (open, high, low, close, cum_vol, cum_dollar) and int64 column
+             cum_ticks of the bars, with the BarState of the bar in progress.
+    """
+    counters = _update_counters(cache, flag)
+    prices = data.iloc[:, 1].to_numpy(dtype=np.float64)
+    volumes = data.iloc[:, 2].to_numpy(dtype=np.float64)
+    if n_jobs == 1:
+        end_idx, values, ticks = _bar_kernel(
+            prices, volumes, _METRICS[metric], np.float64(threshold), counters
+        )
+    else:
+        end_idx, values, ticks = _parallel_bar_kernel(
+            prices,
+            volumes,
+            _METRICS[metric],
+            np.float64(threshold),
+            counters,
+            os.cpu_count() if n_jobs is None else n_jobs,
+        )
+
+    date_time = data.iloc[:, 0].array.take(end_idx)
+    if len(data):
+        return (
             date_time,
-            price,
-            high_price,
-            low_price,
-            cum_volume,
-            cum_dollar_value,
-            cum_ticks,
+            values,
+            ticks,
+            BarState.from_counters(counters, data.iloc[-1, 0], data.iloc[-1, 1]),
         )
-        cache.append(cache_data)
+    return (
+        date_time,
+        values,
+        ticks,
+        BarState.from_counters(
+            counters,
+            getattr(cache, "date_time", None),
+            getattr(cache, "close_price", np.nan),
+        ),
+    )
 
-        # If threshold reached then take a sample
-        if eval(metric) >= threshold:  # pylint: disable=eval-used
-            # Create bars
-            open_price = cache[0].price
-            low_price = min(low_price, open_price)
-            close_price = price
-
-            # Update bars & Reset counters
-            list_bars.append(
+
+def _check_thresholds(thresholds):
+    """
+    :param thresholds: List of thresholds, the bars of each are keyed by its value.
+    :raises ValueError: if a threshold is given more than once.
+    """
+    if len(set(thresholds)) != len(thresholds):
+        raise ValueError(
+            "thresholds must not repeat a value, got {!r}".format(list(thresholds))
+        )
+
+
+def _extract_multi_columns(data, metric, thresholds, cache=None, flag=False):
+    """
+    Runs the compiled multi threshold bar kernel over one batch of ticks: dollar, volume, or tick bars.
+
+    :param data: Contains 3 columns - date_time, price, and volume.
+    :param metric: cum_ticks, cum_dollar_value, cum_volume
+    :param thresholds: List of thresholds, a cumulative value above a threshold triggers a sample to be taken.
+    :param cache: List of the BarState of the bar in progress of each threshold at the end of the previous batch.
+    :param flag: A flag which signals to use the cache.
+    :return: Dict of the date_time, float64 columns (open, high, low, close, cum_vol, cum_dollar) and int64
+             column cum_ticks of the bars of each threshold, with the list of BarState of the bars in progress.
+    """
+    if not (flag and cache is not None):
+        cache = [None] * len(thresholds)
+    counters = np.array([_update_counters(state, flag) for state in cache])
+    end_idx, bar_threshold, values, ticks = _multi_bar_kernel(
+        data.iloc[:, 1].to_numpy(dtype=np.float64),
+        data.iloc[:, 2].to_numpy(dtype=np.float64),
+        _METRICS[metric],
+        np.asarray(thresholds, dtype=np.float64),
+        counters,
+    )
+
+    # Group the bars by threshold, keeping their order
+    order = np.argsort(bar_threshold, kind="stable")
+    bounds = np.searchsorted(bar_threshold[order], np.arange(len(thresholds) + 1))
+    date_time = data.iloc[:, 0].array.take(end_idx[order])
+    values, ticks = values[order], ticks[order]
+    list_bars = {}
+    for k, threshold in enumerate(thresholds):
+        rows = slice(bounds[k], bounds[k + 1])
+        list_bars[threshold] = date_time[rows], values[rows], ticks[rows]
+    if len(data):
+        last_date_time, close_price = data.iloc[-1, 0], data.iloc[-1, 1]
+    else:
+        last_date_time = getattr(cache[0], "date_time", None)
+        close_price = getattr(cache[0], "close_price", np.nan)
+    return list_bars, [
+        BarState.from_counters(row, last_date_time, close_price) for row in counters
+    ]
+
+
+class BarBuilder:
+    """
+    Builds dollar, volume or tick bars from a live feed, one micro-batch of ticks at a time.
+
+    The state of the bar in progress is kept between calls to update(), so each call only runs the compiled
+    kernel over the new ticks and returns the bars they complete. snapshot() and restore() save and resume the
+    bar in progress; a state returned by the batch functions can be restored too, to go live after a backfill.
+
+    Bars are returned as a numpy structured array with the columns of the bar DataFrames, pass it to
+    pd.DataFrame() to get one. Building a DataFrame on every call would cost far more than the kernel itself.
+    """
+
+    def __init__(self, metric="cum_dollar_value", threshold=70000000):
+        """
+        :param metric: cum_ticks, cum_dollar_value, cum_volume
+        :param threshold: A cumulative value above this threshold triggers a sample to be taken.
+        """
+        self.metric = metric
+        self.threshold = threshold
+        self._dtypes = {}
+        self.restore(BarState())
+
+    def update(self, timestamps, prices, volumes):
+        """
+        Pushes a micro-batch of ticks.
+
+        :param timestamps: Timestamp of each tick, a scalar or array-like.
+        :param prices: Price of each tick, a scalar or array-like.
+        :param volumes: Volume of each tick, a scalar or array-like.
+        :return: np.ndarray, structured. The bars completed by these ticks, possibly none.
+        """
+        timestamps = np.atleast_1d(np.asarray(timestamps))
+        prices = np.atleast_1d(np.asarray(prices, dtype=np.float64))
+        volumes = np.atleast_1d(np.asarray(volumes, dtype=np.float64))
+        end_idx, values, ticks = self._run(prices, volumes)
+        if len(prices):
+            self._date_time = timestamps[-1]
+            self._close_price = prices[-1]
+        return self._records(timestamps[end_idx], values, ticks)
+
+    def flush(self):
+        """
+        Closes the bar in progress, e.g. at the end of a session, whatever its size. The next bar opens at its
+        close price.
+
+        :return: np.ndarray, structured. The bar in progress, or no bar if no tick was pushed since the last one.
+        """
+        counters = self._counters
+        timestamps = np.array([self._date_time])
+        if counters[_CUM_TICKS] == 0:
+            return self._records(
+                timestamps[:0], np.empty((0, 6)), np.empty(0, np.int64)
+            )
+        values = np.array(
+            [
                 [
-                    date_time,
-                    open_price,
-                    high_price,
-                    low_price,
-                    close_price,
-                    cum_volume,
-                    cum_dollar_value,
-                    cum_ticks,
+                    counters[_OPEN],
+                    counters[_HIGH],
+                    min(counters[_LOW], counters[_OPEN]),
+                    self._close_price,
+                    counters[_CUM_VOLUME],
+                    counters[_CUM_DOLLAR],
                 ]
-            )
-            cum_ticks, cum_dollar_value, cum_volume, cache, high_price, low_price = (
-                0,
-                0,
-                0,
-                [],
-                -np.inf,
-                np.inf,
-            )
+            ]
+        )
+        ticks = np.array([counters[_CUM_TICKS]], dtype=np.int64)
+        self._reset_bar()
+        return self._records(timestamps, values, ticks)
+
+    def snapshot(self):
+        """
+        :return: BarState. A copy of the state of the bar in progress, which can be pickled.
+        """
+        return BarState.from_counters(
+            self._counters.copy(), self._date_time, self._close_price
+        )
 
-        # Update cache after bar generation
-        cache_data = cache_tup(
-            date_time,
-            price,
-            high_price,
-            low_price,
-            cum_volume,
-            cum_dollar_value,
-            cum_ticks,
+    def restore(self, state):
+        """
+        Resumes from a state returned by snapshot() or by the batch functions.
+
+        :param state: BarState
+        """
+        self._counters = state.to_counters()
+        self._date_time = state.date_time
+        self._close_price = state.close_price
+
+    def _run(self, prices, volumes):
+        """
+        Runs the compiled kernel over the new ticks, updating the state in place.
+
+        :param prices: np.ndarray, float64. Price of each tick.
+        :param volumes: np.ndarray, float64. Volume of each tick.
+        :return: Positions of the closing ticks, float64 columns and int64 column cum_ticks.
+        """
+        return _bar_kernel(
+            prices,
+            volumes,
+            _METRICS[self.metric],
+            np.float64(self.threshold),
+            self._counters,
         )
-        cache.append(cache_data)
-    return list_bars, cache
+
+    def _reset_bar(self):
+        """
+        Starts a new bar at the close price of the last tick.
+        """
+        self._counters[_OPEN] = self._close_price
+        self._counters[_HIGH], self._counters[_LOW] = -np.inf, np.inf
+        self._counters[[_CUM_VOLUME, _CUM_DOLLAR, _CUM_TICKS]] = 0
+
+    def _records(self, date_time, values, ticks):
+        """
+        :return: np.ndarray, structured. The bars with the columns of the bar DataFrames.
+        """
+        dtype = self._dtypes.get(date_time.dtype)
+        if dtype is None:
+            dtype = np.dtype(
+                [("date_time", date_time.dtype)]
+                + [(column, np.float64) for column in _BAR_COLUMNS]
+                + [("cum_ticks", np.int64)]
+            )
+            self._dtypes[date_time.dtype] = dtype
+        bars = np.empty(len(ticks), dtype=dtype)
+        bars["date_time"] = date_time
+        for j, column in enumerate(_BAR_COLUMNS):
+            bars[column] = values[:, j]
+        bars["cum_ticks"] = ticks
+        return bars
 
 
 def _assert_dataframe(test_batch):
@@ -176,61 +749,124 @@ def _assert_dataframe(test_batch):
         print("csv file, column 0, not a date time format:", test_batch.iloc[0, 0])
 
 
-def _batch_run(df, metric, threshold=50000, batch_size=20000000):
+def _read_batches(source, batch_size):
+    """
+    Yields the ticks in batches, without loading a file whole: a DataFrame or a TickStore is sliced, a csv file
+    is read with ``chunksize`` and a parquet file (needs pyarrow) one record batch at a time, so peak memory is
+    set by the batch size rather than the file size. An iterable of DataFrames is passed through as is.
+
+    :param source: pd.DataFrame, TickStore, path to a csv or parquet file, or an iterable of DataFrames.
+    :param batch_size: The number of rows per batch.
+    :return: Generator of DataFrames with 3 columns - date_time, price, and volume.
+    """
+    batch_size = int(batch_size)
+    if isinstance(source, TickStore):
+        source = source.frame()
+    if isinstance(source, pd.DataFrame):
+        for start in range(0, len(source), batch_size):
+            yield source.iloc[start : start + batch_size]
+    elif isinstance(source, (str, os.PathLike)):
+        if str(source).endswith((".parquet", ".pq")):
+            import pyarrow.parquet as pq
+
+            for record_batch in pq.ParquetFile(source).iter_batches(batch_size):
+                yield record_batch.to_pandas()
+        else:
+            yield from pd.read_csv(source, chunksize=batch_size, parse_dates=[0])
+    else:
+        yield from source
+
+
+def _batch_run(
+    df,
+    metric,
+    threshold=50000,
+    batch_size=20000000,
+    thresholds=None,
+    n_jobs=1,
+    progress=None,
+    output="frame",
+):
     """
-    Reads a csv file in batches and then constructs the financial data structure in the form of a DataFrame.
+    Reads the ticks in batches and then constructs the financial data structure in the form of a DataFrame.
 
-    The csv file must have only 3 columns: date_time, price, & volume.
+    The ticks must have only 3 columns: date_time, price, & volume.
 
-    :param df: DataFrame to read
+    :param df: DataFrame, TickStore, path to a csv or parquet file, or iterable of DataFrames to read
     :param metric: cum_ticks, cum_dollar_value, cum_volume
     :param threshold: A cumulative value above this threshold triggers a sample to be taken.
     :param batch_size: The number of rows per batch. Less RAM = smaller batch size.
-    :return: Financial data structure
+    :param thresholds: List of distinct thresholds to build in a single pass instead of ``threshold``.
+    :param n_jobs: Number of threads building the bars of a batch, None for the number of CPUs. Not used with
+                   thresholds.
+    :param progress: Callable taking the BatchMetrics of each batch, e.g. print_progress. None to not measure.
+    :param output: frame, records or arrow
+    :return: Financial data structure, or a dict of them keyed by threshold if thresholds is given
     """
-    print("Reading data in batches:")
+    _check_output(output)
+    if thresholds is not None:
+        _check_thresholds(thresholds)
 
     # Variables
     count = 0
     flag = False  # The first flag is false since the first batch doesn't use the cache
     cache = None
-    final_bars = []
-
-    # Read in the first row & assert format
-    _assert_dataframe(df.iloc[0:1])
-
-    # Read csv in batches
-    for _, batch in df.groupby(np.arange(len(df)) // batch_size):
-
-        print("Batch number:", count)
-        list_bars, cache = _extract_bars(
-            data=batch, metric=metric, threshold=threshold, cache=cache, flag=flag
-        )
+    final_bars = {
+        threshold: BarColumns()
+        for threshold in ([threshold] if thresholds is None else thresholds)
+    }
+    meter = None if progress is None else _ProgressMeter(progress)
+
+    # Read in batches
+    for batch in _read_batches(df, batch_size):
+        if count == 0:
+            # Read in the first row & assert format
+            _assert_dataframe(batch.iloc[0:1])
+
+        if thresholds is None:
+            *bars, cache = _extract_columns(
+                data=batch,
+                metric=metric,
+                threshold=threshold,
+                cache=cache,
+                flag=flag,
+                n_jobs=n_jobs,
+            )
+            list_bars = {threshold: bars}
+        else:
+            list_bars, cache = _extract_multi_columns(
+                data=batch,
+                metric=metric,
+                thresholds=thresholds,
+                cache=cache,
+                flag=flag,
+            )
 
-        # Append to bars list
-        final_bars += list_bars
+        # Append to the bar columns
+        for key, bars in list_bars.items():
+            final_bars[key].append(*bars)
+        if meter is not None:
+            num_bars = sum(len(bars[2]) for bars in list_bars.values())
+            meter.update(len(batch), num_bars, cache)
         count += 1
 
         # Set flag to True: notify function to use cache
         flag = True
 
-    # Return a DataFrame
-    cols = [
-        "date_time",
-        "open",
-        "high",
-        "low",
-        "close",
-        "cum_vol",
-        "cum_dollar",
-        "cum_ticks",
-    ]
-    bars_df = pd.DataFrame(final_bars, columns=cols)
-    print("Returning bars \n")
-    return bars_df
+    if thresholds is None:
+        return final_bars[threshold].output(output)
+    return {key: bars.output(output) for key, bars in final_bars.items()}
 
 
-def get_dollar_bars(df, threshold=70000000, batch_size=20000000):
+def get_dollar_bars(
+    df,
+    threshold=70000000,
+    batch_size=20000000,
+    thresholds=None,
+    n_jobs=1,
+    progress=None,
+    output="frame",
+):
     """
     Creates the dollar bars: date_time, open, high, low, close, cum_vol, cum_dollar, and cum_ticks.
 
@@ -238,51 +874,100 @@ def get_dollar_bars(df, threshold=70000000, batch_size=20000000):
     it is suggested that using 1/50 of the average daily dollar value, would result in more desirable statistical
     properties.
 
-    :param df: a pandas.DataFrame containing the price and volume data.
+    :param df: a pandas.DataFrame containing the price and volume data, a TickStore, a path to a csv or
+               parquet file or an iterable of DataFrames, read in batches.
     :param threshold: A cumulative value above this threshold triggers a sample to be taken.
     :param batch_size: The number of rows per batch. Less RAM = smaller batch size.
-    :return: Dataframe of dollar bars
+    :param thresholds: List of distinct thresholds to build in a single pass instead of ``threshold``, e.g. to tune it.
+    :param n_jobs: Number of threads building the bars of a batch, None for the number of CPUs. The bars are
+                   the same as with a single thread. Not used with thresholds.
+    :param progress: Callable taking the BatchMetrics of each batch, e.g. print_progress. None to not measure.
+    :param output: frame for a DataFrame, records for a np.recarray or arrow for a pyarrow.Table (needs pyarrow)
+    :return: Dataframe of dollar bars, or a dict of them keyed by threshold if thresholds
+             is given, pd.concat() turns it into a MultiIndex frame
     """
     return _batch_run(
         df=df,
         metric="cum_dollar_value",
         threshold=threshold,
         batch_size=batch_size,
+        thresholds=thresholds,
+        n_jobs=n_jobs,
+        progress=progress,
+        output=output,
     )
 
 
-def get_volume_bars(df, threshold=28224, batch_size=20000000):
+def get_volume_bars(
+    df,
+    threshold=28224,
+    batch_size=20000000,
+    thresholds=None,
+    n_jobs=1,
+    progress=None,
+    output="frame",
+):
     """
     Creates the volume bars: date_time, open, high, low, close, cum_vol, cum_dollar, and cum_ticks.
 
     Following the paper "The Volume Clock: Insights into the high frequency paradigm" by Lopez de Prado, et al,
     it is suggested that using 1/50 of the average daily volume, would result in more desirable statistical properties.
 
-    :param df: a pandas.DataFrame containing the price and volume data.
+    :param df: a pandas.DataFrame containing the price and volume data, a TickStore, a path to a csv or
+               parquet file or an iterable of DataFrames, read in batches.
     :param threshold: A cumulative value above this threshold triggers a sample to be taken.
     :param batch_size: The number of rows per batch. Less RAM = smaller batch size.
-    :return: Dataframe of volume bars
+    :param thresholds: List of distinct thresholds to build in a single pass instead of ``threshold``, e.g. to tune it.
+    :param n_jobs: Number of threads building the bars of a batch, None for the number of CPUs. The bars are
+                   the same as with a single thread. Not used with thresholds.
+    :param progress: Callable taking the BatchMetrics of each batch, e.g. print_progress. None to not measure.
+    :param output: frame for a DataFrame, records for a np.recarray or arrow for a pyarrow.Table (needs pyarrow)
+    :return: Dataframe of volume bars, or a dict of them keyed by threshold if thresholds
+             is given, pd.concat() turns it into a MultiIndex frame
     """
     return _batch_run(
         df=df,
         metric="cum_volume",
         threshold=threshold,
         batch_size=batch_size,
+        thresholds=thresholds,
+        n_jobs=n_jobs,
+        progress=progress,
+        output=output,
     )
 
 
-def get_tick_bars(df, threshold=2800, batch_size=20000000):
+def get_tick_bars(
+    df,
+    threshold=2800,
+    batch_size=20000000,
+    thresholds=None,
+    n_jobs=1,
+    progress=None,
+    output="frame",
+):
     """
     Creates the tick bars: date_time, open, high, low, close, cum_vol, cum_dollar, and cum_ticks.
 
-    :param df: a pandas.DataFrame containing the price and volume data.
+    :param df: a pandas.DataFrame containing the price and volume data, a TickStore, a path to a csv or
+               parquet file or an iterable of DataFrames, read in batches.
     :param threshold: A cumulative value above this threshold triggers a sample to be taken.
     :param batch_size: The number of rows per batch. Less RAM = smaller batch size.
-    :return: Dataframe of tick bars
+    :param thresholds: List of distinct thresholds to build in a single pass instead of ``threshold``, e.g. to tune it.
+    :param n_jobs: Number of threads building the bars of a batch, None for the number of CPUs. The bars are
+                   the same as with a single thread. Not used with thresholds.
+    :param progress: Callable taking the BatchMetrics of each batch, e.g. print_progress. None to not measure.
+    :param output: frame for a DataFrame, records for a np.recarray or arrow for a pyarrow.Table (needs pyarrow)
+    :return: Dataframe of tick bars, or a dict of them keyed by threshold if thresholds
+             is given, pd.concat() turns it into a MultiIndex frame
     """
     return _batch_run(
         df=df,
         metric="cum_ticks",
         threshold=threshold,
         batch_size=batch_size,
+        thresholds=thresholds,
+        n_jobs=n_jobs,
+        progress=progress,
+        output=output,
     )
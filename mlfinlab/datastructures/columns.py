@@ -0,0 +1,152 @@
+"""
+Typed columnar output of the bar functions.
+
+The bar kernels return the bars of a batch as typed arrays. BarColumns copies them once into one contiguous,
+growable buffer per column (the date_time of the closing tick, the float64 columns and int64 cum_ticks), so the
+bars of all batches are gathered without building a DataFrame per batch and concatenating them, and the final
+DataFrame is built on views of the buffers without copying them again.
+"""
+
+# Imports
+import numpy as np
+import pandas as pd
+
+# float64 columns of the bars returned by the kernels
+_BAR_COLUMNS = ("open", "high", "low", "close", "cum_vol", "cum_dollar")
+
+# Kinds of output of the batch bar functions
+_OUTPUTS = ("frame", "records", "arrow")
+
+
+class BarColumns:
+    """
+    Bars gathered batch after batch into typed buffers which double in size when full.
+
+    The date_time column keeps the dtype of the ticks. A tz-aware date_time is stored as datetime64 in UTC and
+    converted back to its time zone by frame() and arrow().
+    """
+
+    def __init__(self, capacity=1024):
+        """
+        :param capacity: Number of bars the buffers can hold before they first grow.
+        """
+        self.capacity = capacity
+        self.num_bars = 0
+        self.tz = None
+        self.date_time = np.empty(capacity, dtype="datetime64[ns]")
+        self.values = {column: np.empty(capacity) for column in _BAR_COLUMNS}
+        self.ticks = np.empty(capacity, dtype=np.int64)
+
+    def __len__(self):
+        return self.num_bars
+
+    def append(self, date_time, values, ticks):
+        """
+        :param date_time: array-like. date_time of the closing tick of each bar.
+        :param values: np.ndarray, float64. Columns open, high, low, close, cum_vol and cum_dollar of the bars.
+        :param ticks: np.ndarray, int64. Column cum_ticks of the bars.
+        """
+        date_time = self._date_time_values(date_time)
+        first, last = self.num_bars, self.num_bars + len(ticks)
+        if last > self.capacity:
+            self._grow(max(2 * self.capacity, last))
+        self.date_time[first:last] = date_time
+        for j, column in enumerate(_BAR_COLUMNS):
+            self.values[column][first:last] = values[:, j]
+        self.ticks[first:last] = ticks
+        self.num_bars = last
+
+    def frame(self):
+        """
+        :return: DataFrame of the bars, its columns are views of the buffers.
+        """
+        date_time = self.date_time[: self.num_bars]
+        if self.tz is not None:
+            date_time = (
+                pd.DatetimeIndex(date_time).tz_localize("UTC").tz_convert(self.tz)
+            )
+        columns = {"date_time": date_time}
+        for column in _BAR_COLUMNS:
+            columns[column] = self.values[column][: self.num_bars]
+        columns["cum_ticks"] = self.ticks[: self.num_bars]
+        return pd.DataFrame(columns, copy=False)
+
+    def records(self):
+        """
+        :return: np.recarray of the bars, with the date_time in UTC if it is tz-aware.
+        """
+        dtype = np.dtype(
+            [("date_time", self.date_time.dtype)]
+            + [(column, np.float64) for column in _BAR_COLUMNS]
+            + [("cum_ticks", np.int64)]
+        )
+        bars = np.empty(self.num_bars, dtype=dtype)
+        bars["date_time"] = self.date_time[: self.num_bars]
+        for column in _BAR_COLUMNS:
+            bars[column] = self.values[column][: self.num_bars]
+        bars["cum_ticks"] = self.ticks[: self.num_bars]
+        return bars.view(np.recarray)
+
+    def arrow(self):
+        """
+        Needs pyarrow. The numeric columns are handed to arrow without copies.
+
+        :return: pyarrow.Table of the bars.
+        """
+        import pyarrow as pa
+
+        return pa.Table.from_pandas(self.frame(), preserve_index=False)
+
+    def output(self, kind):
+        """
+        :param kind: frame, records or arrow
+        :return: The bars as a DataFrame, np.recarray or pyarrow.Table.
+        """
+        _check_output(kind)
+        return getattr(self, kind)()
+
+    def _date_time_values(self, date_time):
+        """
+        :param date_time: array-like of timestamps, setting the dtype of the column until a bar is stored.
+        :return: np.ndarray of the timestamps, in UTC if they are tz-aware.
+        """
+        if isinstance(getattr(date_time, "dtype", None), pd.DatetimeTZDtype):
+            self.tz = date_time.dtype.tz
+            date_time = pd.DatetimeIndex(date_time).tz_convert(None)
+        date_time = np.asarray(date_time)
+        if self.num_bars == 0 and date_time.dtype != self.date_time.dtype:
+            self.date_time = np.empty(self.capacity, dtype=date_time.dtype)
+        return date_time
+
+    def _grow(self, capacity):
+        """
+        :param capacity: New number of bars the buffers can hold.
+        """
+        self.capacity = capacity
+        self.date_time = _resize(self.date_time, capacity, self.num_bars)
+        for column in _BAR_COLUMNS:
+            self.values[column] = _resize(self.values[column], capacity, self.num_bars)
+        self.ticks = _resize(self.ticks, capacity, self.num_bars)
+
+
+def _check_output(kind):
+    """
+    :param kind: Kind of output asked for.
+    :raises ValueError: if it is not frame, records or arrow.
+    """
+    if kind not in _OUTPUTS:
+        raise ValueError(
+            "output must be one of {}, got {!r}".format(", ".join(_OUTPUTS), kind)
+        )
+
+
+def _resize(buffer, capacity, num_bars):
+    """
+    :param buffer: np.ndarray, a column of bars.
+    :param capacity: Size of the new buffer.
+    :param num_bars: Number of bars to keep.
+    :return: New buffer holding the first num_bars bars of ``buffer``.
+    """
+    resized = np.empty(capacity, dtype=buffer.dtype)
+    resized[:num_bars] = buffer[:num_bars]
+    return resized
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+from mlfinlab.datastructures.ewma import ewma
+
+
+@pytest.fixture
+def ticks():
+    """
+    :return: Callable returning n random ticks: date_time, price on a 0.01 grid and integer volume.
+    """
+
+    def make(n=5000, seed=0, freq="250ms"):
+        rng = np.random.default_rng(seed)
+        price = np.round(100 + np.cumsum(np.round(rng.standard_normal(n) * 0.05, 2)), 2)
+        volume = np.round(rng.pareto(2.0, n) * 10 + 1, 0)
+        date_time = pd.date_range("2024-01-01", periods=n, freq=freq, unit="ns")
+        return pd.DataFrame({"date_time": date_time, "price": price, "volume": volume})
+
+    return make
+
+
+@pytest.fixture
+def reference_bars():
+    """
+    Plain python loop of the information driven bars, recomputing the windowed ewma on every tick as the
+    original implementation. The sampler is pushed the signed flow of each tick (tick rule times 1, the volume or
+    the dollar value) with the expected number of ticks, returns whether the bar closes and is reset when it does.
+
+    :return: Callable taking the ticks, the sampler, exp_num_ticks, num_ticks_ewma_window and the flow: tick,
+             volume or dollar.
+    """
+
+    def run(df, sampler, exp_num_ticks, num_ticks_ewma_window, flow="volume"):
+        bars, num_ticks_bar = [], []
+        open_price, prev_price, tick_rule = None, None, 0.0
+        cum_ticks, cum_volume, cum_dollar = 0, 0.0, 0.0
+        high_price, low_price = -np.inf, np.inf
+        for date_time, price, volume in df.itertuples(index=False):
+            open_price = price if open_price is None else open_price
+            if prev_price is not None and price != prev_price:
+                tick_rule = np.sign(price - prev_price)
+            prev_price = price
+            cum_ticks += 1
+            cum_volume += volume
+            cum_dollar += price * volume
+            high_price, low_price = max(high_price, price), min(low_price, price)
+            size = {"tick": 1.0, "volume": volume, "dollar": price * volume}[flow]
+            if sampler.push(tick_rule * size, exp_num_ticks):
+                bars.append(
+                    [
+                        date_time,
+                        open_price,
+                        high_price,
+                        min(low_price, open_price),
+                        price,
+                        cum_volume,
+                        cum_dollar,
+                        cum_ticks,
+                    ]
+                )
+                num_ticks_bar.append(cum_ticks)
+                exp_num_ticks = ewma(
+                    np.array(num_ticks_bar[-num_ticks_ewma_window:], dtype=float),
+                    num_ticks_ewma_window,
+                )[-1]
+                open_price = price
+                cum_ticks, cum_volume, cum_dollar = 0, 0.0, 0.0
+                high_price, low_price = -np.inf, np.inf
+                sampler.reset()
+        return bars
+
+    return run
@@ -4,18 +4,22 @@ This module contains various implementations of ewma based on sample size
 
 # Imports
 import numpy as np
-from numba import jit
+from numba import njit
+from numba import prange
 from numba import float64
 from numba import int64
 
 
-@jit((float64[:], int64), nopython=False, nogil=True)
+@njit((float64[:], int64), nogil=True, cache=True)
 def ewma(arr_in, window):
     """Exponentialy weighted moving average specified by a decay ``window``
     to provide better adjustments for small windows via:
         y[t] = (x[t] + (1-a)*x[t-1] + (1-a)^2*x[t-2] + ... + (1-a)^n*x[t-n]) /
                (1 + (1-a) + (1-a)^2 + ... + (1-a)^n).
 
+    The weights (1-a)^i are raised to the power on every step, not carried as a running product: the
+    running product rounds differently, and the ties it shifts change which ticks close imbalance bars.
+
     :param arr_in : np.ndarray, float64. A single dimenisional numpy array
     :paran window : int64. The decay window, or 'span'
     :return: np.ndarray. The EWMA vector, same length / shape as ``arr_in``
@@ -23,7 +27,7 @@ def ewma(arr_in, window):
     arr_length = arr_in.shape[0]
     ewma_arr = np.empty(arr_length, dtype=float64)
     alpha = 2 / (window + 1)
-    weight = 1
+    weight = 1.0
     ewma_old = arr_in[0]
     ewma_arr[0] = ewma_old
     for i in range(1, arr_length):
@@ -32,3 +36,93 @@ def ewma(arr_in, window):
         ewma_arr[i] = ewma_old / weight
 
     return ewma_arr
+
+
+@njit(nogil=True, parallel=True, cache=True)
+def ewma_2d(arr_in, window):
+    """:func:`ewma` of every column of a two dimensional array (one column per symbol or feature),
+    the columns being processed in parallel.
+
+    It is compiled on the first call rather than eagerly with a signature: compiling a parallel kernel starts
+    numba's threading layer, which must not be running yet when the caller forks worker processes.
+
+    :param arr_in : np.ndarray, float64. A two dimensional numpy array, observations in rows
+    :paran window : int64. The decay window, or 'span'
+    :return: np.ndarray. The EWMA of each column, same shape as ``arr_in``
+    """
+    ewma_arr = np.empty(arr_in.shape, dtype=float64)
+    for j in prange(arr_in.shape[1]):
+        ewma_arr[:, j] = ewma(arr_in[:, j], window)
+
+    return ewma_arr
+
+
+@njit(nogil=True, cache=True)
+def ewma_weight(length, window):
+    """Sum of the weights of the last ``length`` observations of :func:`ewma`, i.e. the
+    denominator of its last value:
+        1 + (1-a) + (1-a)^2 + ... + (1-a)^(length-1).
+
+    :param length : int64. Number of observations in the window
+    :param window : int64. The decay window, or 'span'
+    :return: float64. The sum of the weights, computed in the same order as :func:`ewma`
+    """
+    alpha = 2 / (window + 1)
+    weight = 1.0
+    for i in range(1, length):
+        weight += (1 - alpha) ** i
+    return weight
+
+
+@njit(nogil=True, cache=True)
+def ewma_state(arr_in, window):
+    """Numerator and denominator of the last value of :func:`ewma`, so that
+    ``ewma(arr_in, window)[-1] == numerator / weight`` bit for bit, with the
+    weight of the next observation (1-a)^n.
+
+    The state can be carried forward one observation at a time with :func:`ewma_push`.
+
+    :param arr_in : np.ndarray, float64. A single dimenisional numpy array
+    :paran window : int64. The decay window, or 'span'
+    :return: (float64, float64, float64). The numerator, the weight and (1-a)^n
+    """
+    alpha = 2 / (window + 1)
+    numerator = arr_in[0]
+    weight = 1.0
+    for i in range(1, arr_in.shape[0]):
+        weight += (1 - alpha) ** i
+        numerator = numerator * (1 - alpha) + arr_in[i]
+    return numerator, weight, (1 - alpha) ** arr_in.shape[0]
+
+
+@njit(nogil=True, cache=True)
+def ewma_push(numerator, weight, power, length, window, value, dropped):
+    """Carries the state of :func:`ewma_state` over the last ``window`` observations forward by
+    one observation in O(1).
+
+    While the window fills up this is the recursion :func:`ewma` runs, so the state is identical bit
+    for bit. Once it is full the observation leaving the window is removed with its decayed weight:
+        numerator = numerator * (1-a) + x[t] - (1-a)^window * x[t-window]
+    which agrees with :func:`ewma` over the window up to rounding, the error being damped by (1-a)
+    on every step.
+
+    :param numerator : float64. Numerator over the previous window
+    :param weight : float64. Weight over the previous window
+    :param power : float64. (1-a)^length, the weight of the oldest observation once it is full
+    :param length : int64. Number of observations in the previous window
+    :param window : int64. The decay window, or 'span'
+    :param value : float64. The new observation
+    :param dropped : float64. The observation leaving the window, x[t-window], only used once it is full
+    :return: (float64, float64, float64, int64). The numerator, weight, power and length of the window
+    """
+    decay = 1 - 2 / (window + 1)
+    if length == 0:
+        return value, 1.0, decay**1, 1
+    if length < window:
+        return (
+            numerator * decay + value,
+            weight + power,
+            decay ** (length + 1),
+            length + 1,
+        )
+    return numerator * decay + value - power * dropped, weight, power, length
@@ -13,51 +13,374 @@ A great paper to read more about this is titled: The Volume Clock: Insights into
 """
 
 # Imports
-from collections import namedtuple
+from dataclasses import dataclass
 import pandas as pd
 import numpy as np
-from .ewma import ewma
+from numba import njit
+from .balance import BarBuilder, _bar_buffers, _grow_bars, _read_batches
+from .ewma import ewma_push, ewma_state
+from .columns import BarColumns, _check_output
+from .progress import _ProgressMeter
+from .signed_flow import _batch_signed_flow, _batch_tick_rules
+
+# Metric codes understood by the compiled bar kernel
+_METRICS = {"tick_imbalance": 0, "dollar_imbalance": 1, "volume_imbalance": 2}
+
+# Positions in the counters array carried between batches
+(
+    _OPEN,
+    _HIGH,
+    _LOW,
+    _CUM_VOLUME,
+    _CUM_DOLLAR,
+    _CUM_TICKS,
+    _CUM_THETA,
+    _EXP_NUM_TICKS,
+    _PREV_PRICE,
+    _PREV_TICK_RULE,
+    _NUM_TICKS,
+    _MAX_NUM_TICKS_BAR,
+    _NUM_BARS,
+    _HIST_START,
+    _HIST_END,
+    _EWMA_WINDOW,
+    _EWMA_LENGTH,
+    _EWMA_SLIDES,
+    _EWMA_NUMERATOR,
+    _EWMA_WEIGHT,
+    _EWMA_POWER,
+) = range(21)
+
+# Relative distance of the cumulative imbalance to its threshold under which the sliding EWMA is rebuilt exactly
+_TIE_TOL = 1e-6
+
+# Positions of the previous price and tick rule, carried over by the signed flow of each batch
+_PREV = (_PREV_PRICE, _PREV_TICK_RULE)
+
+
+@dataclass
+class ImbalanceBarState:
+    """
+    Carry-over state of the imbalance bar in progress, passed from one batch to the next.
+
+    counters holds the scalar state (see the _OPEN ... _EWMA_POWER positions), history[counters[_HIST_START]:
+    counters[_HIST_END]] the imbalances still needed by the expected imbalance EWMA and num_ticks_bar the
+    number of ticks of the last num_ticks_ewma_window bars.
+    """
 
+    counters: np.ndarray
+    history: np.ndarray
+    num_ticks_bar: np.ndarray
+    date_time: object = None
+
+    @classmethod
+    def initial(cls, exp_num_ticks_init, num_prev_bars, num_ticks_ewma_window):
+        """
+        :param exp_num_ticks_init: initial guess of number of ticks in imbalance bar
+        :param num_prev_bars: Number of previous bars used for EWMA window
+        :param num_ticks_ewma_window: EWMA window to estimate expected number of ticks in a bar
+        :return: ImbalanceBarState before the first tick
+        """
+        counters = np.zeros(21, dtype=np.float64)
+        counters[[_OPEN, _PREV_PRICE]] = np.nan
+        counters[_HIGH], counters[_LOW] = -np.inf, np.inf
+        counters[_EXP_NUM_TICKS] = exp_num_ticks_init
+        counters[_EWMA_WINDOW] = int(exp_num_ticks_init * num_prev_bars)
+        return cls(
+            counters=counters,
+            history=np.empty(1024, dtype=np.float64),
+            num_ticks_bar=np.empty(int(num_ticks_ewma_window), dtype=np.float64),
+        )
 
-def _get_updated_counters(cache, flag, exp_num_ticks_init):
+    @property
+    def nbytes(self):
+        """
+        :return: Bytes taken by the arrays of the state.
+        """
+        return self.counters.nbytes + self.history.nbytes + self.num_ticks_bar.nbytes
+
+
+def _get_updated_counters(
+    cache, flag, exp_num_ticks_init, num_prev_bars, num_ticks_ewma_window
+):
     """
     Updates the counters by resetting them or making use of the cache to update them based on a previous batch.
 
-    :param cache: Contains information from the previous batch that is relevant in this batch.
+    :param cache: ImbalanceBarState from the previous batch.
     :param flag: A flag which signals to use the cache.
-    :param exp_num_ticks: Expected number of ticks per bar
-    :return: Updated counters - cum_ticks, cum_dollar_value, cum_volume, high_price, low_price, exp_num_ticks, imbalance_array
+    :param exp_num_ticks_init: initial guess of number of ticks in imbalance bar
+    :param num_prev_bars: Number of previous bars used for EWMA window
+    :param num_ticks_ewma_window: EWMA window to estimate expected number of ticks in a bar
+    :return: Updated counters, imbalance history and number of ticks of previous bars
     """
     # Check flag
-    if flag and cache:
-        # Update variables based on cache
-        cum_ticks = int(cache[-1].cum_ticks)
-        cum_dollar_value = np.float64(cache[-1].cum_dollar_value)
-        cum_volume = cache[-1].cum_volume
-        low_price = np.float64(cache[-1].low)
-        high_price = np.float64(cache[-1].high)
-        # cumulative imbalance for a particular imbalance calculation (theta_t in Prado book)
-        cum_theta = np.float64(cache[-1].cum_theta)
-        # expected number of ticks extracted from prev bars
-        exp_num_ticks = np.float64(cache[-1].exp_num_ticks)
-        # array of latest imbalances
-        imbalance_array = cache[-1].imbalance_array
-    else:
+    if not (flag and cache is not None):
         # Reset counters
-        cum_ticks, cum_dollar_value, cum_volume, cum_theta = 0, 0, 0, 0
-        high_price, low_price = -np.inf, np.inf
-        exp_num_ticks, imbalance_array = exp_num_ticks_init, []
+        cache = ImbalanceBarState.initial(
+            exp_num_ticks_init, num_prev_bars, num_ticks_ewma_window
+        )
+    return cache.counters.copy(), cache.history, cache.num_ticks_bar.copy()
 
-    return (
-        cum_ticks,
-        cum_dollar_value,
-        cum_volume,
-        cum_theta,
-        high_price,
-        low_price,
-        exp_num_ticks,
-        imbalance_array,
-    )
+
+@njit(nogil=True, cache=True)
+def _imbalance_loop(
+    prices,
+    volumes,
+    imbalances,
+    first,
+    last,
+    num_prev_bars,
+    num_ticks_ewma_window,
+    counters,
+    history,
+    num_ticks_bar,
+    end_idx,
+    values,
+    ticks,
+    num_bars,
+):
+    """
+    Runs the ticks from ``first`` up to ``last`` into the imbalance bar in progress, writing the bars closed into
+    the output buffers, until the output buffers or the history are full. None of them is reallocated here, see
+    _bar_loop().
+
+    :param prices: np.ndarray, float64. Price of each tick.
+    :param volumes: np.ndarray, float64. Volume of each tick.
+    :param imbalances: np.ndarray, float64. Signed flow of each tick, see signed_flow().
+    :param first: int64. Position of the first tick to run.
+    :param last: int64. Position after the last tick to run.
+    :param num_prev_bars: int64. Number of previous bars used for EWMA window
+    :param num_ticks_ewma_window: int64. EWMA window to estimate expected number of ticks in a bar
+    :param counters: np.ndarray, float64. Scalar state of the bar in progress, updated in place.
+    :param history: np.ndarray, float64. Buffer of imbalances.
+    :param num_ticks_bar: np.ndarray, float64. Number of ticks of the previous bars, updated in place.
+    :param end_idx: np.ndarray, int64. Positions of the closing ticks.
+    :param values: np.ndarray, float64. Columns open, high, low, close, cum_vol and cum_dollar of the bars.
+    :param ticks: np.ndarray, int64. Column cum_ticks of the bars.
+    :param num_bars: int64. Number of bars already in the buffers.
+    :return: Position of the next tick to run and number of bars in the buffers.
+    """
+    open_price = counters[_OPEN]
+    high_price = counters[_HIGH]
+    low_price = counters[_LOW]
+    cum_volume = counters[_CUM_VOLUME]
+    cum_dollar_value = counters[_CUM_DOLLAR]
+    cum_ticks = np.int64(counters[_CUM_TICKS])
+    cum_theta = counters[_CUM_THETA]
+    exp_num_ticks = counters[_EXP_NUM_TICKS]
+    num_ticks = np.int64(counters[_NUM_TICKS])
+    max_num_ticks_bar = np.int64(counters[_MAX_NUM_TICKS_BAR])
+    num_prev_ticks_bar = np.int64(counters[_NUM_BARS])
+    start = np.int64(counters[_HIST_START])
+    end = np.int64(counters[_HIST_END])
+    ewma_window = np.int64(counters[_EWMA_WINDOW])
+    ewma_length = np.int64(counters[_EWMA_LENGTH])
+    ewma_slides = np.int64(counters[_EWMA_SLIDES])
+    numerator = counters[_EWMA_NUMERATOR]
+    weight = counters[_EWMA_WEIGHT]
+    power = counters[_EWMA_POWER]
+
+    i = first
+    while i < last and num_bars < end_idx.shape[0] and end < history.shape[0]:
+        price = prices[i]
+        volume = volumes[i]
+        if np.isnan(open_price):
+            open_price = price
+
+        # Calculations
+        cum_ticks += 1
+        cum_dollar_value = cum_dollar_value + price * volume
+        cum_volume = cum_volume + volume
+
+        imbalance = imbalances[i]
+
+        history[end] = imbalance
+        end += 1
+        num_ticks += 1
+        cum_theta += imbalance
+
+        # Carry the expected imbalance EWMA forward
+        if ewma_length == ewma_window:
+            ewma_slides += 1
+        numerator, weight, power, ewma_length = ewma_push(
+            numerator,
+            weight,
+            power,
+            ewma_length,
+            ewma_window,
+            imbalance,
+            history[max(end - 1 - ewma_window, start)],
+        )
+        if ewma_slides == ewma_window:
+            numerator, weight, power = ewma_state(
+                history[end - ewma_length : end], ewma_window
+            )
+            ewma_slides = 0
+
+        if num_ticks < exp_num_ticks:
+            exp_tick_imb = np.nan  # waiting for array to fill for ewma
+        else:
+            # expected imbalance per tick
+            exp_tick_imb = numerator / weight
+
+        # Check min max
+        if price > high_price:
+            high_price = price
+        if price <= low_price:
+            low_price = price
+
+        # Rounding of the sliding state can only decide a near tie: settle it on the exact windowed state
+        threshold = exp_num_ticks * np.abs(exp_tick_imb)
+        if np.abs(np.abs(cum_theta) - threshold) <= _TIE_TOL * (
+            np.abs(cum_theta) + threshold
+        ):
+            numerator, weight, power = ewma_state(
+                history[end - ewma_length : end], ewma_window
+            )
+            ewma_slides = 0
+            exp_tick_imb = numerator / weight
+            threshold = exp_num_ticks * np.abs(exp_tick_imb)
+
+        # Check expression for possible bar generation
+        if np.abs(cum_theta) > threshold:
+            end_idx[num_bars] = i
+            values[num_bars, 0] = open_price
+            values[num_bars, 1] = high_price
+            values[num_bars, 2] = min(low_price, open_price)
+            values[num_bars, 3] = price
+            values[num_bars, 4] = cum_volume
+            values[num_bars, 5] = cum_dollar_value
+            ticks[num_bars] = cum_ticks
+            num_bars += 1
+
+            # expected number of ticks based on formed bars
+            if num_prev_ticks_bar < num_ticks_ewma_window:
+                num_prev_ticks_bar += 1
+            else:
+                num_ticks_bar[:-1] = num_ticks_bar[1:]
+            num_ticks_bar[num_prev_ticks_bar - 1] = cum_ticks
+            bar_numerator, bar_weight, _ = ewma_state(
+                num_ticks_bar[:num_prev_ticks_bar], num_ticks_ewma_window
+            )
+            exp_num_ticks = bar_numerator / bar_weight
+            max_num_ticks_bar = max(max_num_ticks_bar, cum_ticks)
+
+            # Reset counters, the close of this bar is the open of the next one
+            open_price = price
+            high_price, low_price = -np.inf, np.inf
+            cum_volume, cum_dollar_value, cum_ticks, cum_theta = 0.0, 0.0, 0, 0.0
+
+            # Rebuild the expected imbalance EWMA for the new window
+            window = np.int64(exp_num_ticks * num_prev_bars)
+            if window != ewma_window:
+                ewma_window = window
+                ewma_length = min(num_ticks, ewma_window)
+                ewma_slides = 0
+                if ewma_length > 0:
+                    numerator, weight, power = ewma_state(
+                        history[end - ewma_length : end], ewma_window
+                    )
+
+            # Drop the imbalances no future window can reach
+            start = max(start, end - (num_prev_bars * max_num_ticks_bar + 1))
+        i += 1
+
+    counters[_OPEN] = open_price
+    counters[_HIGH] = high_price
+    counters[_LOW] = low_price
+    counters[_CUM_VOLUME] = cum_volume
+    counters[_CUM_DOLLAR] = cum_dollar_value
+    counters[_CUM_TICKS] = cum_ticks
+    counters[_CUM_THETA] = cum_theta
+    counters[_EXP_NUM_TICKS] = exp_num_ticks
+    counters[_NUM_TICKS] = num_ticks
+    counters[_MAX_NUM_TICKS_BAR] = max_num_ticks_bar
+    counters[_NUM_BARS] = num_prev_ticks_bar
+    counters[_HIST_START] = start
+    counters[_HIST_END] = end
+    counters[_EWMA_WINDOW] = ewma_window
+    counters[_EWMA_LENGTH] = ewma_length
+    counters[_EWMA_SLIDES] = ewma_slides
+    counters[_EWMA_NUMERATOR] = numerator
+    counters[_EWMA_WEIGHT] = weight
+    counters[_EWMA_POWER] = power
+    return i, num_bars
+
+
+@njit(nogil=True, cache=True)
+def _imbalance_kernel(
+    prices,
+    volumes,
+    imbalances,
+    num_prev_bars,
+    num_ticks_ewma_window,
+    counters,
+    history,
+    num_ticks_bar,
+):
+    """
+    Compiled loop which compiles the various imbalance bars: dollar, volume, or tick.
+
+    The expected imbalance is the last value of ewma() over the last exp_num_ticks * num_prev_bars imbalances.
+    Instead of recomputing it on every tick, its numerator and weight are carried forward in O(1) with
+    ewma_push(): identical bit for bit while the window fills up, equal up to rounding once it slides. The state
+    is rebuilt exactly from the history every window slides, so the rounding cannot drift, and whenever the
+    window changes. When the cumulative imbalance comes within _TIE_TOL of its threshold, as the +-1 tick
+    imbalances do all the time, the state is rebuilt before the comparison, so the bars are those of the
+    windowed ewma().
+
+    Only the imbalances which can still fall in a future window are kept: the expected number of ticks is an
+    EWMA of past bar lengths, so it never exceeds the longest bar so far and no window can reach further back
+    than num_prev_bars times that bar. The history stays bounded by it instead of growing with every tick.
+
+    :param prices: np.ndarray, float64. Price of each tick.
+    :param volumes: np.ndarray, float64. Volume of each tick.
+    :param imbalances: np.ndarray, float64. Signed flow of each tick, see signed_flow().
+    :param num_prev_bars: int64. Number of previous bars used for EWMA window
+    :param num_ticks_ewma_window: int64. EWMA window to estimate expected number of ticks in a bar
+    :param counters: np.ndarray, float64. Scalar state of the bar in progress, updated in place.
+    :param history: np.ndarray, float64. Buffer of imbalances, reallocated when full.
+    :param num_ticks_bar: np.ndarray, float64. Number of ticks of the previous bars, updated in place.
+    :return: Positions of the closing ticks, float64 columns (open, high, low, close, cum_vol, cum_dollar),
+             int64 column cum_ticks and the history buffer.
+    """
+    end_idx, values, ticks = _bar_buffers(64)
+    num_bars = 0
+
+    i = 0
+    while True:
+        i, num_bars = _imbalance_loop(
+            prices,
+            volumes,
+            imbalances,
+            i,
+            prices.shape[0],
+            num_prev_bars,
+            num_ticks_ewma_window,
+            counters,
+            history,
+            num_ticks_bar,
+            end_idx,
+            values,
+            ticks,
+            num_bars,
+        )
+        if i == prices.shape[0]:
+            break
+
+        if num_bars == end_idx.shape[0]:
+            end_idx, values, ticks = _grow_bars(end_idx, values, ticks, num_bars)
+        start = np.int64(counters[_HIST_START])
+        end = np.int64(counters[_HIST_END])
+        if end == history.shape[0]:
+            # Move the imbalances still needed to the front of a new buffer
+            retained = end - start
+            history_new = np.empty(max(2 * retained, 1024), dtype=np.float64)
+            history_new[:retained] = history[start:end]
+            history = history_new
+            counters[_HIST_START], counters[_HIST_END] = 0, retained
+
+    return end_idx[:num_bars], values[:num_bars], ticks[:num_bars], history
 
 
 def _extract_bars(
@@ -68,10 +391,10 @@ def _extract_bars(
     num_ticks_ewma_window=20,
     cache=None,
     flag=False,
-    num_ticks_bar=None,
+    tick_rules=None,
 ):
     """
-    For loop which compiles the various imbalance bars: dollar, volume, or tick.
+    Runs the compiled imbalance bar kernel over one batch of ticks: dollar, volume, or tick.
 
     :param data: Contains 3 columns - date_time, price, and volume.
     :param metric: dollar_imbalance, volume_imbalance or tick_imbalance
@@ -79,157 +402,159 @@ def _extract_bars(
     :param num_prev_bars: Number of previous bars used for EWMA window (window=num_prev_bars * bar length)
                           for estimating expected imbalance (tick, volume or dollar)
     :param num_ticks_ewma_window: EWMA window to estimate expected number of ticks in a bar from based on previous bars
-    :param cache: contains information from the previous batch that is relevant in this batch.
+    :param cache: ImbalanceBarState of the bar in progress at the end of the previous batch.
     :param flag: A flag which signals to use the cache.
-    :param num_ticks_bar: Expected number of ticks per bar used to estimate the next bar
-    :return: The financial data structure with the cache of short term history.
+    :param tick_rules: np.ndarray, float64. Tick rule of each tick of the batch, see tick_rule(). Computed if None.
+    :return: The financial data structure with the ImbalanceBarState of the bar in progress.
     """
-    cache_tup = namedtuple(
-        "CacheData",
-        [
-            "date_time",
-            "price",
-            "high",
-            "low",
-            "tick_rule",
-            "cum_volume",
-            "cum_dollar_value",
-            "cum_ticks",
-            "cum_theta",
-            "exp_num_ticks",
-            "imbalance_array",
-        ],
-    )  # named tuple for cache
-    if cache is None:
-        cache = []
-        prev_tick_rule = 0  # set the first tick rule with 0
-        num_ticks_bar = []  # array of number of ticks from previous bars
-
-    list_bars = []
-    (
-        cum_ticks,
-        cum_dollar_value,
-        cum_volume,
-        cum_theta,
-        high_price,
-        low_price,
-        exp_num_ticks,
-        imbalance_array,
-    ) = _get_updated_counters(cache, flag, exp_num_ticks_init)
-
-    # Iterate over rows
-    for row in data.values:
-        # Set variables
-        date_time = row[0]
-        price = np.float64(row[1])
-        volume = row[2]
+    *bars, cache = _extract_columns(
+        data,
+        metric,
+        exp_num_ticks_init,
+        num_prev_bars,
+        num_ticks_ewma_window,
+        cache,
+        flag,
+        tick_rules,
+    )
+    columns = BarColumns(len(bars[2]))
+    columns.append(*bars)
+    return columns.frame(), cache
 
-        # Calculations
-        cum_ticks += 1
-        dollar_value = price * volume
-        cum_dollar_value = cum_dollar_value + dollar_value
-        cum_volume = cum_volume + volume
 
-        # Imbalance calculations
-        try:
-            tick_diff = price - cache[-1].price
-            prev_tick_rule = cache[-1].tick_rule
-        except IndexError:
-            tick_diff = 0
+def _extract_columns(
+    data,
+    metric,
+    exp_num_ticks_init=100000,
+    num_prev_bars=3,
+    num_ticks_ewma_window=20,
+    cache=None,
+    flag=False,
+    tick_rules=None,
+):
+    """
+    Runs the compiled imbalance bar kernel over one batch of ticks, see _extract_bars().
 
-        tick_rule = np.sign(tick_diff) if tick_diff != 0 else prev_tick_rule
+    :return: date_time, float64 columns (open, high, low, close, cum_vol, cum_dollar) and int64 column
+             cum_ticks of the bars, with the ImbalanceBarState of the bar in progress.
+    """
+    counters, history, num_ticks_bar = _get_updated_counters(
+        cache, flag, exp_num_ticks_init, num_prev_bars, num_ticks_ewma_window
+    )
+    prices = data.iloc[:, 1].to_numpy(dtype=np.float64)
+    volumes = data.iloc[:, 2].to_numpy(dtype=np.float64)
+    imbalances = _batch_signed_flow(
+        prices, volumes, _METRICS[metric], counters, _PREV, tick_rules
+    )
+    end_idx, values, ticks, history = _imbalance_kernel(
+        prices,
+        volumes,
+        imbalances,
+        int(num_prev_bars),
+        int(num_ticks_ewma_window),
+        counters,
+        history,
+        num_ticks_bar,
+    )
 
-        if metric == "tick_imbalance":
-            imbalance = tick_rule
-        elif metric == "dollar_imbalance":
-            imbalance = tick_rule * volume * price
-        elif metric == "volume_imbalance":
-            imbalance = tick_rule * volume
+    date_time = data.iloc[:, 0].array.take(end_idx)
+    last_date_time = (
+        data.iloc[-1, 0] if len(data) else getattr(cache, "date_time", None)
+    )
+    return (
+        date_time,
+        values,
+        ticks,
+        ImbalanceBarState(counters, history, num_ticks_bar, last_date_time),
+    )
 
-        imbalance_array.append(imbalance)
-        cum_theta += imbalance
 
-        if len(imbalance_array) < exp_num_ticks:
-            exp_tick_imb = np.nan  # waiting for array to fill for ewma
-        else:
-            # expected imbalance per tick
-            ewma_window = int(exp_num_ticks * num_prev_bars)
-            exp_tick_imb = ewma(
-                np.array(imbalance_array[-ewma_window:], dtype=float),
-                window=ewma_window,
-            )[-1]
+class ImbalanceBarBuilder(BarBuilder):
+    """
+    Builds dollar, volume or tick imbalance bars from a live feed, one micro-batch of ticks at a time, see
+    BarBuilder. The expected number of ticks and the imbalance history carry over between calls.
+    """
 
-        # Check min max
-        if price > high_price:
-            high_price = price
-        if price <= low_price:
-            low_price = price
+    def __init__(
+        self,
+        metric="dollar_imbalance",
+        exp_num_ticks_init=100000,
+        num_prev_bars=3,
+        num_ticks_ewma_window=20,
+    ):
+        """
+        :param metric: tick_imbalance, dollar_imbalance or volume_imbalance
+        :param exp_num_ticks_init: initial guess of number of ticks in imbalance bar
+        :param num_prev_bars: Number of previous bars used for EWMA window (window=num_prev_bars * bar length)
+                              for estimating expected imbalance (tick, volume or dollar)
+        :param num_ticks_ewma_window: EWMA window to estimate expected number of ticks in a bar based on previous bars
+        """
+        self.metric = metric
+        self.num_prev_bars = int(num_prev_bars)
+        self.num_ticks_ewma_window = int(num_ticks_ewma_window)
+        self._dtypes = {}
+        self.restore(
+            ImbalanceBarState.initial(
+                exp_num_ticks_init, num_prev_bars, num_ticks_ewma_window
+            )
+        )
 
-        # Update cache
-        cache_data = cache_tup(
-            date_time,
-            price,
-            high_price,
-            low_price,
-            tick_rule,
-            cum_volume,
-            cum_dollar_value,
-            cum_ticks,
-            cum_theta,
-            exp_num_ticks,
-            imbalance_array,
+    def snapshot(self):
+        """
+        :return: ImbalanceBarState. A copy of the state of the bar in progress, which can be pickled. Only the part
+                 of the history still needed is copied.
+        """
+        counters = self._counters.copy()
+        start, end = int(counters[_HIST_START]), int(counters[_HIST_END])
+        counters[_HIST_START], counters[_HIST_END] = 0, end - start
+        return ImbalanceBarState(
+            counters,
+            self._history[start:end].copy(),
+            self._num_ticks_bar.copy(),
+            self._date_time,
         )
-        cache.append(cache_data)
 
-        # Check expression for possible bar generation
-        if np.abs(cum_theta) > exp_num_ticks * np.abs(
-            exp_tick_imb
-        ):  # pylint: disable=eval-used
-            # Create bars
-            open_price = cache[0].price
-            low_price = min(low_price, open_price)
-            close_price = price
-            num_ticks_bar.append(cum_ticks)
-            expected_num_ticks_bar = ewma(
-                np.array(num_ticks_bar[-num_ticks_ewma_window:], dtype=float),
-                num_ticks_ewma_window,
-            )[
-                -1
-            ]  # expected number of ticks based on formed bars
-            # Update bars & Reset counters
-            list_bars.append(
-                [
-                    date_time,
-                    open_price,
-                    high_price,
-                    low_price,
-                    close_price,
-                    cum_volume,
-                    cum_dollar_value,
-                    cum_ticks,
-                ]
-            )
-            cum_ticks, cum_dollar_value, cum_volume, cum_theta = 0, 0, 0, 0
-            high_price, low_price = -np.inf, np.inf
-            exp_num_ticks = expected_num_ticks_bar
-            cache = []  # reset cache
-
-        # Update cache after bar generation (exp_num_ticks was changed after bar generation)
-        cache_data = cache_tup(
-            date_time,
-            price,
-            high_price,
-            low_price,
-            tick_rule,
-            cum_volume,
-            cum_dollar_value,
-            cum_ticks,
-            cum_theta,
-            exp_num_ticks,
-            imbalance_array,
+    def restore(self, state):
+        """
+        Resumes from a state returned by snapshot() or by the batch functions.
+
+        :param state: ImbalanceBarState
+        """
+        self._counters = state.counters.copy()
+        self._history = state.history.copy()
+        self._num_ticks_bar = state.num_ticks_bar.copy()
+        self._date_time = state.date_time
+        self._close_price = self._counters[_PREV_PRICE]
+
+    def _run(self, prices, volumes):
+        """
+        Runs the compiled kernel over the new ticks, updating the state in place.
+
+        :param prices: np.ndarray, float64. Price of each tick.
+        :param volumes: np.ndarray, float64. Volume of each tick.
+        :return: Positions of the closing ticks, float64 columns and int64 column cum_ticks.
+        """
+        imbalances = _batch_signed_flow(
+            prices, volumes, _METRICS[self.metric], self._counters, _PREV
         )
-        cache.append(cache_data)
-    return list_bars, cache, num_ticks_bar
+        end_idx, values, ticks, self._history = _imbalance_kernel(
+            prices,
+            volumes,
+            imbalances,
+            self.num_prev_bars,
+            self.num_ticks_ewma_window,
+            self._counters,
+            self._history,
+            self._num_ticks_bar,
+        )
+        return end_idx, values, ticks
+
+    def _reset_bar(self):
+        """
+        Starts a new bar at the close price of the last tick, the expected number of ticks is left as is.
+        """
+        super()._reset_bar()
+        self._counters[_CUM_THETA] = 0
 
 
 def _assert_dataframe(test_batch):
@@ -258,38 +583,48 @@ def _batch_run(
     num_prev_bars,
     num_ticks_ewma_window,
     batch_size=2e7,
+    progress=None,
+    output="frame",
+    tick_rules=None,
 ):
     """
-    Reads a csv file in batches and then constructs the financial data structure in the form of a DataFrame.
+    Reads the ticks in batches and then constructs the financial data structure in the form of a DataFrame.
 
-    The csv file must have only 3 columns: date_time, price, & volume.
+    The ticks must have only 3 columns: date_time, price, & volume.
 
-    :param df: a pandas.DataFrame containing the price and volume data.
+    :param df: a pandas.DataFrame containing the price and volume data, a TickStore, a path to a csv or
+               parquet file or an iterable of DataFrames, read in batches.
     :param metric: tick_imbalance, dollar_imbalance or volume_imbalance
     :param exp_num_ticks_init: initial expetected number of ticks per bar
     :param num_prev_bars: Number of previous bars used for EWMA window (window=num_prev_bars * bar length)
                           for estimating expected imbalance (tick, volume or dollar)
     :num_ticks_ewma_window: EWMA window for expected number of ticks calculations
     :param batch_size: The number of rows per batch. Less RAM = smaller batch size.
+    :param progress: Callable taking the BatchMetrics of each batch, e.g. print_progress. None to not measure.
+    :param output: frame, records or arrow
+    :param tick_rules: array-like. Tick rule of every tick of df, see tick_rule(). Computed if None.
     :return: Financial data structure
     """
-    print("Reading data in batches:")
+    _check_output(output)
 
     # Variables
     count = 0
     flag = False  # The first flag is false since the first batch doesn't use the cache
     cache = None
-    num_ticks_bar = None
-    final_bars = []
-
-    # Read in the first row & assert format
-    _assert_dataframe(df.iloc[0:1])
-
-    # Read csv in batches
-    for _, batch in df.groupby(np.arange(len(df)) // batch_size):
-
-        print("Batch number:", count)
-        list_bars, cache, num_ticks_bar = _extract_bars(
+    final_bars = BarColumns()
+    first = 0
+    meter = None if progress is None else _ProgressMeter(progress)
+    if tick_rules is not None:
+        # Converted once, each batch takes a slice
+        tick_rules = np.asarray(tick_rules, dtype=np.float64)
+
+    # Read in batches
+    for batch in _read_batches(df, batch_size):
+        if count == 0:
+            # Read in the first row & assert format
+            _assert_dataframe(batch.iloc[0:1])
+
+        *list_bars, cache = _extract_columns(
             data=batch,
             metric=metric,
             exp_num_ticks_init=exp_num_ticks_init,
@@ -297,43 +632,45 @@ def _batch_run(
             num_ticks_ewma_window=num_ticks_ewma_window,
             cache=cache,
             flag=flag,
-            num_ticks_bar=num_ticks_bar,
+            tick_rules=_batch_tick_rules(tick_rules, first, len(batch)),
         )
-        # Append to bars list
+        first += len(batch)
 
-        final_bars += list_bars
+        # Append to the bar columns
+        final_bars.append(*list_bars)
+        if meter is not None:
+            meter.update(len(batch), len(list_bars[2]), cache)
         count += 1
 
         # Set flag to True: notify function to use cache
         flag = True
 
-    # Return a DataFrame
-    cols = [
-        "date_time",
-        "open",
-        "high",
-        "low",
-        "close",
-        "cum_vol",
-        "cum_dollar",
-        "cum_ticks",
-    ]
-    bars_df = pd.DataFrame(final_bars, columns=cols)
-    print("Returning bars \n")
-    return bars_df
+    return final_bars.output(output)
 
 
 def get_dollar_imbalance_bars(
-    df, exp_num_ticks_init, num_prev_bars, num_ticks_ewma_window, batch_size=2e7
+    df,
+    exp_num_ticks_init,
+    num_prev_bars,
+    num_ticks_ewma_window,
+    batch_size=2e7,
+    progress=None,
+    output="frame",
+    tick_rules=None,
 ):
     """
     Creates the dollar imbalace bars: date_time, open, high, low, close, cum_vol, cum_dollar, and cum_ticks.
-    :param df: a pandas.DataFrame containing the price and volume data.
+    :param df: a pandas.DataFrame containing the price and volume data, a TickStore, a path to a csv or
+               parquet file or an iterable of DataFrames, read in batches.
     :param exp_num_ticks_init: initial expetected number of ticks per bar
     :param num_prev_bars: Number of previous bars used for EWMA window (window=num_prev_bars * bar length)
                           for estimating expected imbalance (tick, volume or dollar)
     :num_ticks_ewma_window: EWMA window for expected number of ticks calculations
     :param batch_size: The number of rows per batch. Less RAM = smaller batch size.
+    :param progress: Callable taking the BatchMetrics of each batch, e.g. print_progress. None to not measure.
+    :param output: frame for a DataFrame, records for a np.recarray or arrow for a pyarrow.Table (needs pyarrow)
+    :param tick_rules: array-like. Tick rule of every tick of df from tick_rule(), to reuse it across the tick,
+                       volume and dollar bars and parameter sweeps. Computed batch by batch if None.
     :return: Dataframe of dollar bars
     """
     return _batch_run(
@@ -343,20 +680,35 @@ def get_dollar_imbalance_bars(
         num_prev_bars=num_prev_bars,
         num_ticks_ewma_window=num_ticks_ewma_window,
         batch_size=batch_size,
+        progress=progress,
+        output=output,
+        tick_rules=tick_rules,
     )
 
 
 def get_volume_imbalance_bars(
-    df, exp_num_ticks_init, num_prev_bars, num_ticks_ewma_window, batch_size=2e7
+    df,
+    exp_num_ticks_init,
+    num_prev_bars,
+    num_ticks_ewma_window,
+    batch_size=2e7,
+    progress=None,
+    output="frame",
+    tick_rules=None,
 ):
     """
     Creates the volume imbalace bars: date_time, open, high, low, close, cum_vol, cum_dollar, and cum_ticks.
-    :param df: a pandas.DataFrame containing the price and volume data.
+    :param df: a pandas.DataFrame containing the price and volume data, a TickStore, a path to a csv or
+               parquet file or an iterable of DataFrames, read in batches.
     :param exp_num_ticks_init: initial expetected number of ticks per bar
     :param num_prev_bars: Number of previous bars used for EWMA window (window=num_prev_bars * bar length)
                           for estimating expected imbalance (tick, volume or dollar)
     :num_ticks_ewma_window: EWMA window for expected number of ticks calculations
     :param batch_size: The number of rows per batch. Less RAM = smaller batch size.
+    :param progress: Callable taking the BatchMetrics of each batch, e.g. print_progress. None to not measure.
+    :param output: frame for a DataFrame, records for a np.recarray or arrow for a pyarrow.Table (needs pyarrow)
+    :param tick_rules: array-like. Tick rule of every tick of df from tick_rule(), to reuse it across the tick,
+                       volume and dollar bars and parameter sweeps. Computed batch by batch if None.
     :return: Dataframe of dollar bars
     """
     return _batch_run(
@@ -366,20 +718,35 @@ def get_volume_imbalance_bars(
         num_prev_bars=num_prev_bars,
         num_ticks_ewma_window=num_ticks_ewma_window,
         batch_size=batch_size,
+        progress=progress,
+        output=output,
+        tick_rules=tick_rules,
     )
 
 
 def get_tick_imbalance_bars(
-    df, exp_num_ticks_init, num_prev_bars, num_ticks_ewma_window, batch_size=2e7
+    df,
+    exp_num_ticks_init,
+    num_prev_bars,
+    num_ticks_ewma_window,
+    batch_size=2e7,
+    progress=None,
+    output="frame",
+    tick_rules=None,
 ):
     """
     Creates the tick imbalace bars: date_time, open, high, low, close, cum_vol, cum_dollar, and cum_ticks.
-    :param df: a pandas.DataFrame containing the price and volume data.
+    :param df: a pandas.DataFrame containing the price and volume data, a TickStore, a path to a csv or
+               parquet file or an iterable of DataFrames, read in batches.
     :param exp_num_ticks_init: initial expetected number of ticks per bar
     :param num_prev_bars: Number of previous bars used for EWMA window (window=num_prev_bars * bar length)
                           for estimating expected imbalance (tick, volume or dollar)
     :num_ticks_ewma_window: EWMA window for expected number of ticks calculations
     :param batch_size: The number of rows per batch. Less RAM = smaller batch size.
+    :param progress: Callable taking the BatchMetrics of each batch, e.g. print_progress. None to not measure.
+    :param output: frame for a DataFrame, records for a np.recarray or arrow for a pyarrow.Table (needs pyarrow)
+    :param tick_rules: array-like. Tick rule of every tick of df from tick_rule(), to reuse it across the tick,
+                       volume and dollar bars and parameter sweeps. Computed batch by batch if None.
     :return: Dataframe of dollar bars
     """
     return _batch_run(
@@ -389,4 +756,7 @@ def get_tick_imbalance_bars(
         num_prev_bars=num_prev_bars,
         num_ticks_ewma_window=num_ticks_ewma_window,
         batch_size=batch_size,
+        progress=progress,
+        output=output,
+        tick_rules=tick_rules,
     )
@@ -0,0 +1,153 @@
+"""
+Builds the bars of many symbols at once, spreading the symbols across a process pool.
+
+The ticks of all symbols are copied once into three shared memory blocks (date_time, price and volume columns)
+and the workers build the bars of a symbol from views on its rows, so no DataFrame is pickled on the way in;
+only the bars, which are far smaller, are sent back.
+"""
+
+# Imports
+import os
+import time
+import numpy as np
+import pandas as pd
+from mlfinlab.util.multiprocess import SharedArrays, process_pool
+from . import balance, imbalance, run
+from .tick_store import _date_time_ns
+
+# Bar kind: module building it, metric and parameters of its _extract_bars()
+_KINDS = {
+    "dollar": (balance, "cum_dollar_value"),
+    "volume": (balance, "cum_volume"),
+    "tick": (balance, "cum_ticks"),
+    "dollar_imbalance": (imbalance, "dollar_imbalance"),
+    "volume_imbalance": (imbalance, "volume_imbalance"),
+    "tick_imbalance": (imbalance, "tick_imbalance"),
+    "dollar_run": (run, "dollar_run"),
+    "volume_run": (run, "volume_run"),
+    "tick_run": (run, "tick_run"),
+}
+
+# Shared memory columns and their dtypes
+_COLUMNS = {"date_time": np.int64, "price": np.float64, "volume": np.float64}
+
+
+def build_bars_many(symbol_frames, kind="dollar", n_jobs=None, **kwargs):
+    """
+    Creates the bars of many symbols, one symbol per task of a process pool.
+
+    The largest symbols are started first so the pool is not left waiting on a long symbol at the end. The
+    date_time of the bars is datetime64[ns], a tz-aware date_time is converted to UTC.
+
+    :param symbol_frames: Dict of symbol to a pandas.DataFrame with 3 columns - date_time, price, and volume,
+                          or an iterable of (symbol, DataFrame) pairs.
+    :param kind: dollar, volume, tick, dollar_imbalance, volume_imbalance, tick_imbalance, dollar_run,
+                 volume_run or tick_run
+    :param n_jobs: Number of processes, None for the number of CPUs. 1 builds the bars in this process.
+    :param kwargs: Parameters of the bars, e.g. threshold, or exp_num_ticks_init, num_prev_bars and
+                   num_ticks_ewma_window.
+    :return: Dict of symbol to its bars, in input order, and a DataFrame of the number of ticks, number of bars
+             and seconds taken by each symbol, indexed by symbol.
+    """
+    if kind not in _KINDS:
+        raise ValueError(
+            "kind must be one of {}, got {!r}".format(", ".join(_KINDS), kind)
+        )
+    if isinstance(symbol_frames, dict):
+        symbol_frames = symbol_frames.items()
+    module = _KINDS[kind][0]
+    symbols, frames = [], []
+    for symbol, frame in symbol_frames:
+        if len(frame):
+            # Assert the format of the ticks here, the workers read the shared columns as is
+            module._assert_dataframe(frame.iloc[0:1])
+        symbols.append(symbol)
+        frames.append(frame)
+
+    offsets = np.zeros(len(frames) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(frame) for frame in frames])
+    n_jobs = os.cpu_count() if n_jobs is None else n_jobs
+
+    layout = {column: (int(offsets[-1]), dtype) for column, dtype in _COLUMNS.items()}
+    with SharedArrays(layout) as columns:
+        # Copy the ticks into shared memory
+        for k, frame in enumerate(frames):
+            rows = slice(offsets[k], offsets[k + 1])
+            columns["date_time"][rows] = _date_time_ns(frame.iloc[:, 0])
+            columns["price"][rows] = frame.iloc[:, 1].to_numpy(dtype=np.float64)
+            columns["volume"][rows] = frame.iloc[:, 2].to_numpy(dtype=np.float64)
+        frames = None
+
+        largest_first = np.argsort(-np.diff(offsets), kind="stable")
+        if n_jobs == 1:
+            results = {
+                k: _build_bars(columns, offsets[k], offsets[k + 1], kind, kwargs)
+                for k in largest_first
+            }
+        else:
+            with process_pool(n_jobs) as executor:
+                futures = {
+                    k: executor.submit(
+                        _build_shared_bars,
+                        layout,
+                        columns.names,
+                        offsets[k],
+                        offsets[k + 1],
+                        kind,
+                        kwargs,
+                    )
+                    for k in largest_first
+                }
+                results = {k: future.result() for k, future in futures.items()}
+
+    bars = {symbols[k]: results[k][0] for k in range(len(symbols))}
+    timings = pd.DataFrame(
+        {
+            "ticks": np.diff(offsets),
+            "bars": [len(results[k][0]) for k in range(len(symbols))],
+            "seconds": [results[k][1] for k in range(len(symbols))],
+        },
+        index=pd.Index(symbols, name="symbol"),
+    )
+    return bars, timings
+
+
+def _build_bars(columns, first, last, kind, kwargs):
+    """
+    Builds the bars of the ticks first..last of the columns.
+
+    :param columns: SharedArrays of the date_time, price and volume columns.
+    :param first: Position of the first tick of the symbol.
+    :param last: Position after the last tick of the symbol.
+    :param kind: Kind of bars, see build_bars_many().
+    :param kwargs: Parameters of the bars.
+    :return: The bars and the seconds taken to build them.
+    """
+    start = time.perf_counter()
+    data = pd.DataFrame(
+        {
+            "date_time": columns["date_time"][first:last].view("datetime64[ns]"),
+            "price": columns["price"][first:last],
+            "volume": columns["volume"][first:last],
+        },
+        copy=False,
+    )
+    module, metric = _KINDS[kind]
+    bars, _ = module._extract_bars(data=data, metric=metric, **kwargs)
+    return bars, time.perf_counter() - start
+
+
+def _build_shared_bars(layout, names, first, last, kind, kwargs):
+    """
+    Attaches to the shared memory blocks and builds the bars of a symbol, in a worker process.
+
+    :param layout: Dict of column to its shape and dtype.
+    :param names: Dict of column to the name of its SharedMemory block.
+    :param first: Position of the first tick of the symbol.
+    :param last: Position after the last tick of the symbol.
+    :param kind: Kind of bars, see build_bars_many().
+    :param kwargs: Parameters of the bars.
+    :return: The bars and the seconds taken to build them.
+    """
+    with SharedArrays(layout, names) as columns:
+        return _build_bars(columns, first, last, kind, kwargs)
@@ -0,0 +1,102 @@
+"""
+Progress and throughput metrics of the batch bar functions.
+
+The get_*_bars functions take a ``progress`` callable which is called after every batch with the BatchMetrics of
+that batch, e.g. ``progress=print_progress`` to log them or ``progress=metrics.append`` to collect them for a
+dashboard. Without a callable nothing is measured.
+"""
+
+# Imports
+import time
+from dataclasses import dataclass
+
+
+@dataclass
+class BatchMetrics:
+    """
+    Metrics of a batch of ticks run by a batch bar function, and of the run so far.
+
+    The seconds of a batch include reading it, e.g. from a csv file.
+    """
+
+    batch: int
+    ticks: int
+    bars: int
+    seconds: float
+    total_ticks: int
+    total_bars: int
+    total_seconds: float
+    cache_bytes: int
+    peak_cache_bytes: int
+
+    @property
+    def ticks_per_second(self):
+        """
+        :return: Ticks of the batch run per second.
+        """
+        return self.ticks / self.seconds if self.seconds > 0 else float("inf")
+
+
+def print_progress(metrics):
+    """
+    Prints one line per batch.
+
+    :param metrics: BatchMetrics of the batch.
+    """
+    print(
+        "Batch {}: {} ticks, {} bars in {:.3f}s ({:,.0f} ticks/s), cache {} bytes".format(
+            metrics.batch,
+            metrics.ticks,
+            metrics.bars,
+            metrics.seconds,
+            metrics.ticks_per_second,
+            metrics.cache_bytes,
+        )
+    )
+
+
+class _ProgressMeter:
+    """
+    Measures the batches of a batch bar function and reports them to its progress callable.
+    """
+
+    def __init__(self, progress):
+        """
+        :param progress: Callable taking the BatchMetrics of each batch.
+        """
+        self.progress = progress
+        self.batch = 0
+        self.total_ticks = 0
+        self.total_bars = 0
+        self.peak_cache_bytes = 0
+        self.start = self.last = time.perf_counter()
+
+    def update(self, ticks, bars, cache):
+        """
+        :param ticks: Number of ticks of the batch.
+        :param bars: Number of bars closed by the batch.
+        :param cache: Carry-over state of the bar in progress after the batch, or a list of them with thresholds.
+        """
+        now = time.perf_counter()
+        if isinstance(cache, list):
+            cache_bytes = sum(state.nbytes for state in cache)
+        else:
+            cache_bytes = cache.nbytes
+        self.total_ticks += ticks
+        self.total_bars += bars
+        self.peak_cache_bytes = max(self.peak_cache_bytes, cache_bytes)
+        self.progress(
+            BatchMetrics(
+                batch=self.batch,
+                ticks=ticks,
+                bars=bars,
+                seconds=now - self.last,
+                total_ticks=self.total_ticks,
+                total_bars=self.total_bars,
+                total_seconds=now - self.start,
+                cache_bytes=cache_bytes,
+                peak_cache_bytes=self.peak_cache_bytes,
+            )
+        )
+        self.batch += 1
+        self.last = now
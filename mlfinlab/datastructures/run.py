@@ -13,62 +13,422 @@ A great paper to read more about this is titled: The Volume Clock: Insights into
 """
 
 # Imports
-from collections import namedtuple
+from dataclasses import dataclass
 import pandas as pd
 import numpy as np
-from .ewma import ewma
+from numba import njit
+from .balance import BarBuilder, _bar_buffers, _grow_bars, _read_batches
+from .ewma import ewma_push, ewma_state
+from .columns import BarColumns, _check_output
+from .progress import _ProgressMeter
+from .signed_flow import _batch_signed_flow, _batch_tick_rules
+
+# Metric codes understood by the compiled bar kernel
+_METRICS = {"tick_run": 0, "dollar_run": 1, "volume_run": 2}
+
+# Positions in the counters array carried between batches
+(
+    _OPEN,
+    _HIGH,
+    _LOW,
+    _CUM_VOLUME,
+    _CUM_DOLLAR,
+    _CUM_TICKS,
+    _CUM_THETA_BUY,
+    _CUM_THETA_SELL,
+    _EXP_NUM_TICKS,
+    _PREV_PRICE,
+    _PREV_TICK_RULE,
+    _NUM_TICKS,
+    _MAX_NUM_TICKS_BAR,
+    _NUM_BARS,
+    _HIST_START,
+    _HIST_END,
+    _EWMA_WINDOW,
+    _EWMA_LENGTH,
+    _EWMA_SLIDES,
+    _EWMA_WEIGHT,
+    _EWMA_POWER,
+    _EWMA_BUY,
+    _EWMA_SELL,
+    _SUM_BUY,
+    _SUM_SELL,
+) = range(25)
+
+# Positions of the previous price and tick rule, carried over by the signed flow of each batch
+_PREV = (_PREV_PRICE, _PREV_TICK_RULE)
+
+
+@dataclass
+class RunBarState:
+    """
+    Carry-over state of the run bar in progress, passed from one batch to the next.
+
+    counters holds the scalar state (see the _OPEN ... _SUM_SELL positions), history[counters[_HIST_START]:
+    counters[_HIST_END]] the buy and sell imbalances still needed by the expected proportions and num_ticks_bar
+    the number of ticks of the last num_ticks_ewma_window bars.
+    """
 
+    counters: np.ndarray
+    history: np.ndarray
+    num_ticks_bar: np.ndarray
+    date_time: object = None
+
+    @classmethod
+    def initial(cls, exp_num_ticks_init, num_prev_bars, num_ticks_ewma_window):
+        """
+        :param exp_num_ticks_init: initial guess of number of ticks in run bar
+        :param num_prev_bars: Number of previous bars used for EWMA window
+        :param num_ticks_ewma_window: EWMA window to estimate expected number of ticks in a bar
+        :return: RunBarState before the first tick
+        """
+        counters = np.zeros(25, dtype=np.float64)
+        counters[[_OPEN, _PREV_PRICE]] = np.nan
+        counters[_HIGH], counters[_LOW] = -np.inf, np.inf
+        counters[_EXP_NUM_TICKS] = exp_num_ticks_init
+        counters[_EWMA_WINDOW] = int(exp_num_ticks_init * num_prev_bars)
+        return cls(
+            counters=counters,
+            history=np.empty((1024, 2), dtype=np.float64),
+            num_ticks_bar=np.empty(int(num_ticks_ewma_window), dtype=np.float64),
+        )
 
-def _get_updated_counters(cache, flag, exp_num_ticks_init):
+    @property
+    def nbytes(self):
+        """
+        :return: Bytes taken by the arrays of the state.
+        """
+        return self.counters.nbytes + self.history.nbytes + self.num_ticks_bar.nbytes
+
+
+def _get_updated_counters(
+    cache, flag, exp_num_ticks_init, num_prev_bars, num_ticks_ewma_window
+):
     """
     Updates the counters by resetting them or making use of the cache to update them based on a previous batch.
 
-    :param cache: Contains information from the previous batch that is relevant in this batch.
+    :param cache: RunBarState from the previous batch.
     :param flag: A flag which signals to use the cache.
-    :param exp_num_ticks: Expected number of ticks per bar
-    :return: Updated counters - cum_ticks, cum_dollar_value, cum_volume, high_price, low_price, exp_num_ticks, imbalance_array
+    :param exp_num_ticks_init: initial guess of number of ticks in run bar
+    :param num_prev_bars: Number of previous bars used for EWMA window
+    :param num_ticks_ewma_window: EWMA window to estimate expected number of ticks in a bar
+    :return: Updated counters, buy and sell imbalance history and number of ticks of previous bars
     """
     # Check flag
-    if flag and cache:
-        # Update variables based on cache
-        cum_ticks = int(cache[-1].cum_ticks)
-        cum_dollar_value = np.float64(cache[-1].cum_dollar_value)
-        cum_volume = cache[-1].cum_volume
-        low_price = np.float64(cache[-1].low)
-        high_price = np.float64(cache[-1].high)
-        # cumulative buy and sell imbalances for a particular run calculation (theta_t in Prado book)
-        cum_theta_buy = np.float64(cache[-1].cum_theta_buy)
-        cum_theta_sell = np.float64(cache[-1].cum_theta_sell)
-        # expected number of ticks extracted from prev bars
-        exp_num_ticks = np.float64(cache[-1].exp_num_ticks)
-        # array of latest imbalances
-        imbalance_array = cache[-1].imbalance_array
-    else:
+    if not (flag and cache is not None):
         # Reset counters
-        cum_ticks, cum_dollar_value, cum_volume, cum_theta_buy, cum_theta_sell = (
-            0,
-            0,
-            0,
-            0,
-            0,
+        cache = RunBarState.initial(
+            exp_num_ticks_init, num_prev_bars, num_ticks_ewma_window
         )
-        high_price, low_price = -np.inf, np.inf
-        exp_num_ticks, imbalance_array = exp_num_ticks_init, {
-            "buy": [],
-            "sell": [],
-        }  # in run bars we need to track both buy and sell imbalance
+    return cache.counters.copy(), cache.history, cache.num_ticks_bar.copy()
 
-    return (
-        cum_ticks,
-        cum_dollar_value,
-        cum_volume,
-        cum_theta_buy,
-        cum_theta_sell,
-        high_price,
-        low_price,
-        exp_num_ticks,
-        imbalance_array,
-    )
+
+@njit(nogil=True, cache=True)
+def _window_state(history, end, length, window):
+    """
+    Exact buy and sell EWMA numerators, weight and sums over the last ``length`` rows of the history,
+    computed in the same order as ewma() and sum() over the window.
+
+    :param history: np.ndarray, float64. Buy and sell imbalances.
+    :param end: int64. Position after the newest row.
+    :param length: int64. Number of rows in the window.
+    :param window: int64. The decay window, or 'span'
+    :return: weight, power, buy numerator, sell numerator, buy sum, sell sum
+    """
+    buy, weight, power = ewma_state(history[end - length : end, 0], window)
+    sell, _, _ = ewma_state(history[end - length : end, 1], window)
+    sum_buy, sum_sell = 0.0, 0.0
+    for j in range(end - length, end):
+        sum_buy += history[j, 0]
+        sum_sell += history[j, 1]
+    return weight, power, buy, sell, sum_buy, sum_sell
+
+
+@njit(nogil=True, cache=True)
+def _run_loop(
+    prices,
+    volumes,
+    imbalances,
+    first,
+    last,
+    num_prev_bars,
+    num_ticks_ewma_window,
+    counters,
+    history,
+    num_ticks_bar,
+    end_idx,
+    values,
+    ticks,
+    num_bars,
+):
+    """
+    Runs the ticks from ``first`` up to ``last`` into the run bar in progress, writing the bars closed into the
+    output buffers, until the output buffers or the history are full. None of them is reallocated here, see
+    _bar_loop().
+
+    :param prices: np.ndarray, float64. Price of each tick.
+    :param volumes: np.ndarray, float64. Volume of each tick.
+    :param imbalances: np.ndarray, float64. Signed flow of each tick, see signed_flow().
+    :param first: int64. Position of the first tick to run.
+    :param last: int64. Position after the last tick to run.
+    :param num_prev_bars: int64. Number of previous bars used for EWMA window
+    :param num_ticks_ewma_window: int64. EWMA window to estimate expected number of ticks in a bar
+    :param counters: np.ndarray, float64. Scalar state of the bar in progress, updated in place.
+    :param history: np.ndarray, float64. Buffer of buy and sell imbalances.
+    :param num_ticks_bar: np.ndarray, float64. Number of ticks of the previous bars, updated in place.
+    :param end_idx: np.ndarray, int64. Positions of the closing ticks.
+    :param values: np.ndarray, float64. Columns open, high, low, close, cum_vol and cum_dollar of the bars.
+    :param ticks: np.ndarray, int64. Column cum_ticks of the bars.
+    :param num_bars: int64. Number of bars already in the buffers.
+    :return: Position of the next tick to run and number of bars in the buffers.
+    """
+    open_price = counters[_OPEN]
+    high_price = counters[_HIGH]
+    low_price = counters[_LOW]
+    cum_volume = counters[_CUM_VOLUME]
+    cum_dollar_value = counters[_CUM_DOLLAR]
+    cum_ticks = np.int64(counters[_CUM_TICKS])
+    cum_theta_buy = counters[_CUM_THETA_BUY]
+    cum_theta_sell = counters[_CUM_THETA_SELL]
+    exp_num_ticks = counters[_EXP_NUM_TICKS]
+    num_ticks = np.int64(counters[_NUM_TICKS])
+    max_num_ticks_bar = np.int64(counters[_MAX_NUM_TICKS_BAR])
+    num_prev_ticks_bar = np.int64(counters[_NUM_BARS])
+    start = np.int64(counters[_HIST_START])
+    end = np.int64(counters[_HIST_END])
+    ewma_window = np.int64(counters[_EWMA_WINDOW])
+    ewma_length = np.int64(counters[_EWMA_LENGTH])
+    ewma_slides = np.int64(counters[_EWMA_SLIDES])
+    weight = counters[_EWMA_WEIGHT]
+    power = counters[_EWMA_POWER]
+    ewma_buy = counters[_EWMA_BUY]
+    ewma_sell = counters[_EWMA_SELL]
+    sum_buy = counters[_SUM_BUY]
+    sum_sell = counters[_SUM_SELL]
+
+    i = first
+    while i < last and num_bars < end_idx.shape[0] and end < history.shape[0]:
+        price = prices[i]
+        volume = volumes[i]
+        if np.isnan(open_price):
+            open_price = price
+
+        # Calculations
+        cum_ticks += 1
+        cum_dollar_value = cum_dollar_value + price * volume
+        cum_volume = cum_volume + volume
+
+        imbalance = imbalances[i]
+
+        if imbalance != 0:
+            if imbalance > 0:
+                buy, sell = imbalance, 0.0
+                cum_theta_buy += imbalance
+            else:
+                buy, sell = 0.0, abs(imbalance)
+                cum_theta_sell += abs(imbalance)
+
+            history[end, 0] = buy
+            history[end, 1] = sell
+            end += 1
+            num_ticks += 1
+
+            # Carry the buy and sell EWMAs and sums forward
+            dropped = max(end - 1 - ewma_window, start)
+            if ewma_length < ewma_window:
+                sum_buy += buy
+                sum_sell += sell
+            else:
+                sum_buy += buy - history[dropped, 0]
+                sum_sell += sell - history[dropped, 1]
+                ewma_slides += 1
+            ewma_buy, _, _, _ = ewma_push(
+                ewma_buy,
+                weight,
+                power,
+                ewma_length,
+                ewma_window,
+                buy,
+                history[dropped, 0],
+            )
+            ewma_sell, weight, power, ewma_length = ewma_push(
+                ewma_sell,
+                weight,
+                power,
+                ewma_length,
+                ewma_window,
+                sell,
+                history[dropped, 1],
+            )
+            if ewma_slides == ewma_window:
+                weight, power, ewma_buy, ewma_sell, sum_buy, sum_sell = _window_state(
+                    history, end, ewma_length, ewma_window
+                )
+                ewma_slides = 0
+
+        if num_ticks < exp_num_ticks:
+            # waiting for array to fill for ewma
+            exp_buy_proportion, exp_sell_proportion = np.nan, np.nan
+        else:
+            # expected imbalance per tick
+            buy_and_sell_imb = sum_buy + sum_sell
+            exp_buy_proportion = ewma_buy / weight / buy_and_sell_imb
+            exp_sell_proportion = ewma_sell / weight / buy_and_sell_imb
+
+        # Check min max
+        if price > high_price:
+            high_price = price
+        if price <= low_price:
+            low_price = price
+
+        # Check expression for possible bar generation
+        max_theta = cum_theta_sell if cum_theta_sell > cum_theta_buy else cum_theta_buy
+        if exp_sell_proportion > exp_buy_proportion:
+            max_proportion = exp_sell_proportion
+        else:
+            max_proportion = exp_buy_proportion
+        if max_theta > exp_num_ticks * max_proportion:
+            end_idx[num_bars] = i
+            values[num_bars, 0] = open_price
+            values[num_bars, 1] = high_price
+            values[num_bars, 2] = min(low_price, open_price)
+            values[num_bars, 3] = price
+            values[num_bars, 4] = cum_volume
+            values[num_bars, 5] = cum_dollar_value
+            ticks[num_bars] = cum_ticks
+            num_bars += 1
+
+            # expected number of ticks based on formed bars
+            if num_prev_ticks_bar < num_ticks_ewma_window:
+                num_prev_ticks_bar += 1
+            else:
+                num_ticks_bar[:-1] = num_ticks_bar[1:]
+            num_ticks_bar[num_prev_ticks_bar - 1] = cum_ticks
+            bar_numerator, bar_weight, _ = ewma_state(
+                num_ticks_bar[:num_prev_ticks_bar], num_ticks_ewma_window
+            )
+            exp_num_ticks = bar_numerator / bar_weight
+            max_num_ticks_bar = max(max_num_ticks_bar, cum_ticks)
+
+            # Reset counters, the close of this bar is the open of the next one
+            open_price = price
+            high_price, low_price = -np.inf, np.inf
+            cum_volume, cum_dollar_value, cum_ticks = 0.0, 0.0, 0
+            cum_theta_buy, cum_theta_sell = 0.0, 0.0
+
+            # Rebuild the buy and sell EWMAs and sums for the new window
+            window = np.int64(exp_num_ticks * num_prev_bars)
+            if window != ewma_window:
+                ewma_window = window
+                ewma_length = min(num_ticks, ewma_window)
+                ewma_slides = 0
+                if ewma_length > 0:
+                    weight, power, ewma_buy, ewma_sell, sum_buy, sum_sell = (
+                        _window_state(history, end, ewma_length, ewma_window)
+                    )
+
+            # Drop the imbalances no future window can reach
+            start = max(start, end - (num_prev_bars * max_num_ticks_bar + 1))
+        i += 1
+
+    counters[_OPEN] = open_price
+    counters[_HIGH] = high_price
+    counters[_LOW] = low_price
+    counters[_CUM_VOLUME] = cum_volume
+    counters[_CUM_DOLLAR] = cum_dollar_value
+    counters[_CUM_TICKS] = cum_ticks
+    counters[_CUM_THETA_BUY] = cum_theta_buy
+    counters[_CUM_THETA_SELL] = cum_theta_sell
+    counters[_EXP_NUM_TICKS] = exp_num_ticks
+    counters[_NUM_TICKS] = num_ticks
+    counters[_MAX_NUM_TICKS_BAR] = max_num_ticks_bar
+    counters[_NUM_BARS] = num_prev_ticks_bar
+    counters[_HIST_START] = start
+    counters[_HIST_END] = end
+    counters[_EWMA_WINDOW] = ewma_window
+    counters[_EWMA_LENGTH] = ewma_length
+    counters[_EWMA_SLIDES] = ewma_slides
+    counters[_EWMA_WEIGHT] = weight
+    counters[_EWMA_POWER] = power
+    counters[_EWMA_BUY] = ewma_buy
+    counters[_EWMA_SELL] = ewma_sell
+    counters[_SUM_BUY] = sum_buy
+    counters[_SUM_SELL] = sum_sell
+    return i, num_bars
+
+
+@njit(nogil=True, cache=True)
+def _run_kernel(
+    prices,
+    volumes,
+    imbalances,
+    num_prev_bars,
+    num_ticks_ewma_window,
+    counters,
+    history,
+    num_ticks_bar,
+):
+    """
+    Compiled loop which compiles the various run bars: dollar, volume, or tick.
+
+    The expected buy and sell proportions are the last values of ewma() over the last
+    exp_num_ticks * num_prev_bars buy and sell imbalances, divided by their sum. The EWMAs are carried forward
+    in O(1) per tick with ewma_push() and the sums as rolling sums; they are identical bit for bit while the
+    window fills up and are recomputed exactly whenever a bar changes the window and after every ``window``
+    slides, so the rolling sums can not drift and values agree with the windowed computation up to rounding.
+
+    Only the imbalances which can still fall in a future window are kept: the expected number of ticks is an
+    EWMA of past bar lengths, so no window reaches further back than num_prev_bars times the longest bar. Ticks
+    without imbalance are not added to the history, so it holds at most that many rows.
+
+    :param prices: np.ndarray, float64. Price of each tick.
+    :param volumes: np.ndarray, float64. Volume of each tick.
+    :param imbalances: np.ndarray, float64. Signed flow of each tick, see signed_flow().
+    :param num_prev_bars: int64. Number of previous bars used for EWMA window
+    :param num_ticks_ewma_window: int64. EWMA window to estimate expected number of ticks in a bar
+    :param counters: np.ndarray, float64. Scalar state of the bar in progress, updated in place.
+    :param history: np.ndarray, float64. Buffer of buy and sell imbalances, reallocated when full.
+    :param num_ticks_bar: np.ndarray, float64. Number of ticks of the previous bars, updated in place.
+    :return: Positions of the closing ticks, float64 columns (open, high, low, close, cum_vol, cum_dollar),
+             int64 column cum_ticks and the history buffer.
+    """
+    end_idx, values, ticks = _bar_buffers(64)
+    num_bars = 0
+
+    i = 0
+    while True:
+        i, num_bars = _run_loop(
+            prices,
+            volumes,
+            imbalances,
+            i,
+            prices.shape[0],
+            num_prev_bars,
+            num_ticks_ewma_window,
+            counters,
+            history,
+            num_ticks_bar,
+            end_idx,
+            values,
+            ticks,
+            num_bars,
+        )
+        if i == prices.shape[0]:
+            break
+
+        if num_bars == end_idx.shape[0]:
+            end_idx, values, ticks = _grow_bars(end_idx, values, ticks, num_bars)
+        start = np.int64(counters[_HIST_START])
+        end = np.int64(counters[_HIST_END])
+        if end == history.shape[0]:
+            # Move the imbalances still needed to the front of a new buffer
+            retained = end - start
+            history_new = np.empty((max(2 * retained, 1024), 2), dtype=np.float64)
+            history_new[:retained] = history[start:end]
+            history = history_new
+            counters[_HIST_START], counters[_HIST_END] = 0, retained
+
+    return end_idx[:num_bars], values[:num_bars], ticks[:num_bars], history
 
 
 def _extract_bars(
@@ -79,192 +439,170 @@ def _extract_bars(
     num_ticks_ewma_window=20,
     cache=None,
     flag=False,
-    num_ticks_bar=None,
+    tick_rules=None,
 ):
     """
-    For loop which compiles the various imbalance bars: dollar, volume, or tick.
+    Runs the compiled run bar kernel over one batch of ticks: dollar, volume, or tick.
 
     :param data: Contains 3 columns - date_time, price, and volume.
-    :param metric: dollar_imbalance, volume_imbalance or tick_imbalance
-    :param exp_num_ticks_init: initial guess of number of ticks in imbalance bar
+    :param metric: dollar_run, volume_run or tick_run
+    :param exp_num_ticks_init: initial guess of number of ticks in run bar
     :param num_prev_bars: Number of previous bars used for EWMA window (window=num_prev_bars * bar length)
                           for estimating expected imbalance (tick, volume or dollar)
     :param num_ticks_ewma_window: EWMA window to estimate expected number of ticks in a bar based on previous bars
-    :param cache: contains information from the previous batch that is relevant in this batch.
+    :param cache: RunBarState of the bar in progress at the end of the previous batch.
     :param flag: A flag which signals to use the cache.
-    :param num_ticks_bar: Expected number of ticks per bar used to estimate the next bar
-    :param prev_tick_rule: Previous tick rule (if price_diff == 0 => use previous tick rule)
-    :return: The financial data structure with the cache of short term history.
+    :param tick_rules: np.ndarray, float64. Tick rule of each tick of the batch, see tick_rule(). Computed if None.
+    :return: The financial data structure with the RunBarState of the bar in progress.
     """
-    cache_tup = namedtuple(
-        "CacheData",
-        [
-            "date_time",
-            "price",
-            "high",
-            "low",
-            "tick_rule",
-            "cum_volume",
-            "cum_dollar_value",
-            "cum_ticks",
-            "cum_theta_buy",
-            "cum_theta_sell",
-            "exp_num_ticks",
-            "imbalance_array",
-        ],
+    *bars, cache = _extract_columns(
+        data,
+        metric,
+        exp_num_ticks_init,
+        num_prev_bars,
+        num_ticks_ewma_window,
+        cache,
+        flag,
+        tick_rules,
     )
-    if cache is None:
-        cache = []
-        prev_tick_rule = 0  # set the first tick rule with 0
-        num_ticks_bar = []  # array of number of ticks from previous bars
-
-    list_bars = []
-    (
-        cum_ticks,
-        cum_dollar_value,
-        cum_volume,
-        cum_theta_buy,
-        cum_theta_sell,
-        high_price,
-        low_price,
-        exp_num_ticks,
-        imbalance_array,
-    ) = _get_updated_counters(cache, flag, exp_num_ticks_init)
-
-    # Iterate over rows
-    for row in data.values:
-        # Set variables
-        date_time = row[0]
-        price = np.float64(row[1])
-        volume = row[2]
+    columns = BarColumns(len(bars[2]))
+    columns.append(*bars)
+    return columns.frame(), cache
 
-        # Calculations
-        cum_ticks += 1
-        dollar_value = price * volume
-        cum_dollar_value = cum_dollar_value + dollar_value
-        cum_volume = cum_volume + volume
 
-        # Imbalance calculations
-        try:
-            tick_diff = price - cache[-1].price
-            prev_tick_rule = cache[-1].tick_rule
-        except IndexError:
-            tick_diff = 0
-
-        tick_rule = np.sign(tick_diff) if tick_diff != 0 else prev_tick_rule
-
-        if metric == "tick_run":
-            imbalance = tick_rule
-        elif metric == "dollar_run":
-            imbalance = tick_rule * volume * price
-        elif metric == "volume_run":
-            imbalance = tick_rule * volume
-
-        if imbalance > 0:
-            imbalance_array["buy"].append(imbalance)
-            # set zero to keep buy and sell arrays synced
-            imbalance_array["sell"].append(0)
-            cum_theta_buy += imbalance
-        elif imbalance < 0:
-            imbalance_array["sell"].append(abs(imbalance))
-            imbalance_array["buy"].append(0)
-            cum_theta_sell += abs(imbalance)
-
-        if len(imbalance_array["buy"]) < exp_num_ticks:
-            # waiting for array to fill for ewma
-            exp_buy_proportion, exp_sell_proportion = np.nan, np.nan
-        else:
-            # expected imbalance per tick
-            ewma_window = int(exp_num_ticks * num_prev_bars)
-            buy_sample = np.array(imbalance_array["buy"][-ewma_window:], dtype=float)
-            sell_sample = np.array(imbalance_array["sell"][-ewma_window:], dtype=float)
-            buy_and_sell_imb = sum(buy_sample) + sum(sell_sample)
-            exp_buy_proportion = (
-                ewma(buy_sample, window=ewma_window)[-1] / buy_and_sell_imb
-            )
-            exp_sell_proportion = (
-                ewma(sell_sample, window=ewma_window)[-1] / buy_and_sell_imb
-            )
+def _extract_columns(
+    data,
+    metric,
+    exp_num_ticks_init=100000,
+    num_prev_bars=3,
+    num_ticks_ewma_window=20,
+    cache=None,
+    flag=False,
+    tick_rules=None,
+):
+    """
+    Runs the compiled run bar kernel over one batch of ticks, see _extract_bars().
 
-        # Check min max
-        if price > high_price:
-            high_price = price
-        if price <= low_price:
-            low_price = price
+    :return: date_time, float64 columns (open, high, low, close, cum_vol, cum_dollar) and int64 column
+             cum_ticks of the bars, with the RunBarState of the bar in progress.
+    """
+    counters, history, num_ticks_bar = _get_updated_counters(
+        cache, flag, exp_num_ticks_init, num_prev_bars, num_ticks_ewma_window
+    )
+    prices = data.iloc[:, 1].to_numpy(dtype=np.float64)
+    volumes = data.iloc[:, 2].to_numpy(dtype=np.float64)
+    imbalances = _batch_signed_flow(
+        prices, volumes, _METRICS[metric], counters, _PREV, tick_rules
+    )
+    end_idx, values, ticks, history = _run_kernel(
+        prices,
+        volumes,
+        imbalances,
+        int(num_prev_bars),
+        int(num_ticks_ewma_window),
+        counters,
+        history,
+        num_ticks_bar,
+    )
 
-        # Update cache
-        cache_data = cache_tup(
-            date_time,
-            price,
-            high_price,
-            low_price,
-            tick_rule,
-            cum_volume,
-            cum_dollar_value,
-            cum_ticks,
-            cum_theta_buy,
-            cum_theta_sell,
-            exp_num_ticks,
-            imbalance_array,
-        )
-        cache.append(cache_data)
+    date_time = data.iloc[:, 0].array.take(end_idx)
+    last_date_time = (
+        data.iloc[-1, 0] if len(data) else getattr(cache, "date_time", None)
+    )
+    return (
+        date_time,
+        values,
+        ticks,
+        RunBarState(counters, history, num_ticks_bar, last_date_time),
+    )
 
-        # Check expression for possible bar generation
-        if max(cum_theta_buy, cum_theta_sell) > exp_num_ticks * max(
-            exp_buy_proportion, exp_sell_proportion
-        ):  # pylint: disable=eval-used
-            # Create bars
-            open_price = cache[0].price
-            low_price = min(low_price, open_price)
-            close_price = price
-            num_ticks_bar.append(cum_ticks)
-            expected_num_ticks_bar = ewma(
-                np.array(num_ticks_bar[-num_ticks_ewma_window:], dtype=float),
-                num_ticks_ewma_window,
-            )[
-                -1
-            ]  # expected number of ticks based on formed bars
-            # Update bars & Reset counters
-            list_bars.append(
-                [
-                    date_time,
-                    open_price,
-                    high_price,
-                    low_price,
-                    close_price,
-                    cum_volume,
-                    cum_dollar_value,
-                    cum_ticks,
-                ]
-            )
-            cum_ticks, cum_dollar_value, cum_volume, cum_theta_buy, cum_theta_sell = (
-                0,
-                0,
-                0,
-                0,
-                0,
+
+class RunBarBuilder(BarBuilder):
+    """
+    Builds dollar, volume or tick run bars from a live feed, one micro-batch of ticks at a time, see
+    BarBuilder. The expected number of ticks and the run history carry over between calls.
+    """
+
+    def __init__(
+        self,
+        metric="dollar_run",
+        exp_num_ticks_init=100000,
+        num_prev_bars=3,
+        num_ticks_ewma_window=20,
+    ):
+        """
+        :param metric: tick_run, dollar_run or volume_run
+        :param exp_num_ticks_init: initial guess of number of ticks in run bar
+        :param num_prev_bars: Number of previous bars used for EWMA window (window=num_prev_bars * bar length)
+                              for estimating expected imbalance (tick, volume or dollar)
+        :param num_ticks_ewma_window: EWMA window to estimate expected number of ticks in a bar based on previous bars
+        """
+        self.metric = metric
+        self.num_prev_bars = int(num_prev_bars)
+        self.num_ticks_ewma_window = int(num_ticks_ewma_window)
+        self._dtypes = {}
+        self.restore(
+            RunBarState.initial(
+                exp_num_ticks_init, num_prev_bars, num_ticks_ewma_window
             )
-            high_price, low_price = -np.inf, np.inf
-            exp_num_ticks = expected_num_ticks_bar
-            cache = []
-
-        # Update cache after bar generation (exp_num_ticks was changed after bar generation)
-        cache_data = cache_tup(
-            date_time,
-            price,
-            high_price,
-            low_price,
-            tick_rule,
-            cum_volume,
-            cum_dollar_value,
-            cum_ticks,
-            cum_theta_buy,
-            cum_theta_sell,
-            exp_num_ticks,
-            imbalance_array,
         )
-        cache.append(cache_data)
-    return list_bars, cache, num_ticks_bar
+
+    def snapshot(self):
+        """
+        :return: RunBarState. A copy of the state of the bar in progress, which can be pickled. Only the part
+                 of the history still needed is copied.
+        """
+        counters = self._counters.copy()
+        start, end = int(counters[_HIST_START]), int(counters[_HIST_END])
+        counters[_HIST_START], counters[_HIST_END] = 0, end - start
+        return RunBarState(
+            counters,
+            self._history[start:end].copy(),
+            self._num_ticks_bar.copy(),
+            self._date_time,
+        )
+
+    def restore(self, state):
+        """
+        Resumes from a state returned by snapshot() or by the batch functions.
+
+        :param state: RunBarState
+        """
+        self._counters = state.counters.copy()
+        self._history = state.history.copy()
+        self._num_ticks_bar = state.num_ticks_bar.copy()
+        self._date_time = state.date_time
+        self._close_price = self._counters[_PREV_PRICE]
+
+    def _run(self, prices, volumes):
+        """
+        Runs the compiled kernel over the new ticks, updating the state in place.
+
+        :param prices: np.ndarray, float64. Price of each tick.
+        :param volumes: np.ndarray, float64. Volume of each tick.
+        :return: Positions of the closing ticks, float64 columns and int64 column cum_ticks.
+        """
+        imbalances = _batch_signed_flow(
+            prices, volumes, _METRICS[self.metric], self._counters, _PREV
+        )
+        end_idx, values, ticks, self._history = _run_kernel(
+            prices,
+            volumes,
+            imbalances,
+            self.num_prev_bars,
+            self.num_ticks_ewma_window,
+            self._counters,
+            self._history,
+            self._num_ticks_bar,
+        )
+        return end_idx, values, ticks
+
+    def _reset_bar(self):
+        """
+        Starts a new bar at the close price of the last tick, the expected number of ticks is left as is.
+        """
+        super()._reset_bar()
+        self._counters[[_CUM_THETA_BUY, _CUM_THETA_SELL]] = 0
 
 
 def _assert_dataframe(test_batch):
@@ -293,38 +631,48 @@ def _batch_run(
     num_prev_bars,
     num_ticks_ewma_window,
     batch_size=2e7,
+    progress=None,
+    output="frame",
+    tick_rules=None,
 ):
     """
-    Reads a csv file in batches and then constructs the financial data structure in the form of a DataFrame.
+    Reads the ticks in batches and then constructs the financial data structure in the form of a DataFrame.
 
-    The csv file must have only 3 columns: date_time, price, & volume.
+    The ticks must have only 3 columns: date_time, price, & volume.
 
-    :param df: a pandas.DataFrame containing the price and volume data.
+    :param df: a pandas.DataFrame containing the price and volume data, a TickStore, a path to a csv or
+               parquet file or an iterable of DataFrames, read in batches.
     :param metric: tick_imbalance, dollar_imbalance or volume_imbalance
     :param exp_num_ticks_init: initial expetected number of ticks per bar
     :param num_prev_bars: Number of previous bars used for EWMA window (window=num_prev_bars * bar length)
                           for estimating expected imbalance (tick, volume or dollar)
     :num_ticks_ewma_window: EWMA window for expected number of ticks calculations
     :param batch_size: The number of rows per batch. Less RAM = smaller batch size.
+    :param progress: Callable taking the BatchMetrics of each batch, e.g. print_progress. None to not measure.
+    :param output: frame, records or arrow
+    :param tick_rules: array-like. Tick rule of every tick of df, see tick_rule(). Computed if None.
     :return: Financial data structure
     """
-    print("Reading data in batches:")
+    _check_output(output)
 
     # Variables
     count = 0
     flag = False  # The first flag is false since the first batch doesn't use the cache
     cache = None
-    num_ticks_bar = None
-    final_bars = []
-
-    # Read in the first row & assert format
-    _assert_dataframe(df.iloc[0:1])
-
-    # Read csv in batches
-    for _, batch in df.groupby(np.arange(len(df)) // batch_size):
-
-        print("Batch number:", count)
-        list_bars, cache, num_ticks_bar = _extract_bars(
+    final_bars = BarColumns()
+    first = 0
+    meter = None if progress is None else _ProgressMeter(progress)
+    if tick_rules is not None:
+        # Converted once, each batch takes a slice
+        tick_rules = np.asarray(tick_rules, dtype=np.float64)
+
+    # Read in batches
+    for batch in _read_batches(df, batch_size):
+        if count == 0:
+            # Read in the first row & assert format
+            _assert_dataframe(batch.iloc[0:1])
+
+        *list_bars, cache = _extract_columns(
             data=batch,
             metric=metric,
             exp_num_ticks_init=exp_num_ticks_init,
@@ -332,43 +680,45 @@ def _batch_run(
             num_ticks_ewma_window=num_ticks_ewma_window,
             cache=cache,
             flag=flag,
-            num_ticks_bar=num_ticks_bar,
+            tick_rules=_batch_tick_rules(tick_rules, first, len(batch)),
         )
-        # Append to bars list
+        first += len(batch)
 
-        final_bars += list_bars
+        # Append to the bar columns
+        final_bars.append(*list_bars)
+        if meter is not None:
+            meter.update(len(batch), len(list_bars[2]), cache)
         count += 1
 
         # Set flag to True: notify function to use cache
         flag = True
 
-    # Return a DataFrame
-    cols = [
-        "date_time",
-        "open",
-        "high",
-        "low",
-        "close",
-        "cum_vol",
-        "cum_dollar",
-        "cum_ticks",
-    ]
-    bars_df = pd.DataFrame(final_bars, columns=cols)
-    print("Returning bars \n")
-    return bars_df
+    return final_bars.output(output)
 
 
 def get_dollar_run_bars(
-    df, exp_num_ticks_init, num_prev_bars, num_ticks_ewma_window, batch_size=2e7
+    df,
+    exp_num_ticks_init,
+    num_prev_bars,
+    num_ticks_ewma_window,
+    batch_size=2e7,
+    progress=None,
+    output="frame",
+    tick_rules=None,
 ):
     """
     Creates the dollar imbalace bars: date_time, open, high, low, close, cum_vol, cum_dollar, and cum_ticks.
-    :param df: a pandas.DataFrame containing the price and volume data.
+    :param df: a pandas.DataFrame containing the price and volume data, a TickStore, a path to a csv or
+               parquet file or an iterable of DataFrames, read in batches.
     :param exp_num_ticks_init: initial expetected number of ticks per bar
     :param num_prev_bars: Number of previous bars used for EWMA window (window=num_prev_bars * bar length)
                           for estimating expected imbalance (tick, volume or dollar)
     :num_ticks_ewma_window: EWMA window for expected number of ticks calculations
     :param batch_size: The number of rows per batch. Less RAM = smaller batch size.
+    :param progress: Callable taking the BatchMetrics of each batch, e.g. print_progress. None to not measure.
+    :param output: frame for a DataFrame, records for a np.recarray or arrow for a pyarrow.Table (needs pyarrow)
+    :param tick_rules: array-like. Tick rule of every tick of df from tick_rule(), to reuse it across the tick,
+                       volume and dollar bars and parameter sweeps. Computed batch by batch if None.
     :return: Dataframe of dollar bars
     """
     return _batch_run(
@@ -378,20 +728,35 @@ def get_dollar_run_bars(
         num_prev_bars=num_prev_bars,
         num_ticks_ewma_window=num_ticks_ewma_window,
         batch_size=batch_size,
+        progress=progress,
+        output=output,
+        tick_rules=tick_rules,
     )
 
 
 def get_volume_run_bars(
-    df, exp_num_ticks_init, num_prev_bars, num_ticks_ewma_window, batch_size=2e7
+    df,
+    exp_num_ticks_init,
+    num_prev_bars,
+    num_ticks_ewma_window,
+    batch_size=2e7,
+    progress=None,
+    output="frame",
+    tick_rules=None,
 ):
     """
     Creates the volume imbalace bars: date_time, open, high, low, close, cum_vol, cum_dollar, and cum_ticks.
-    :param df: a pandas.DataFrame containing the price and volume data.
+    :param df: a pandas.DataFrame containing the price and volume data, a TickStore, a path to a csv or
+               parquet file or an iterable of DataFrames, read in batches.
     :param exp_num_ticks_init: initial expetected number of ticks per bar
     :param num_prev_bars: Number of previous bars used for EWMA window (window=num_prev_bars * bar length)
                           for estimating expected imbalance (tick, volume or dollar)
     :param num_ticks_ewma_window: EWMA window to estimate expected number of ticks in a bar based on previous bars
     :param batch_size: The number of rows per batch. Less RAM = smaller batch size.
+    :param progress: Callable taking the BatchMetrics of each batch, e.g. print_progress. None to not measure.
+    :param output: frame for a DataFrame, records for a np.recarray or arrow for a pyarrow.Table (needs pyarrow)
+    :param tick_rules: array-like. Tick rule of every tick of df from tick_rule(), to reuse it across the tick,
+                       volume and dollar bars and parameter sweeps. Computed batch by batch if None.
     :return: Dataframe of dollar bars
     """
     return _batch_run(
@@ -401,20 +766,35 @@ def get_volume_run_bars(
         num_prev_bars=num_prev_bars,
         num_ticks_ewma_window=num_ticks_ewma_window,
         batch_size=batch_size,
+        progress=progress,
+        output=output,
+        tick_rules=tick_rules,
     )
 
 
 def get_tick_run_bars(
-    df, exp_num_ticks_init, num_prev_bars, num_ticks_ewma_window, batch_size=2e7
+    df,
+    exp_num_ticks_init,
+    num_prev_bars,
+    num_ticks_ewma_window,
+    batch_size=2e7,
+    progress=None,
+    output="frame",
+    tick_rules=None,
 ):
     """
     Creates the tick imbalace bars: date_time, open, high, low, close, cum_vol, cum_dollar, and cum_ticks.
-    :param df: a pandas.DataFrame containing the price and volume data.
+    :param df: a pandas.DataFrame containing the price and volume data, a TickStore, a path to a csv or
+               parquet file or an iterable of DataFrames, read in batches.
     :param exp_num_ticks_init: initial expetected number of ticks per bar
     :param num_prev_bars: Number of previous bars used for EWMA window (window=num_prev_bars * bar length)
                           for estimating expected imbalance (tick, volume or dollar)
     :param num_ticks_ewma_window: EWMA window to estimate expected number of ticks in a bar based on previous bars
     :param batch_size: The number of rows per batch. Less RAM = smaller batch size.
+    :param progress: Callable taking the BatchMetrics of each batch, e.g. print_progress. None to not measure.
+    :param output: frame for a DataFrame, records for a np.recarray or arrow for a pyarrow.Table (needs pyarrow)
+    :param tick_rules: array-like. Tick rule of every tick of df from tick_rule(), to reuse it across the tick,
+                       volume and dollar bars and parameter sweeps. Computed batch by batch if None.
     :return: Dataframe of dollar bars
     """
     return _batch_run(
@@ -424,4 +804,7 @@ def get_tick_run_bars(
         num_prev_bars=num_prev_bars,
         num_ticks_ewma_window=num_ticks_ewma_window,
         batch_size=batch_size,
+        progress=progress,
+        output=output,
+        tick_rules=tick_rules,
     )
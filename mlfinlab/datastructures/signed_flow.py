@@ -0,0 +1,118 @@
+"""
+Advances in Financial Machine Learning, Marcos Lopez de Prado
+Chapter 2.3.2: Information-Driven Bars
+
+The tick rule signs every tick by the direction of its last price change, and the signed flow (the imbalance
+of the imbalance and run bars) is the tick rule times 1, the volume or the dollar value of the tick.
+
+The tick rule is the same for the tick, volume and dollar variants and for every exp_num_ticks_init or
+num_prev_bars, so it can be computed once per dataset, saved along with the ticks, and handed to the bar
+functions with ``tick_rules=`` instead of being worked out again on every run.
+"""
+
+# Imports
+import numpy as np
+from numba import njit
+
+# Signed flow kinds, by metric code of the imbalance and run bar kernels
+_KINDS = ("tick", "dollar", "volume")
+
+
+@njit(nogil=True, cache=True)
+def _tick_rule_kernel(prices, prev_price, prev_tick_rule):
+    """
+    :param prices: np.ndarray, float64. Price of each tick.
+    :param prev_price: float64. Price of the tick before the first one, NaN if there is none.
+    :param prev_tick_rule: float64. Tick rule of the tick before the first one.
+    :return: np.ndarray, float64. Tick rule of each tick.
+    """
+    tick_rules = np.empty(prices.shape[0], dtype=np.float64)
+    for i in range(prices.shape[0]):
+        tick_diff = 0.0 if np.isnan(prev_price) else prices[i] - prev_price
+        if tick_diff != 0:
+            prev_tick_rule = np.sign(tick_diff)
+        tick_rules[i] = prev_tick_rule
+        prev_price = prices[i]
+    return tick_rules
+
+
+def tick_rule(prices, prev_price=np.nan, prev_tick_rule=0.0):
+    """
+    Signs each tick by its price change: 1 for an uptick, -1 for a downtick, and the sign of the previous
+    tick when the price is unchanged.
+
+    :param prices: array-like. Price of each tick.
+    :param prev_price: Price of the tick before the first one, e.g. the last tick of the previous batch.
+                       NaN if there is none.
+    :param prev_tick_rule: Tick rule of the tick before the first one, 0 if there is none.
+    :return: np.ndarray, float64. Tick rule of each tick.
+    """
+    return _tick_rule_kernel(
+        np.asarray(prices, dtype=np.float64),
+        np.float64(prev_price),
+        np.float64(prev_tick_rule),
+    )
+
+
+def signed_flow(prices, volumes, kind, tick_rules=None):
+    """
+    Signed flow of each tick, the imbalance of the imbalance and run bars.
+
+    :param prices: array-like. Price of each tick.
+    :param volumes: array-like. Volume of each tick, not used by the tick kind.
+    :param kind: tick, volume or dollar
+    :param tick_rules: array-like. Tick rule of each tick, computed by tick_rule() if None.
+    :return: np.ndarray, float64. The tick rule, the signed volume or the signed dollar value of each tick.
+    """
+    if kind not in _KINDS:
+        raise ValueError(
+            "kind must be one of {}, got {!r}".format(", ".join(_KINDS), kind)
+        )
+    prices = np.asarray(prices, dtype=np.float64)
+    if tick_rules is None:
+        tick_rules = tick_rule(prices)
+    tick_rules = np.asarray(tick_rules, dtype=np.float64)
+    if kind == "tick":
+        return tick_rules
+    volumes = np.asarray(volumes, dtype=np.float64)
+    if kind == "volume":
+        return tick_rules * volumes
+    return tick_rules * volumes * prices
+
+
+def _batch_tick_rules(tick_rules, first, num_ticks):
+    """
+    :param tick_rules: np.ndarray, float64. Tick rule of every tick of a dataset, or None.
+    :param first: Position of the first tick of the batch.
+    :param num_ticks: Number of ticks of the batch.
+    :return: np.ndarray, float64. View of the tick rules of the ticks of the batch, None if tick_rules is None.
+    """
+    if tick_rules is None:
+        return None
+    return tick_rules[first : first + num_ticks]
+
+
+def _batch_signed_flow(prices, volumes, metric, counters, prev, tick_rules=None):
+    """
+    Signed flow of a batch of ticks, carrying the tick rule over from the previous batch.
+
+    :param prices: np.ndarray, float64. Price of each tick.
+    :param volumes: np.ndarray, float64. Volume of each tick.
+    :param metric: int64. Metric code of the kernel, 0 - tick, 1 - dollar, 2 - volume
+    :param counters: np.ndarray, float64. State of the bar in progress, its previous price and tick rule are
+                     read and updated in place.
+    :param prev: Positions of the previous price and of the previous tick rule in counters.
+    :param tick_rules: np.ndarray, float64. Tick rule of each tick of the batch, computed if None.
+    :return: np.ndarray, float64. Signed flow of each tick.
+    """
+    prev_price, prev_tick_rule = prev
+    if tick_rules is None:
+        tick_rules = tick_rule(prices, counters[prev_price], counters[prev_tick_rule])
+    elif len(tick_rules) != len(prices):
+        raise ValueError(
+            "tick_rules has {} ticks, expected {}".format(len(tick_rules), len(prices))
+        )
+    if len(prices):
+        counters[prev_price] = prices[-1]
+        counters[prev_tick_rule] = tick_rules[-1]
+    return signed_flow(prices, volumes, _KINDS[metric], tick_rules)
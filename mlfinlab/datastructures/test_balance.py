@@ -0,0 +1,180 @@
+import pickle
+import pytest
+import numpy as np
+import pandas as pd
+from mlfinlab.datastructures import balance
+from mlfinlab.datastructures.balance import (
+    BarBuilder,
+    BarState,
+    _extract_bars,
+    get_dollar_bars,
+    get_tick_bars,
+    get_volume_bars,
+)
+
+
+def _reference_bars(df, metric, threshold):
+    # Plain python loop with the semantics of the original implementation
+    bars = []
+    open_price = None
+    cum = {"cum_ticks": 0, "cum_dollar_value": 0.0, "cum_volume": 0.0}
+    high_price, low_price = -np.inf, np.inf
+    for date_time, price, volume in df.itertuples(index=False):
+        open_price = price if open_price is None else open_price
+        cum["cum_ticks"] += 1
+        cum["cum_dollar_value"] += price * volume
+        cum["cum_volume"] += volume
+        high_price = max(high_price, price)
+        low_price = min(low_price, price)
+        if cum[metric] >= threshold:
+            bars.append(
+                [
+                    date_time,
+                    open_price,
+                    high_price,
+                    min(low_price, open_price),
+                    price,
+                    cum["cum_volume"],
+                    cum["cum_dollar_value"],
+                    cum["cum_ticks"],
+                ]
+            )
+            open_price = price
+            cum = {"cum_ticks": 0, "cum_dollar_value": 0.0, "cum_volume": 0.0}
+            high_price, low_price = -np.inf, np.inf
+    return bars
+
+
+def test_dollar_bars_match_reference(ticks):
+    df = ticks()
+    bars = get_dollar_bars(df, threshold=50000, batch_size=1500)
+    assert bars.values.tolist() == _reference_bars(df, "cum_dollar_value", 50000)
+
+
+def test_volume_bars_match_reference(ticks):
+    df = ticks()
+    bars = get_volume_bars(df, threshold=500, batch_size=1500)
+    assert bars.values.tolist() == _reference_bars(df, "cum_volume", 500)
+
+
+def test_tick_bars_match_reference(ticks):
+    df = ticks()
+    bars = get_tick_bars(df, threshold=37, batch_size=1500)
+    assert bars.values.tolist() == _reference_bars(df, "cum_ticks", 37)
+    assert (bars["cum_ticks"] == 37).all()
+
+
+def test_batch_size_does_not_change_bars(ticks):
+    df = ticks()
+    single = get_dollar_bars(df, threshold=50000)
+    batched = get_dollar_bars(df, threshold=50000, batch_size=333)
+    pd.testing.assert_frame_equal(single, batched, check_exact=True)
+    assert single["date_time"].dtype == df["date_time"].dtype
+
+
+def test_pickled_state_resumes_open_bar(ticks):
+    df = ticks()
+    first, state = _extract_bars(df.iloc[:2500], "cum_volume", threshold=500)
+    state = pickle.loads(pickle.dumps(state))
+    second, _ = _extract_bars(
+        df.iloc[2500:], "cum_volume", threshold=500, cache=state, flag=True
+    )
+    assert isinstance(state, BarState)
+    assert state.date_time == df["date_time"].iloc[2499]
+    pd.testing.assert_frame_equal(
+        pd.concat([first, second], ignore_index=True),
+        get_volume_bars(df, threshold=500),
+        check_exact=True,
+    )
+
+
+def test_builder_matches_batch_bars(ticks):
+    df = ticks()
+    builder = BarBuilder("cum_dollar_value", threshold=50000)
+    bars = []
+    for start in range(0, len(df), 7):
+        chunk = df.iloc[start : start + 7]
+        bars.append(builder.update(chunk["date_time"], chunk["price"], chunk["volume"]))
+        if start == 2100:
+            # Resume the bar in progress in a new builder
+            state = pickle.loads(pickle.dumps(builder.snapshot()))
+            builder = BarBuilder("cum_dollar_value", threshold=50000)
+            builder.restore(state)
+    pd.testing.assert_frame_equal(
+        pd.DataFrame(np.concatenate(bars)),
+        get_dollar_bars(df, threshold=50000),
+        check_exact=True,
+    )
+
+
+def test_builder_flush_closes_bar_in_progress(ticks):
+    df = ticks(100)
+    builder = BarBuilder("cum_ticks", threshold=30)
+    closed = builder.update(df["date_time"], df["price"], df["volume"])
+    flushed = builder.flush()
+    assert len(closed) == 3 and len(flushed) == 1
+    assert flushed["cum_ticks"][0] == 10
+    assert flushed["open"][0] == closed["close"][-1]
+    assert flushed["close"][0] == df["price"].iloc[-1]
+    assert flushed["cum_vol"][0] == df["volume"].iloc[90:].sum()
+    assert len(builder.flush()) == 0
+
+
+def test_bars_from_csv_file_and_chunk_iterator(tmp_path, ticks):
+    df = ticks()
+    path = tmp_path / "ticks.csv"
+    df.to_csv(path, index=False)
+    expected = get_volume_bars(df, threshold=500)
+    from_csv = get_volume_bars(str(path), threshold=500, batch_size=1234)
+    chunks = (df.iloc[start : start + 999] for start in range(0, len(df), 999))
+    pd.testing.assert_frame_equal(from_csv, expected, check_exact=True)
+    pd.testing.assert_frame_equal(
+        get_volume_bars(chunks, threshold=500), expected, check_exact=True
+    )
+
+
+def test_bars_from_parquet_file(tmp_path, ticks):
+    pytest.importorskip("pyarrow")
+    df = ticks()
+    path = tmp_path / "ticks.parquet"
+    df.to_parquet(path, row_group_size=1000)
+    pd.testing.assert_frame_equal(
+        get_tick_bars(path, threshold=37, batch_size=777),
+        get_tick_bars(df, threshold=37),
+        check_exact=True,
+    )
+
+
+def test_thresholds_match_separate_runs(ticks):
+    df = ticks()
+    thresholds = [20000, 50000, 50001, 200000]
+    bars = get_dollar_bars(df, thresholds=thresholds, batch_size=1500)
+    assert list(bars) == thresholds
+    for threshold in thresholds:
+        pd.testing.assert_frame_equal(
+            bars[threshold], get_dollar_bars(df, threshold=threshold), check_exact=True
+        )
+    tick_bars = get_tick_bars(df, thresholds=[37, 100])
+    assert (tick_bars[100]["cum_ticks"] == 100).all()
+    assert len(pd.concat(tick_bars)) == len(tick_bars[37]) + len(tick_bars[100])
+
+
+def test_repeated_thresholds_are_rejected(ticks):
+    with pytest.raises(ValueError):
+        get_dollar_bars(ticks(100), thresholds=[20000, 50000, 20000])
+
+
+@pytest.mark.parametrize(
+    "get_bars, threshold",
+    [(get_dollar_bars, 50000), (get_volume_bars, 500), (get_tick_bars, 37.5)],
+)
+def test_parallel_bars_match_single_thread(monkeypatch, get_bars, threshold, ticks):
+    monkeypatch.setattr(balance, "_MIN_CHUNK", 100)
+    df = ticks(20000, seed=3)
+    expected = get_bars(df, threshold=threshold, batch_size=3333)
+    for n_jobs in [2, 7, 64]:
+        pd.testing.assert_frame_equal(
+            get_bars(df, threshold=threshold, batch_size=3333, n_jobs=n_jobs),
+            expected,
+            check_exact=True,
+        )
@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+import pytest
+from mlfinlab.datastructures.balance import get_volume_bars
+from mlfinlab.datastructures.columns import BarColumns
+from mlfinlab.datastructures.run import get_tick_run_bars
+
+
+def test_columns_grow_and_frame_views_the_buffers():
+    columns = BarColumns(capacity=2)
+    date_time = pd.date_range("2024-01-01", periods=5, freq="1s").array
+    values = np.arange(30, dtype=np.float64).reshape(5, 6)
+    columns.append(date_time[:3], values[:3], np.arange(3))
+    columns.append(date_time[3:], values[3:], np.arange(3, 5))
+    frame = columns.frame()
+    assert len(columns) == 5 and columns.capacity >= 5
+    assert frame["close"].tolist() == values[:, 3].tolist()
+    assert frame["cum_ticks"].dtype == np.int64
+    assert np.shares_memory(frame["open"].to_numpy(), columns.values["open"])
+
+
+def test_records_and_frame_hold_the_same_bars(ticks):
+    df = ticks()
+    frame = get_volume_bars(df, threshold=500, batch_size=1500)
+    records = get_volume_bars(df, threshold=500, batch_size=1500, output="records")
+    assert isinstance(records, np.recarray)
+    pd.testing.assert_frame_equal(pd.DataFrame(records), frame, check_exact=True)
+    with pytest.raises(ValueError):
+        get_volume_bars(df, threshold=500, output="list")
+
+
+def test_tz_aware_date_time_is_kept(ticks):
+    df = ticks()
+    df["date_time"] = df["date_time"].dt.tz_localize("UTC").dt.tz_convert("Asia/Tokyo")
+    bars = get_tick_run_bars(df, 100, 3, 20, batch_size=1500)
+    assert bars["date_time"].dtype == df["date_time"].dtype
+    assert bars["date_time"].iloc[0] in set(df["date_time"])
+
+
+def test_arrow_output(ticks):
+    pa = pytest.importorskip("pyarrow")
+    df = ticks()
+    table = get_volume_bars(df, threshold=500, output="arrow")
+    assert isinstance(table, pa.Table)
+    pd.testing.assert_frame_equal(
+        table.to_pandas(), get_volume_bars(df, threshold=500), check_exact=True
+    )
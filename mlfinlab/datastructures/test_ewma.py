@@ -0,0 +1,58 @@
+import os
+import pathlib
+import subprocess
+import sys
+import numpy as np
+from mlfinlab.datastructures.ewma import ewma, ewma_2d, ewma_push
+
+
+def test_ewma_matches_definition():
+    values = np.random.default_rng(0).standard_normal(300)
+    window = 20
+    weights = (1 - 2 / (window + 1)) ** np.arange(len(values))[::-1]
+    expected = [
+        np.dot(weights[-t - 1 :], values[: t + 1]) / weights[-t - 1 :].sum()
+        for t in range(len(values))
+    ]
+    assert np.allclose(ewma(values, window), expected, rtol=1e-12)
+
+
+def test_ewma_2d_matches_columns():
+    values = np.random.default_rng(1).standard_normal((200, 7))
+    result = ewma_2d(values, 15)
+    for j in range(values.shape[1]):
+        assert np.array_equal(result[:, j], ewma(values[:, j].copy(), 15))
+
+
+def test_import_does_not_start_the_threading_layer():
+    # A forked worker hangs at exit once the parallel threading layer has started
+    code = (
+        "import mlfinlab.datastructures.ewma\n"
+        "from numba.np.ufunc import parallel\n"
+        "print(parallel._is_initialized)"
+    )
+    root = pathlib.Path(__file__).resolve().parents[2]
+    output = subprocess.run(
+        [sys.executable, "-c", code],
+        env=dict(os.environ, PYTHONPATH=str(root)),
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    assert output.strip() == "False"
+
+
+def test_ewma_push_matches_windowed_ewma():
+    values = np.random.default_rng(0).standard_normal(500)
+    window = 37
+    numerator, weight, power, length = 0.0, 0.0, 0.0, 0
+    for t, value in enumerate(values):
+        numerator, weight, power, length = ewma_push(
+            numerator, weight, power, length, window, value, values[max(t - window, 0)]
+        )
+        expected = ewma(values[max(t - window + 1, 0) : t + 1], window)[-1]
+        if t < window:
+            # identical while the window fills up
+            assert numerator / weight == expected
+        else:
+            assert np.isclose(numerator / weight, expected, rtol=1e-12, atol=1e-12)
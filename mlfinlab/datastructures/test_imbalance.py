@@ -0,0 +1,117 @@
+import zlib
+import numpy as np
+import pandas as pd
+import pytest
+from mlfinlab.datastructures.ewma import ewma
+from mlfinlab.datastructures.imbalance import (
+    ImbalanceBarBuilder,
+    _extract_bars,
+    _CUM_TICKS,
+    _HIST_END,
+    _HIST_START,
+    _MAX_NUM_TICKS_BAR,
+    get_dollar_imbalance_bars,
+    get_tick_imbalance_bars,
+    get_volume_imbalance_bars,
+)
+
+
+class _ImbalanceSampler:
+    def __init__(self, num_prev_bars):
+        self.num_prev_bars = num_prev_bars
+        self.imbalances = []
+        self.cum_theta = 0.0
+
+    def push(self, imbalance, exp_num_ticks):
+        self.imbalances.append(imbalance)
+        self.cum_theta += imbalance
+        exp_tick_imb = np.nan
+        if len(self.imbalances) >= exp_num_ticks:
+            window = int(exp_num_ticks * self.num_prev_bars)
+            exp_tick_imb = ewma(np.array(self.imbalances[-window:]), window)[-1]
+        return np.abs(self.cum_theta) > exp_num_ticks * np.abs(exp_tick_imb)
+
+    def reset(self):
+        self.cum_theta = 0.0
+
+
+def test_volume_imbalance_bars_match_reference(ticks, reference_bars):
+    df = ticks()
+    bars = get_volume_imbalance_bars(df, 50, 3, 5, batch_size=1500)
+    assert bars.values.tolist() == reference_bars(df, _ImbalanceSampler(3), 50, 5)
+
+
+@pytest.mark.parametrize(
+    "get_bars, flow",
+    [(get_tick_imbalance_bars, "tick"), (get_dollar_imbalance_bars, "dollar")],
+)
+@pytest.mark.parametrize("params", [(50, 3, 20), (200, 10, 20)])
+def test_tick_and_dollar_imbalance_bars_match_reference(
+    ticks, reference_bars, get_bars, flow, params
+):
+    # The windows slide many times per bar, and the +-1 tick imbalances tie with their threshold
+    df = ticks()
+    bars = get_bars(df, *params, batch_size=1500)
+    exp_num_ticks, num_prev_bars, num_ticks_ewma_window = params
+    expected = reference_bars(
+        df,
+        _ImbalanceSampler(num_prev_bars),
+        exp_num_ticks,
+        num_ticks_ewma_window,
+        flow=flow,
+    )
+    assert bars.values.tolist() == expected
+
+
+def test_history_is_bounded_by_the_longest_bar(ticks):
+    _, state = _extract_bars(ticks(20000), "volume_imbalance", 50, 3, 5)
+    counters = state.counters
+    assert counters[_HIST_END] - counters[_HIST_START] <= (
+        3 * counters[_MAX_NUM_TICKS_BAR] + 1 + counters[_CUM_TICKS]
+    )
+
+
+def test_batch_size_does_not_change_bars(ticks):
+    df = ticks()
+    single = get_dollar_imbalance_bars(df, 200, 10, 20)
+    batched = get_dollar_imbalance_bars(df, 200, 10, 20, batch_size=777)
+    pd.testing.assert_frame_equal(single, batched, check_exact=True)
+
+
+def test_builder_matches_batch_bars(ticks):
+    df = ticks()
+    builder = ImbalanceBarBuilder("dollar_imbalance", 200, 10, 20)
+    bars = []
+    for start in range(0, len(df), 13):
+        chunk = df.iloc[start : start + 13]
+        bars.append(builder.update(chunk["date_time"], chunk["price"], chunk["volume"]))
+        builder.restore(builder.snapshot())
+    pd.testing.assert_frame_equal(
+        pd.DataFrame(np.concatenate(bars)),
+        get_dollar_imbalance_bars(df, 200, 10, 20),
+        check_exact=True,
+    )
+
+
+def test_bars_from_csv_file_and_chunk_iterator(tmp_path, ticks):
+    df = ticks()
+    path = tmp_path / "ticks.csv"
+    df.to_csv(path, index=False)
+    expected = get_dollar_imbalance_bars(df, 200, 10, 20)
+    from_csv = get_dollar_imbalance_bars(str(path), 200, 10, 20, batch_size=1234)
+    chunks = (df.iloc[start : start + 999] for start in range(0, len(df), 999))
+    pd.testing.assert_frame_equal(from_csv, expected, check_exact=True)
+    pd.testing.assert_frame_equal(
+        get_dollar_imbalance_bars(chunks, 200, 10, 20), expected, check_exact=True
+    )
+
+
+@pytest.mark.parametrize(
+    "params, num_bars, checksum",
+    [((50, 3, 20), 4734, 2561380270), ((200, 3, 20), 4628, 1254781731)],
+)
+def test_tick_imbalance_bars_match_stored_bars(ticks, params, num_bars, checksum):
+    # Bars of the original implementation: tick imbalances tie with the threshold, so they pin the rounding of ewma
+    bars = get_tick_imbalance_bars(ticks(), *params)
+    assert len(bars) == num_bars
+    assert zlib.crc32(bars["cum_ticks"].to_numpy(np.int64).tobytes()) == checksum
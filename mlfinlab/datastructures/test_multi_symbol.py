@@ -0,0 +1,37 @@
+import pandas as pd
+import pytest
+from mlfinlab.datastructures import balance, imbalance
+from mlfinlab.datastructures.multi_symbol import build_bars_many
+
+
+@pytest.mark.parametrize("n_jobs", [1, 2])
+def test_symbols_match_single_runs_in_input_order(n_jobs, ticks):
+    frames = {"b": ticks(1000, 1), "a": ticks(3000, 2), "c": ticks(2000, 3)}
+    bars, timings = build_bars_many(frames, "volume", n_jobs=n_jobs, threshold=500)
+    assert list(bars) == list(timings.index) == ["b", "a", "c"]
+    for symbol, frame in frames.items():
+        expected, _ = balance._extract_bars(frame, "cum_volume", threshold=500)
+        pd.testing.assert_frame_equal(bars[symbol], expected, check_exact=True)
+    assert (timings["ticks"] == [1000, 3000, 2000]).all()
+    assert (timings["bars"] == [len(bars[symbol]) for symbol in frames]).all()
+
+
+def test_imbalance_bars_with_process_pool(ticks):
+    frames = [(symbol, ticks(2000, seed)) for seed, symbol in enumerate("xyz")]
+    bars, _ = build_bars_many(
+        frames,
+        "dollar_imbalance",
+        n_jobs=2,
+        exp_num_ticks_init=200,
+        num_prev_bars=10,
+        num_ticks_ewma_window=20,
+    )
+    for symbol, frame in frames:
+        expected, _ = imbalance._extract_bars(frame, "dollar_imbalance", 200, 10, 20)
+        pd.testing.assert_frame_equal(bars[symbol], expected, check_exact=True)
+
+
+def test_frames_are_checked_before_the_pool_starts(ticks):
+    frame = ticks(100).assign(side=1)
+    with pytest.raises(AssertionError):
+        build_bars_many({"a": ticks(100), "b": frame}, "volume", n_jobs=2)
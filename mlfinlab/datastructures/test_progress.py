@@ -0,0 +1,44 @@
+from mlfinlab.datastructures.balance import get_dollar_bars
+from mlfinlab.datastructures.imbalance import get_volume_imbalance_bars
+from mlfinlab.datastructures.progress import print_progress
+
+
+def test_bars_are_silent_without_progress(capsys, ticks):
+    get_dollar_bars(ticks(), threshold=50000, batch_size=1500)
+    assert capsys.readouterr().out == ""
+
+
+def test_progress_reports_every_batch(capsys, ticks):
+    df = ticks()
+    metrics = []
+    bars = get_dollar_bars(
+        df, threshold=50000, batch_size=1500, progress=metrics.append
+    )
+    assert [m.batch for m in metrics] == [0, 1, 2, 3]
+    assert [m.ticks for m in metrics] == [1500, 1500, 1500, 500]
+    assert sum(m.bars for m in metrics) == metrics[-1].total_bars == len(bars)
+    assert metrics[-1].total_ticks == len(df)
+    assert all(m.seconds > 0 and m.ticks_per_second > 0 for m in metrics)
+    assert metrics[-1].peak_cache_bytes == 48
+
+    get_dollar_bars(df, threshold=50000, batch_size=1500, progress=print_progress)
+    assert capsys.readouterr().out.count("\n") == 4
+
+
+def test_progress_tracks_peak_cache_of_imbalance_bars(ticks):
+    metrics = []
+    get_volume_imbalance_bars(
+        ticks(), 100, 3, 20, batch_size=2000, progress=metrics.append
+    )
+    assert len(metrics) == 3
+    assert metrics[-1].peak_cache_bytes == max(m.cache_bytes for m in metrics) > 0
+
+
+def test_progress_sums_the_cache_of_every_threshold(ticks):
+    metrics = []
+    bars = get_dollar_bars(
+        ticks(), thresholds=[20000, 50000], batch_size=1500, progress=metrics.append
+    )
+    assert len(metrics) == 4
+    assert metrics[-1].total_bars == sum(len(frame) for frame in bars.values())
+    assert metrics[-1].peak_cache_bytes == 2 * 48
@@ -0,0 +1,104 @@
+import numpy as np
+import pandas as pd
+from mlfinlab.datastructures.ewma import ewma
+from mlfinlab.datastructures.run import (
+    RunBarBuilder,
+    _extract_bars,
+    _window_state,
+    _CUM_TICKS,
+    _EWMA_BUY,
+    _EWMA_LENGTH,
+    _EWMA_POWER,
+    _EWMA_SELL,
+    _EWMA_WEIGHT,
+    _EWMA_WINDOW,
+    _HIST_END,
+    _HIST_START,
+    _MAX_NUM_TICKS_BAR,
+    _SUM_BUY,
+    _SUM_SELL,
+    get_dollar_run_bars,
+    get_volume_run_bars,
+)
+
+
+class _RunSampler:
+    def __init__(self, num_prev_bars):
+        self.num_prev_bars = num_prev_bars
+        self.buys, self.sells = [], []
+        self.theta_buy, self.theta_sell = 0.0, 0.0
+
+    def push(self, imbalance, exp_num_ticks):
+        if imbalance > 0:
+            self.buys.append(imbalance)
+            self.sells.append(0.0)
+            self.theta_buy += imbalance
+        elif imbalance < 0:
+            self.buys.append(0.0)
+            self.sells.append(-imbalance)
+            self.theta_sell -= imbalance
+        exp_buy, exp_sell = np.nan, np.nan
+        if len(self.buys) >= exp_num_ticks:
+            window = int(exp_num_ticks * self.num_prev_bars)
+            buy, sell = np.array(self.buys[-window:]), np.array(self.sells[-window:])
+            total = sum(buy) + sum(sell)
+            exp_buy = ewma(buy, window)[-1] / total
+            exp_sell = ewma(sell, window)[-1] / total
+        return max(self.theta_buy, self.theta_sell) > exp_num_ticks * max(
+            exp_buy, exp_sell
+        )
+
+    def reset(self):
+        self.theta_buy, self.theta_sell = 0.0, 0.0
+
+
+def test_volume_run_bars_match_reference(ticks, reference_bars):
+    df = ticks(3000)
+    bars = get_volume_run_bars(df, 100, 2, 50, batch_size=1000)
+    assert bars.values.tolist() == reference_bars(df, _RunSampler(2), 100, 50)
+
+
+def test_window_state_is_carried_forward(ticks):
+    # No bar closes while the window fills up, the state must match the window exactly
+    _, state = _extract_bars(ticks(), "dollar_run", exp_num_ticks_init=6000)
+    counters, history = state.counters, state.history
+    window, length = int(counters[_EWMA_WINDOW]), int(counters[_EWMA_LENGTH])
+    weight, power, buy, sell, sum_buy, sum_sell = _window_state(
+        history, int(counters[_HIST_END]), length, window
+    )
+    assert length == 4999 and window == 18000
+    assert counters[_EWMA_WEIGHT] == weight and counters[_EWMA_POWER] == power
+    assert counters[_EWMA_BUY] == buy and counters[_EWMA_SELL] == sell
+    assert counters[_SUM_BUY] == sum_buy and counters[_SUM_SELL] == sum_sell
+
+
+def test_history_is_bounded_by_the_longest_bar(ticks):
+    df = ticks(20000)
+    df.loc[::50, "volume"] = 0.0  # ticks without imbalance
+    _, state = _extract_bars(df, "volume_run", 50, 3, 5)
+    counters = state.counters
+    assert counters[_HIST_END] - counters[_HIST_START] <= (
+        3 * counters[_MAX_NUM_TICKS_BAR] + 1 + counters[_CUM_TICKS]
+    )
+
+
+def test_batch_size_does_not_change_bars(ticks):
+    df = ticks()
+    single = get_dollar_run_bars(df, 200, 10, 20)
+    batched = get_dollar_run_bars(df, 200, 10, 20, batch_size=777)
+    pd.testing.assert_frame_equal(single, batched, check_exact=True)
+
+
+def test_builder_matches_batch_bars(ticks):
+    df = ticks()
+    builder = RunBarBuilder("volume_run", 100, 2, 50)
+    bars = []
+    for start in range(0, len(df), 13):
+        chunk = df.iloc[start : start + 13]
+        bars.append(builder.update(chunk["date_time"], chunk["price"], chunk["volume"]))
+        builder.restore(builder.snapshot())
+    pd.testing.assert_frame_equal(
+        pd.DataFrame(np.concatenate(bars)),
+        get_volume_run_bars(df, 100, 2, 50),
+        check_exact=True,
+    )
@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+import pytest
+from mlfinlab.datastructures.imbalance import (
+    get_dollar_imbalance_bars,
+    get_tick_imbalance_bars,
+)
+from mlfinlab.datastructures.run import get_volume_run_bars
+from mlfinlab.datastructures.signed_flow import signed_flow, tick_rule
+
+
+def test_tick_rule_carries_the_last_move_forward():
+    prices = [10.0, 10.0, 10.5, 10.5, 10.25, 10.25, 10.25, 11.0]
+    assert tick_rule(prices).tolist() == [0, 0, 1, 1, -1, -1, -1, 1]
+    unchanged = tick_rule([10.0, 10.0], prev_price=10.0, prev_tick_rule=-1)
+    assert unchanged.tolist() == [-1, -1]
+    assert tick_rule([10.0, 10.0], prev_price=9.0).tolist() == [1, 1]
+
+
+def test_tick_rule_of_batches_matches_whole_series(ticks):
+    prices = ticks()["price"].to_numpy()
+    first = tick_rule(prices[:1234])
+    second = tick_rule(prices[1234:], prices[1233], first[-1])
+    np.testing.assert_array_equal(np.concatenate([first, second]), tick_rule(prices))
+
+
+def test_signed_flow_kinds(ticks):
+    df = ticks(100)
+    rules = tick_rule(df["price"])
+    np.testing.assert_array_equal(signed_flow(df["price"], None, "tick"), rules)
+    np.testing.assert_array_equal(
+        signed_flow(df["price"], df["volume"], "volume", rules), rules * df["volume"]
+    )
+    np.testing.assert_array_equal(
+        signed_flow(df["price"], df["volume"], "dollar"),
+        rules * df["volume"] * df["price"],
+    )
+    with pytest.raises(ValueError):
+        signed_flow(df["price"], df["volume"], "notional")
+
+
+def test_precomputed_tick_rules_give_the_same_bars(ticks):
+    df = ticks()
+    rules = tick_rule(df["price"])
+    for get_bars in [
+        get_dollar_imbalance_bars,
+        get_tick_imbalance_bars,
+        get_volume_run_bars,
+    ]:
+        for exp_num_ticks_init in [50, 100]:
+            pd.testing.assert_frame_equal(
+                get_bars(
+                    df, exp_num_ticks_init, 3, 20, batch_size=1500, tick_rules=rules
+                ),
+                get_bars(df, exp_num_ticks_init, 3, 20),
+                check_exact=True,
+            )
+    with pytest.raises(ValueError):
+        get_tick_imbalance_bars(df, 100, 3, 20, tick_rules=rules[:-1])
@@ -0,0 +1,63 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from mlfinlab.datastructures.balance import get_dollar_bars
+from mlfinlab.datastructures.imbalance import get_volume_imbalance_bars
+from mlfinlab.datastructures.run import get_volume_run_bars
+from mlfinlab.datastructures.tick_store import TickStore, write_tick_store
+
+
+def test_store_round_trip_and_day_index(tmp_path, ticks):
+    df = ticks(freq="73s")
+    chunks = (df.iloc[start : start + 700] for start in range(0, len(df), 700))
+    write_tick_store(chunks, tmp_path)
+    store = TickStore(tmp_path)
+    assert len(store) == len(df)
+    assert isinstance(store.columns["price"], np.memmap)
+    pd.testing.assert_frame_equal(store.frame(), df, check_exact=True)
+
+    days = df["date_time"].dt.normalize()
+    assert (store.days == days.unique().to_numpy().astype("datetime64[D]")).all()
+    pd.testing.assert_frame_equal(
+        store.frame("2024-01-02", "2024-01-03"),
+        df[(days >= "2024-01-02") & (days <= "2024-01-03")].reset_index(drop=True),
+        check_exact=True,
+    )
+
+
+def test_bars_from_store_match_frame(tmp_path, ticks):
+    df = ticks(freq="73s")
+    write_tick_store(df, tmp_path)
+    store = TickStore(tmp_path)
+    pd.testing.assert_frame_equal(
+        get_dollar_bars(store, threshold=50000, batch_size=1000),
+        get_dollar_bars(df, threshold=50000),
+        check_exact=True,
+    )
+    pd.testing.assert_frame_equal(
+        get_volume_run_bars(store, 100, 2, 50),
+        get_volume_run_bars(df, 100, 2, 50),
+        check_exact=True,
+    )
+    pd.testing.assert_frame_equal(
+        get_volume_imbalance_bars(store, 100, 3, 20, batch_size=1500),
+        get_volume_imbalance_bars(df, 100, 3, 20),
+        check_exact=True,
+    )
+
+
+def test_unsorted_ticks_are_rejected(tmp_path, ticks):
+    df = ticks(10).iloc[::-1]
+    with pytest.raises(ValueError):
+        write_tick_store(df, tmp_path)
+
+
+def test_failed_write_keeps_previous_store(tmp_path, ticks):
+    df = ticks(100)
+    write_tick_store(df, tmp_path / "store")
+    # The second batch is out of order, after the first one was written
+    with pytest.raises(ValueError):
+        write_tick_store([ticks(100, seed=1), df.iloc[:10]], tmp_path / "store")
+    assert sorted(os.listdir(tmp_path)) == ["store"]
+    pd.testing.assert_frame_equal(TickStore(tmp_path / "store").frame(), df)
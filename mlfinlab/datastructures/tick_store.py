@@ -0,0 +1,166 @@
+"""
+On-disk columnar store of ticks, read back through np.memmap.
+
+Tuning bar thresholds means building bars from the same ticks many times. Parsing a csv file or unpickling a
+DataFrame on every run costs more than building the bars, so the ticks are written once as fixed-width binary
+columns: int64 date_time (nanoseconds since the epoch), float64 price and float64 volume, with an index of the
+first tick of every day. Opening the store maps the columns without reading them, and the DataFrames it returns
+are views on the mapped columns, so the bar functions read the ticks with zero copies.
+"""
+
+# Imports
+import os
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+
+# Column files of the store and their dtypes
+_COLUMNS = {"date_time": np.int64, "price": np.float64, "volume": np.float64}
+
+_NS_PER_DAY = 86400 * 10**9
+
+
+def write_tick_store(df, path):
+    """
+    Writes ticks to a tick store, replacing any store at ``path``.
+
+    The ticks must be sorted by date_time. A tz-aware date_time is stored in UTC. The files are written to a
+    temporary directory next to ``path`` and only moved into it once all the ticks are written, so a failed write
+    leaves no partial files and any previous store as it was.
+
+    :param df: a pandas.DataFrame with 3 columns - date_time, price, and volume, or an iterable of such
+               DataFrames, written one at a time.
+    :param path: Directory of the store, created if needed.
+    """
+    if isinstance(df, pd.DataFrame):
+        df = [df]
+    path = os.path.abspath(path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = tempfile.mkdtemp(
+        prefix="." + os.path.basename(path) + "-", dir=os.path.dirname(path)
+    )
+    try:
+        _write_files(df, tmp_path)
+        os.makedirs(path, exist_ok=True)
+        # Replacing the files leaves the ones mapped by an open TickStore untouched
+        for name in os.listdir(tmp_path):
+            os.replace(os.path.join(tmp_path, name), os.path.join(path, name))
+    finally:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+
+def _write_files(df, path):
+    """
+    Writes the column files and the index of days of a tick store.
+
+    :param df: Iterable of DataFrames with 3 columns - date_time, price, and volume.
+    :param path: Existing directory of the files.
+    """
+    days, offsets = [], []
+    num_ticks, last_ns, last_day = 0, None, None
+    files = {
+        column: open(os.path.join(path, column + ".bin"), "wb") for column in _COLUMNS
+    }
+    try:
+        for batch in df:
+            date_time_ns = _date_time_ns(batch.iloc[:, 0])
+            if len(date_time_ns) == 0:
+                continue
+            if np.any(date_time_ns[1:] < date_time_ns[:-1]) or (
+                last_ns is not None and date_time_ns[0] < last_ns
+            ):
+                raise ValueError("ticks must be sorted by date_time")
+            last_ns = date_time_ns[-1]
+
+            # First tick of every day
+            day = date_time_ns // _NS_PER_DAY
+            first = np.flatnonzero(np.diff(day, prepend=day[0] - 1))
+            if day[0] == last_day:
+                first = first[1:]
+            last_day = day[-1]
+            days.append(day[first])
+            offsets.append(first + num_ticks)
+
+            date_time_ns.tofile(files["date_time"])
+            batch.iloc[:, 1].to_numpy(dtype=np.float64).tofile(files["price"])
+            batch.iloc[:, 2].to_numpy(dtype=np.float64).tofile(files["volume"])
+            num_ticks += len(date_time_ns)
+    finally:
+        for file in files.values():
+            file.close()
+
+    days.append(np.empty(0, dtype=np.int64))
+    offsets.append(np.array([num_ticks], dtype=np.int64))
+    np.save(
+        os.path.join(path, "days.npy"), np.concatenate(days).astype("datetime64[D]")
+    )
+    np.save(os.path.join(path, "offsets.npy"), np.concatenate(offsets))
+
+
+class TickStore:
+    """
+    Tick store written by write_tick_store(), with its columns mapped read-only with np.memmap.
+
+    The store can be passed to the get_*_bars functions in place of a DataFrame, or a range of days of it with
+    frame(). Pages are read from disk on first use and then served from the page cache, so repeated runs over the
+    same ticks pay the I/O cost once.
+    """
+
+    def __init__(self, path):
+        """
+        :param path: Directory of the store.
+        """
+        self.path = path
+        self.columns = {
+            column: _memmap(os.path.join(path, column + ".bin"), dtype)
+            for column, dtype in _COLUMNS.items()
+        }
+        self.days = np.load(os.path.join(path, "days.npy"))
+        self.offsets = np.load(os.path.join(path, "offsets.npy"))
+
+    def __len__(self):
+        return len(self.columns["price"])
+
+    def frame(self, start=None, end=None):
+        """
+        :param start: First day, included. None for the first day of the store.
+        :param end: Last day, included. None for the last day of the store.
+        :return: DataFrame with 3 columns - date_time, price, and volume, viewing the mapped columns.
+        """
+        first, last = 0, len(self)
+        if start is not None:
+            day = np.datetime64(pd.Timestamp(start).date(), "D")
+            first = self.offsets[np.searchsorted(self.days, day, side="left")]
+        if end is not None:
+            day = np.datetime64(pd.Timestamp(end).date(), "D")
+            last = self.offsets[np.searchsorted(self.days, day, side="right")]
+        # Plain ndarray views of the mapped columns
+        columns = {
+            column: np.asarray(values[first:last])
+            for column, values in self.columns.items()
+        }
+        columns["date_time"] = columns["date_time"].view("datetime64[ns]")
+        return pd.DataFrame(columns, copy=False)
+
+
+def _date_time_ns(date_time):
+    """
+    :param date_time: Column of timestamps, a tz-aware column is converted to UTC.
+    :return: np.ndarray, int64. Nanoseconds since the epoch.
+    """
+    date_time = pd.DatetimeIndex(date_time)
+    if date_time.tz is not None:
+        date_time = date_time.tz_convert(None)
+    return date_time.as_unit("ns").asi8
+
+
+def _memmap(path, dtype):
+    """
+    :param path: Column file.
+    :param dtype: dtype of the column.
+    :return: np.memmap of the column, read-only. An empty column can not be mapped and is an empty array.
+    """
+    if os.path.getsize(path) == 0:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r")
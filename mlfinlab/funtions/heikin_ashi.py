@@ -1,4 +1,130 @@
+from dataclasses import dataclass
+import numpy as np
 import pandas as pd
+from numba import njit
+
+
+@dataclass
+class HeikinAshiState:
+    """
+    Heikin-Ashi open and close of the last bar, all the next bar depends on. None before the first bar.
+
+    The fields are floats for one series or arrays for many symbols updated together. As in heikin_ashi(), a bar
+    with a NaN open, high, low or close makes the Heikin-Ashi open of every later bar NaN: a NaN state is carried
+    on, only None starts again from the open of the bar.
+    """
+
+    ha_open: object = None
+    ha_close: object = None
+
+    @classmethod
+    def from_frame(cls, ha_df: pd.DataFrame, open: str = "Open", close: str = "Close"):
+        """
+        State after the last bar of a heikin_ashi() frame, to go on with update().
+
+        Args:
+            ha_df (pd.DataFrame): Result of heikin_ashi(), wide or not.
+            open (str, optional): Name of the open column of the input. Defaults to "Open".
+            close (str, optional): Name of the close column of the input. Defaults to "Close".
+
+        Returns:
+            HeikinAshiState: The state after the last bar.
+        """
+        return cls(
+            ha_open=np.asarray(ha_df[f"ha_{open}"])[-1],
+            ha_close=np.asarray(ha_df[f"ha_{close}"])[-1],
+        )
+
+    def update(
+        self,
+        bar,
+        open: str = "Open",
+        high: str = "High",
+        low: str = "Low",
+        close: str = "Close",
+    ):
+        """
+        Heikin-Ashi bar of a new bar, for live charts.
+
+        Args:
+            bar: Mapping, e.g. a dict or pd.Series, of the open, high, low and close of the new bar, scalars or
+                arrays of one value per symbol.
+            open (str, optional): Name of the open column. Defaults to "Open".
+            high (str, optional): Name of the high column. Defaults to "High".
+            low (str, optional): Name of the low column. Defaults to "Low".
+            close (str, optional): Name of the close column. Defaults to "Close".
+
+        Returns:
+            dict: The ha_ columns of the new bar.
+            HeikinAshiState: The state after the new bar.
+        """
+        bar_open, bar_high, bar_low, bar_close = (
+            np.asarray(bar[column], dtype=float) for column in (open, high, low, close)
+        )
+        ha_close = (bar_open + bar_high + bar_low + bar_close) / 4
+        if self.ha_open is None:
+            ha_open = bar_open
+        else:
+            ha_open = np.asarray((self.ha_open + self.ha_close) / 2)
+        if ha_open.ndim == 0:
+            ha_open = ha_open[()]
+        ha_bar = {
+            f"ha_{open}": ha_open,
+            f"ha_{high}": np.fmax(np.fmax(ha_open, ha_close), bar_high),
+            f"ha_{low}": np.fmin(np.fmin(ha_open, ha_close), bar_low),
+            f"ha_{close}": ha_close,
+        }
+        return ha_bar, HeikinAshiState(ha_open, ha_close)
+
+
+@njit(nogil=True, cache=True)
+def _ha_open_kernel(first_open, ha_close):
+    """
+    Heikin-Ashi open of every bar: the open of the first bar, then the mean of the previous Heikin-Ashi open and
+    close.
+
+    Args:
+        first_open (np.ndarray): Open of the first bar of each column.
+        ha_close (np.ndarray): Heikin-Ashi close, one column per series.
+
+    Returns:
+        np.ndarray: Heikin-Ashi open, one column per series.
+    """
+    ha_open = np.empty_like(ha_close)
+    if ha_close.shape[0] == 0:
+        return ha_open
+    ha_open[0] = first_open
+    for i in range(1, ha_close.shape[0]):
+        for j in range(ha_close.shape[1]):
+            ha_open[i, j] = (ha_open[i - 1, j] + ha_close[i - 1, j]) / 2
+    return ha_open
+
+
+@njit(nogil=True, cache=True)
+def _grouped_ha_open_kernel(bar_open, ha_close, codes, num_groups):
+    """
+    Heikin-Ashi open of every bar of rows of several groups, in time order within each group. The groups can be
+    interleaved, the open and close of the last bar of each group are carried in a state per group.
+
+    Args:
+        bar_open (np.ndarray): Open of each bar.
+        ha_close (np.ndarray): Heikin-Ashi close of each bar.
+        codes (np.ndarray): Group of each bar, from 0 to num_groups - 1.
+        num_groups (int): Number of groups.
+
+    Returns:
+        np.ndarray: Heikin-Ashi open of each bar.
+    """
+    ha_open = np.empty_like(ha_close)
+    last = np.full(num_groups, -1, dtype=np.int64)
+    for i in range(ha_close.shape[0]):
+        k = last[codes[i]]
+        if k < 0:
+            ha_open[i] = bar_open[i]
+        else:
+            ha_open[i] = (ha_open[k] + ha_close[k]) / 2
+        last[codes[i]] = i
+    return ha_open
 
 
 def heikin_ashi(
@@ -7,27 +133,59 @@ def heikin_ashi(
     high: str = "High",
     low: str = "Low",
     close: str = "Close",
+    by: str = None,
 ):
-    heikin_ashi_df = pd.DataFrame(
-        index=df.index,
-        columns=[f"ha_{open}", f"ha_{high}", f"ha_{low}", f"ha_{close}"],
-        dtype=float,
-    )
+    """
+    Heikin-Ashi bars of OHLC bars.
 
-    heikin_ashi_df[f"ha_{close}"] = (df[open] + df[high] + df[low] + df[close]) / 4
+    The open is a compiled recurrence over the bars and the other columns are computed on whole arrays; like
+    DataFrame.max(), the high and low skip NaN values. Three layouts are handled in one call:
 
-    for i in range(len(df)):
-        if i == 0:
-            heikin_ashi_df.iat[0, 0] = df[open].iloc[0]
-        else:
-            heikin_ashi_df.iat[i, 0] = (
-                heikin_ashi_df.iat[i - 1, 0] + heikin_ashi_df.iat[i - 1, 3]
-            ) / 2
+    - one series: the columns are open, high, low and close.
+    - a wide frame: df[open] etc. are DataFrames with one column per symbol, e.g. columns (field, symbol).
+      The result has columns (ha_field, symbol).
+    - a long frame of many symbols: ``by`` names the symbol column or index level, e.g. of a (symbol, time)
+      MultiIndex. The bars of each symbol must be in time order, the symbols may be interleaved.
 
-    heikin_ashi_df[f"ha_{high}"] = (
-        heikin_ashi_df.loc[:, [f"ha_{open}", f"ha_{close}"]].join(df[high]).max(axis=1)
-    )
-    heikin_ashi_df[f"ha_{low}"] = (
-        heikin_ashi_df.loc[:, [f"ha_{open}", f"ha_{close}"]].join(df[low]).min(axis=1)
+    Args:
+        df (pd.DataFrame): The OHLC bars.
+        open (str, optional): Name of the open column. Defaults to "Open".
+        high (str, optional): Name of the high column. Defaults to "High".
+        low (str, optional): Name of the low column. Defaults to "Low".
+        close (str, optional): Name of the close column. Defaults to "Close".
+        by (str, optional): Column or index level of the symbol of a long frame. Defaults to None.
+
+    Returns:
+        pd.DataFrame: Columns ha_Open, ha_High, ha_Low and ha_Close, with the index of ``df``.
+    """
+    wide = isinstance(df[open], pd.DataFrame)
+    bar_open, bar_high, bar_low, bar_close = (
+        df[column].to_numpy(dtype=float) for column in (open, high, low, close)
     )
-    return heikin_ashi_df
+    ha_close = (bar_open + bar_high + bar_low + bar_close) / 4
+
+    if by is not None:
+        keys = df[by] if by in df.columns else df.index.get_level_values(by)
+        codes, uniques = pd.factorize(keys, use_na_sentinel=False)
+        ha_open = _grouped_ha_open_kernel(bar_open, ha_close, codes, len(uniques))
+    elif wide:
+        ha_open = _ha_open_kernel(bar_open[0] if len(df) else bar_open, ha_close)
+    else:
+        ha_open = _ha_open_kernel(bar_open[:1], ha_close[:, None])[:, 0]
+
+    columns = {
+        f"ha_{open}": ha_open,
+        f"ha_{high}": np.fmax(np.fmax(ha_open, ha_close), bar_high),
+        f"ha_{low}": np.fmin(np.fmin(ha_open, ha_close), bar_low),
+        f"ha_{close}": ha_close,
+    }
+    if wide:
+        symbols = df[open].columns
+        return pd.concat(
+            {
+                name: pd.DataFrame(values, index=df.index, columns=symbols)
+                for name, values in columns.items()
+            },
+            axis=1,
+        )
+    return pd.DataFrame(columns, index=df.index)
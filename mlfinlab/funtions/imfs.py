@@ -1,8 +1,127 @@
-import emd
+import hashlib
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+import numpy as np
 import pandas as pd
+from mlfinlab.util.multiprocess import SharedArrays, process_pool
 
 
-def decompose_imfs(z: pd.Series, column: str = "Close", max_imf=-1):
+class IMFCache:
+    """
+    Disk cache of sifted windows, one .npy file per window named by a hash of its values and of the sift parameters.
+
+    Reading a window marks its file as recently used, and the least recently used files are deleted once the cache
+    grows beyond max_bytes. Files are written to a temporary name and renamed, so processes can share a directory.
+    """
+
+    def __init__(self, directory, max_bytes: int = 2**30):
+        """
+        Args:
+            directory (str or os.PathLike): Directory of the cache, created if missing.
+            max_bytes (int, optional): Size of the cache beyond which the least recently used windows are deleted. Defaults to 1GiB.
+        """
+        self.directory = os.fspath(directory)
+        self.max_bytes = max_bytes
+        self._nbytes = None
+        os.makedirs(self.directory, exist_ok=True)
+
+    @staticmethod
+    def key(values, **params):
+        """
+        Args:
+            values (array-like): Values of the window.
+            **params: Sift parameters, e.g. max_imf.
+
+        Returns:
+            str: Hash of the values and of the parameters.
+        """
+        values = np.ascontiguousarray(values, dtype=np.float64)
+        digest = hashlib.blake2b(values.tobytes(), digest_size=20)
+        digest.update(repr(sorted(params.items())).encode())
+        return digest.hexdigest()
+
+    def get(self, key):
+        """
+        Returns:
+            np.ndarray: The IMFs of the window of key, None if they are not cached.
+        """
+        path = self._path(key)
+        try:
+            imfs = np.load(path)
+            now = time.time_ns()
+            os.utime(path, ns=(now, now))
+        except (FileNotFoundError, ValueError):
+            # Evicted by another process, or not fully written
+            return None
+        return imfs
+
+    def put(self, key, imfs):
+        """
+        Caches the IMFs of the window of key, then evicts the least recently used windows if the cache is full.
+        """
+        path = self._path(key)
+        temporary = "{}.{}.tmp".format(path, os.getpid())
+        with open(temporary, "wb") as f:
+            np.save(f, imfs)
+        os.replace(temporary, path)
+        if self._nbytes is None:
+            self._nbytes = self.nbytes
+        else:
+            self._nbytes += os.path.getsize(path)
+        if self._nbytes > self.max_bytes:
+            self._evict()
+
+    def clear(self):
+        """
+        Deletes all the cached windows.
+        """
+        for entry in self._entries():
+            os.remove(entry.path)
+        self._nbytes = 0
+
+    @property
+    def nbytes(self):
+        """
+        Returns:
+            int: Size of the cached windows.
+        """
+        return sum(entry.stat().st_size for entry in self._entries())
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".npy")
+
+    def _entries(self):
+        return [
+            entry for entry in os.scandir(self.directory) if entry.name.endswith(".npy")
+        ]
+
+    def _evict(self):
+        """
+        Deletes the least recently used windows until the cache fits in max_bytes.
+        """
+        stats = []
+        for entry in self._entries():
+            try:
+                stats.append(
+                    (entry.stat().st_mtime_ns, entry.stat().st_size, entry.path)
+                )
+            except FileNotFoundError:
+                pass
+        stats.sort()
+        nbytes = sum(size for _, size, _ in stats)
+        for _, size, path in stats:
+            if nbytes <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            nbytes -= size
+        self._nbytes = nbytes
+
+
+def decompose_imfs(z: pd.Series, column: str = "Close", max_imf=-1, cache=None):
     """
     Decomposes a time series into its intrinsic mode functions (IMFs) using the Empirical Mode Decomposition (EMD) method.
 
@@ -10,11 +129,151 @@ def decompose_imfs(z: pd.Series, column: str = "Close", max_imf=-1):
         z (pd.Series): The time series to be decomposed.
         column (str, optional): The column name of the time series. Defaults to "Close".
         max_imf (int, optional): The maximum number of IMFs to be computed. Defaults to -1, which means all IMFs will be computed.
+        cache (IMFCache, optional): Cache the IMFs are read from, or written to once computed. Defaults to None.
 
     Returns:
         pd.DataFrame: A DataFrame containing the IMFs as columns, with the time series index as the row index.
     """
-    imfs = emd.sift.sift(z.values, max_imfs=max_imf)
+    imfs = None
+    if cache is not None:
+        key = cache.key(z.values, max_imf=max_imf)
+        imfs = cache.get(key)
+    if imfs is None:
+        import emd
+
+        imfs = emd.sift.sift(z.values, max_imfs=max_imf)
+        if cache is not None:
+            cache.put(key, imfs)
     imfnum = imfs.shape[1]
     columns = [f"{column}_{i}" for i in range(imfnum)]
     return pd.DataFrame(imfs, columns=columns, index=z.index)
+
+
+def rolling_decompose_imfs(
+    z: pd.Series,
+    window: int,
+    step: int = 1,
+    column: str = "Close",
+    max_imf=-1,
+    cache=None,
+):
+    """
+    Decomposes each rolling window of a time series into its IMFs, reusing those of windows sifted before.
+
+    Args:
+        z (pd.Series): The time series to be decomposed.
+        window (int): Number of values of each window.
+        step (int, optional): Number of values between the ends of consecutive windows. Defaults to 1.
+        column (str, optional): The column name of the time series. Defaults to "Close".
+        max_imf (int, optional): The maximum number of IMFs to be computed. Defaults to -1, which means all IMFs will be computed.
+        cache (IMFCache, str or os.PathLike, optional): Cache of the windows, or its directory. Defaults to None.
+
+    Returns:
+        dict: Index of the last value of each window to the DataFrame of its IMFs, see decompose_imfs().
+    """
+    if isinstance(cache, (str, os.PathLike)):
+        cache = IMFCache(cache)
+    return {
+        z.index[end - 1]: decompose_imfs(
+            z.iloc[end - window : end], column, max_imf, cache
+        )
+        for end in range(window, len(z) + 1, step)
+    }
+
+
+def decompose_imfs_many(series, num_imfs: int, n_jobs=None, chunksize=16, **kwargs):
+    """
+    Decomposes many time series of the same length into a fixed number of IMFs, spreading them across a process pool.
+
+    Each series is sifted into at most num_imfs - 1 IMFs and the residual. Series with fewer IMFs are padded with
+    zero columns after their residual, so the columns of every series still add up to it and the results stack into
+    one array. The series are passed to the workers in shared memory. The IMFs come back through 2 * n_jobs shared
+    slots of one chunk each, copied into the result as the chunks complete, so the result is only held once.
+
+    Args:
+        series: A 2-D array with one series per row, or a list of pd.Series or arrays of the same length.
+        num_imfs (int): Number of IMF columns of each series, the residual included.
+        n_jobs (int, optional): Number of processes, None for the number of CPUs. 1 sifts the series in this process. Defaults to None.
+        chunksize (int, optional): Number of series sifted by a task. Defaults to 16.
+        **kwargs: Other parameters of emd.sift.sift(), e.g. imf_opts.
+
+    Returns:
+        np.ndarray: The IMFs, float64 of shape (series, time, imf).
+    """
+    if num_imfs < 1:
+        raise ValueError("num_imfs must be at least 1, got {}".format(num_imfs))
+    if not isinstance(series, np.ndarray):
+        series = [np.asarray(s, dtype=np.float64) for s in series]
+        if len({len(s) for s in series}) > 1:
+            raise ValueError("series must all have the same length")
+    block = np.asarray(series, dtype=np.float64).reshape(len(series), -1)
+    num_series, num_time = block.shape
+    n_jobs = os.cpu_count() if n_jobs is None else n_jobs
+    chunks = [
+        (first, min(first + chunksize, num_series))
+        for first in range(0, num_series, chunksize)
+    ]
+
+    if n_jobs == 1 or len(chunks) <= 1:
+        imfs = np.empty((num_series, num_time, num_imfs))
+        for first, last in chunks:
+            _sift_rows(block, imfs, first, last, num_imfs, kwargs)
+        return imfs
+
+    num_slots = min(2 * n_jobs, len(chunks))
+    layout = {
+        "series": (block.shape, np.float64),
+        "imfs": ((num_slots, chunksize, num_time, num_imfs), np.float64),
+    }
+    imfs = np.empty((num_series, num_time, num_imfs))
+    with SharedArrays(layout) as arrays:
+        arrays["series"][:] = block
+        with process_pool(n_jobs) as executor:
+            todo, free, pending = chunks[::-1], list(range(num_slots)), {}
+            while todo or pending:
+                while todo and free:
+                    (first, last), slot = todo.pop(), free.pop()
+                    future = executor.submit(
+                        _sift_shared_rows,
+                        layout,
+                        arrays.names,
+                        slot,
+                        first,
+                        last,
+                        num_imfs,
+                        kwargs,
+                    )
+                    pending[future] = slot, first, last
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    slot, first, last = pending.pop(future)
+                    future.result()
+                    imfs[first:last] = arrays["imfs"][slot, : last - first]
+                    free.append(slot)
+    return imfs
+
+
+def _sift_rows(series, imfs, first, last, num_imfs, kwargs):
+    """
+    Sifts the series first..last into imfs[first:last], padded or truncated to num_imfs columns.
+    """
+    import emd
+
+    for k in range(first, last):
+        if num_imfs == 1:
+            imfs[k, :, 0] = series[k]
+            continue
+        sifted = emd.sift.sift(series[k], max_imfs=num_imfs - 1, **kwargs)
+        m = min(sifted.shape[1], num_imfs)
+        imfs[k, :, :m] = sifted[:, :m]
+        imfs[k, :, m:] = 0.0
+
+
+def _sift_shared_rows(layout, names, slot, first, last, num_imfs, kwargs):
+    """
+    Attaches to the shared memory blocks and sifts the series first..last into a slot of the shared IMFs, in a worker
+    process.
+    """
+    with SharedArrays(layout, names) as arrays:
+        series = arrays["series"][first:last]
+        _sift_rows(series, arrays["imfs"][slot], 0, last - first, num_imfs, kwargs)
@@ -1,41 +1,571 @@
+import functools
 import pandas as pd
 import numpy as np
+from numba import njit
 
 
-# NOTE: 最初の255のデータが欠落するので逆変換ができない
-# from sklearn.base import TransformerMixin, BaseEstimator
-# class ImosTransformer(TransformerMixin, BaseEstimator):
-#     def __init__(self, *, H: int = 256):
-#         self._H = H
+@njit(nogil=True, cache=True)
+def _add_compensated(total, compensation, x):
+    """
+    Neumaier compensated addition of x to total.
+
+    Returns:
+    float: The new total.
+    float: The new compensation, the rounding error lost by the total so far.
+    """
+    t = total + x
+    if abs(total) >= abs(x):
+        compensation += (total - t) + x
+    else:
+        compensation += (x - t) + total
+    return t, compensation
+
+
+@njit(nogil=True, cache=True)
+def _accumulate(sums, x, sign, compensated):
+    """
+    Adds (sign 1) or removes (sign -1) x to the rolling sum in sums, counting NaN values apart.
+    """
+    if np.isnan(x):
+        sums[2] += sign
+    elif compensated:
+        sums[0], sums[1] = _add_compensated(sums[0], sums[1], sign * x)
+    else:
+        sums[0] += sign * x
+
+
+@njit(nogil=True, cache=True)
+def _roll(ring, sums, count, x, compensated):
+    """
+    Pushes x into a rolling sum over the last H values, dropping the value pushed H steps before.
+
+    Parameters:
+    ring (np.ndarray): Ring buffer of the last H values pushed.
+    sums (np.ndarray): Sum of the window, its compensation and its number of NaN values, updated in place.
+    count (int): Number of values pushed before x.
+    x (float): The value pushed.
+    compensated (bool): Whether the sum is compensated.
+
+    Returns:
+    float: Sum of the window ending at x, NaN until the window is full and while it holds a NaN.
+    """
+    H = ring.shape[0]
+    k = count % H
+    _accumulate(sums, x, 1, compensated)
+    if count >= H:
+        _accumulate(sums, ring[k], -1, compensated)
+    ring[k] = x
+    if count < H - 1 or sums[2] != 0:
+        return np.nan
+    return sums[0] + sums[1]
+
+
+@njit(nogil=True, cache=True)
+def _norm(square_sum):
+    """
+    Rounding can leave a tiny negative sum of squares when the window is all zeros.
+    """
+    if np.isnan(square_sum):
+        return np.nan
+    return np.sqrt(max(square_sum, 0.0))
+
+
+@njit(nogil=True, cache=True)
+def _normalize(x, r):
+    """
+    x divided by its rolling norm r, NaN when both are 0.
+    """
+    if r != 0:
+        return x / r
+    if x == 0:
+        return np.nan
+    return np.sign(x) * np.inf
+
+
+@njit(nogil=True, cache=True)
+def _rolling_norm_kernel(values, H, compensated):
+    """
+    Rolling L2 norm of each column of values, from a rolling sum of squares updated with the square entering
+    and the square leaving the window.
+
+    Parameters:
+    values (np.ndarray): 2-D float64 array, one series per column.
+    H (int): The window size.
+    compensated (bool): Whether the rolling sum of squares is compensated.
+
+    Returns:
+    np.ndarray: The rolling norm of each column.
+    """
+    n, k = values.shape
+    norm = np.empty((n, k))
+    squares = np.empty(H)
+    sums = np.empty(3)
+    for j in range(k):
+        sums[:] = 0.0
+        for i in range(n):
+            x = values[i, j]
+            norm[i, j] = _norm(_roll(squares, sums, i, x * x, compensated))
+    return norm
+
+
+@njit(nogil=True, cache=True)
+def _imos_kernel(values, squares, normalized, sums, count, compensated):
+    """
+    IMOS transform of a block of values, carrying on from the state of the previous blocks.
+
+    Parameters:
+    values (np.ndarray): 2-D float64 array, one series per column.
+    squares (np.ndarray): Ring buffers of the last H squared values, one row per series.
+    normalized (np.ndarray): Ring buffers of the last H normalized values, one row per series.
+    sums (np.ndarray): Rolling sums of squares and of normalized values, see _roll(), one row per series.
+    count (int): Number of values of each series before the block.
+    compensated (bool): Whether the rolling sums are compensated.
+
+    Returns:
+    np.ndarray: The transformed values.
+    np.ndarray: The rolling norm values used for normalization.
+    """
+    n, k = values.shape
+    transformed = np.empty((n, k))
+    norm = np.empty((n, k))
+    for j in range(k):
+        for i in range(n):
+            x = values[i, j]
+            r = _norm(_roll(squares[j], sums[j, :3], count + i, x * x, compensated))
+            norm[i, j] = r
+            transformed[i, j] = _roll(
+                normalized[j], sums[j, 3:], count + i, _normalize(x, r), compensated
+            )
+    return transformed, norm
+
+
+@njit(nogil=True, cache=True)
+def _imos_norm_kernel(values, norm, H, compensated):
+    """
+    IMOS transform of each column of values with given rolling norms.
+
+    Parameters:
+    values (np.ndarray): 2-D float64 array, one series per column.
+    norm (np.ndarray): Rolling norm of each value.
+    H (int): The window size of the rolling sum.
+    compensated (bool): Whether the rolling sum is compensated.
+
+    Returns:
+    np.ndarray: The transformed values.
+    """
+    n, k = values.shape
+    transformed = np.empty((n, k))
+    normalized = np.empty(H)
+    sums = np.empty(3)
+    for j in range(k):
+        sums[:] = 0.0
+        for i in range(n):
+            y = _normalize(values[i, j], norm[i, j])
+            transformed[i, j] = _roll(normalized, sums, i, y, compensated)
+    return transformed
+
+
+@njit(nogil=True, cache=True)
+def _inverse_imos_kernel(transformed, norm, seed_rows, seed_values, H):
+    """
+    Values of the series from their IMOS transform, from the first row on.
+
+    The rows whose transformed values hold a NaN, the first 2H-2 rows and those of each NaN gap, are given by
+    seed_values. After them each normalized value is the change of the rolling sum plus the normalized value
+    leaving its window, and the first full window after a gap gives the normalized value which ends it.
+
+    Parameters:
+    transformed (np.ndarray): 2-D float64 array of the transformed values, one series per column.
+    norm (np.ndarray): Rolling norm of each value.
+    seed_rows (np.ndarray): Increasing positions of the rows given by seed_values.
+    seed_values (np.ndarray): Values of the seed rows.
+    H (int): The window size of the rolling sum.
+
+    Returns:
+    np.ndarray: The values of the series.
+    """
+    n, k = transformed.shape
+    values = np.empty((n, k))
+    normalized = np.empty(H)
+    for j in range(k):
+        p = 0
+        for t in range(n):
+            if p < seed_rows.shape[0] and seed_rows[p] == t:
+                values[t, j] = seed_values[p, j]
+                z = _normalize(seed_values[p, j], norm[t, j])
+                p += 1
+            else:
+                if t == 0 or np.isnan(transformed[t - 1, j]):
+                    # First full window after a gap, its other H-1 normalized values are known
+                    z = transformed[t, j]
+                    for s in range(1, H):
+                        z -= normalized[(t - s) % H]
+                else:
+                    z = transformed[t, j] - transformed[t - 1, j] + normalized[t % H]
+                values[t, j] = z * norm[t, j]
+            normalized[t % H] = z
+    return values
+
+
+class ImosStream:
+    """
+    IMOS transform of live series, one observation at a time in O(1).
 
-#     def fit(self, X, y=None):
-#         self._norm = (
-#             pd.DataFrame(X)
-#             .rolling(self._H)
-#             .apply(lambda x: np.linalg.norm(x, ord=2))
-#             .dropna()
-#         )
-#         return self
+    The last H raw values (squared) and the last H normalized values are kept in ring buffers along with their
+    rolling sums, so each update only adds the entering value and removes the leaving one. imos_transform() runs
+    the same computation from an empty state, so live values are the same numbers as the batch ones.
+    """
+
+    def __init__(self, H: int = 256, compensated: bool = True):
+        """
+        Parameters:
+        H (int): The window size of the rolling norm and of the rolling sum. Default is 256.
+        compensated (bool): Whether the rolling sums use compensated summation. Default is True.
+        """
+        self.H = H
+        self.compensated = compensated
+        self.count = 0
+        self.squares = None
+        self.normalized = None
+        self.sums = None
+
+    def update(self, x):
+        """
+        Transforms the next observation.
+
+        Parameters:
+        x (float or array-like): The next value of the series, or of each series.
+
+        Returns:
+        float or np.ndarray: The transformed value.
+        float or np.ndarray: The rolling norm used for normalization.
+        """
+        x = np.asarray(x, dtype=np.float64)
+        transformed, norm = self.extend(x.reshape(1, -1))
+        if x.ndim == 0:
+            return transformed[0, 0], norm[0, 0]
+        return transformed[0], norm[0]
+
+    def extend(self, values):
+        """
+        Transforms the next block of observations.
+
+        Parameters:
+        values (array-like): 1-D array of the next values of a series, or 2-D array with one series per column.
+
+        Returns:
+        np.ndarray: The transformed values, shaped as values.
+        np.ndarray: The rolling norm values used for normalization, shaped as values.
+        """
+        values = np.asarray(values, dtype=np.float64)
+        block = values.reshape(len(values), -1)
+        num_series = block.shape[1]
+        if self.sums is None:
+            self.squares = np.empty((num_series, self.H))
+            self.normalized = np.empty((num_series, self.H))
+            self.sums = np.zeros((num_series, 6))
+        elif num_series != len(self.sums):
+            raise ValueError(
+                "expected {} series, got {}".format(len(self.sums), num_series)
+            )
+        transformed, norm = _imos_kernel(
+            block,
+            self.squares,
+            self.normalized,
+            self.sums,
+            self.count,
+            self.compensated,
+        )
+        self.count += len(block)
+        return transformed.reshape(values.shape), norm.reshape(values.shape)
+
+
+def _like(x, values):
+    """
+    Returns:
+    pd.Series or pd.DataFrame: values with the index, and the name or columns, of x.
+    """
+    if isinstance(x, pd.DataFrame):
+        return pd.DataFrame(values, index=x.index, columns=x.columns)
+    return pd.Series(values, index=x.index, name=x.name)
+
+
+def rolling_norm(x, H: int = 256, compensated: bool = True):
+    """
+    Rolling L2 norm of a Series, or of each column of a DataFrame, in O(n) whatever the window size.
 
-#     def transform(self, X):
-#         return (X / self._norm).rolling(self._H).sum()
+    Parameters:
+    x (pd.Series or pd.DataFrame): The input time series data, one series per column of a DataFrame.
+    H (int): The window size. Default is 256.
+    compensated (bool): Whether to use compensated summation for the rolling sum of squares, which keeps the
+        norm accurate when large values leave the window. Default is True.
 
-#     def inverse_transform(self, X):
-#         return X * self._norm
+    Returns:
+    pd.Series or pd.DataFrame: The rolling norm, NaN for the first H-1 rows and for windows holding a NaN.
+    """
+    values = x.to_numpy(dtype=np.float64)
+    norm = _rolling_norm_kernel(values.reshape(len(x), -1), H, compensated)
+    return _like(x, norm.reshape(values.shape))
 
 
-def imos_transform(s: pd.Series, H: int = 256):
+def imos_transform(s, H: int = 256, compensated: bool = True):
     """
-    Applies the IMOS (Inverse Moving Sum) transform to a given pandas Series.
+    Applies the IMOS (Inverse Moving Sum) transform to a given pandas Series, or to each column of a DataFrame.
+
+    Use ImosStream to go on transforming live data with the same numbers.
 
     Parameters:
-    s (pd.Series): The input time series data.
+    s (pd.Series or pd.DataFrame): The input time series data.
     H (int): The window size for calculating the rolling sum. Default is 256.
+    compensated (bool): Whether the rolling sums use compensated summation. Default is True.
+
+    Returns:
+    pd.Series or pd.DataFrame: The transformed time series data.
+    pd.Series or pd.DataFrame: The rolling norm values used for normalization.
+    """
+    transformed, norm = ImosStream(H, compensated).extend(s.to_numpy(dtype=np.float64))
+    return _like(s, transformed), _like(s, norm).dropna(how="all")
+
+
+def __getattr__(name):
+    # scikit-learn takes a second and ~70MB to import, so the transformer class is only built on first use
+    if name == "ImosTransformer":
+        return _imos_transformer()
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+
+
+@functools.cache
+def _imos_transformer():
+    """
+    Returns:
+    type: The ImosTransformer scikit-learn transformer class.
+    """
+    from sklearn.base import BaseEstimator, TransformerMixin
+    from sklearn.utils.validation import check_is_fitted
 
+    class ImosTransformer(TransformerMixin, BaseEstimator):
+        """
+        IMOS transform as a scikit-learn transformer, for one time axis.
+
+        fit() and partial_fit() run the rows through an ImosStream. They keep the rolling norm of every row, and the
+        raw values of the rows whose transformed values hold a NaN: the first 2H-2 rows, and the rows of each gap
+        left by a NaN value or an all-zero window. With those, inverse_transform() gives back every row, the rows
+        after a gap included. transform() reuses the fitted norms of the rows it was fitted on, matched by index when the
+        fit and X are pandas objects, and only computes norms when some rows were not fitted. The fitted state is a
+        few plain arrays, so the transformer pickles small and can be cached by joblib.Memory.
+        """
+
+        def __init__(self, *, H: int = 256, compensated: bool = True):
+            """
+            Parameters:
+            H (int): The window size of the rolling norm and of the rolling sum. Default is 256.
+            compensated (bool): Whether the rolling sums use compensated summation. Default is True.
+            """
+            self.H = H
+            self.compensated = compensated
+
+        def fit(self, X, y=None):
+            """
+            Parameters:
+            X (array-like): The series, one per column, rows in time order.
+
+            Returns:
+            ImosTransformer: self
+            """
+            self._reset()
+            self._partial_fit(X)
+            return self
+
+        def partial_fit(self, X, y=None):
+            """
+            Fits the next rows of the series, after those fitted so far.
+
+            Parameters:
+            X (array-like): The next rows of the series, one per column.
+
+            Returns:
+            ImosTransformer: self
+            """
+            if not hasattr(self, "stream_"):
+                self._reset()
+            self._partial_fit(X)
+            return self
+
+        def fit_transform(self, X, y=None):
+            """
+            Parameters:
+            X (array-like): The series, one per column, rows in time order.
+
+            Returns:
+            array-like: The transformed series, of the type and shape of X.
+            """
+            self._reset()
+            return _output(X, self._partial_fit(X))
+
+        def transform(self, X):
+            """
+            Parameters:
+            X (array-like): Rows of the series, in time order.
+
+            Returns:
+            array-like: The transformed series, of the type and shape of X. The rolling sum starts at the first row
+                of X, so its first H-1 rows are NaN.
+            """
+            check_is_fitted(self)
+            values = self._check_features(X)
+            positions = self._positions(X)
+            fitted = positions >= 0
+            norm = np.empty_like(values)
+            norm[fitted] = self.norm_[positions[fitted]]
+            if not fitted.all():
+                norm[~fitted] = _rolling_norm_kernel(values, self.H, self.compensated)[
+                    ~fitted
+                ]
+            return _output(X, _imos_norm_kernel(values, norm, self.H, self.compensated))
+
+        def inverse_transform(self, X):
+            """
+            Parameters:
+            X (array-like): Transformed values of the fitted rows from the first one on, as given by fit_transform(),
+                matched by index for pandas objects. The rows whose transformed values hold a NaN are taken from
+                the fit, so X may only be NaN on these rows.
+
+            Returns:
+            array-like: The series, of the type and shape of X.
+
+            Raises:
+            ValueError: If X does not hold the fitted rows from the first one on, or is NaN on other rows.
+            """
+            check_is_fitted(self)
+            values = self._check_features(X)
+            positions = np.arange(len(values))
+            if (
+                isinstance(X, (pd.Series, pd.DataFrame))
+                and self._index_chunks is not None
+            ):
+                positions = self._positions(X)
+            if not np.array_equal(positions, np.arange(len(values))):
+                raise ValueError(
+                    "inverse_transform needs the rows fitted, from the first one on"
+                )
+            num_seeds = np.searchsorted(self.seed_rows_, len(values))
+            seed_rows = self.seed_rows_[:num_seeds]
+            gaps = np.isnan(values)
+            gaps[seed_rows] = False
+            if gaps.any():
+                raise ValueError(
+                    "X is NaN on rows whose fitted transformed values are not, "
+                    "first at row {}".format(np.flatnonzero(gaps.any(axis=1))[0])
+                )
+            inverse = _inverse_imos_kernel(
+                values,
+                self.norm_[: len(values)],
+                seed_rows,
+                self.seed_values_[:num_seeds],
+                self.H,
+            )
+            return _output(X, inverse)
+
+        def __getstate__(self):
+            state = dict(super().__getstate__())
+            # The spare capacity of the norm buffer is not pickled, norm_ holds the fitted rows
+            state["_norm_buffer"] = None
+            return state
+
+        def _reset(self):
+            self.stream_ = ImosStream(self.H, self.compensated)
+            self.n_samples_seen_ = 0
+            self.norm_ = None
+            self.seed_rows_ = np.empty(0, dtype=np.int64)
+            self.seed_values_ = None
+            self._norm_buffer = None
+            self._index_chunks = []
+
+        def _check_features(self, X):
+            """
+            Returns:
+            np.ndarray: 2-D float64 array of X, once checked to have the columns fitted.
+            """
+            values = _values(X)
+            if values.shape[1] != self.n_features_in_:
+                raise ValueError(
+                    "X has {} features, but ImosTransformer is expecting {} features "
+                    "as input".format(values.shape[1], self.n_features_in_)
+                )
+            return values
+
+        def _partial_fit(self, X):
+            """
+            Returns:
+            np.ndarray: The transformed values of the rows of X, 2-D.
+            """
+            values = (
+                _values(X) if self.n_samples_seen_ == 0 else self._check_features(X)
+            )
+            transformed, norm = self.stream_.extend(values)
+            first, last = self.n_samples_seen_, self.n_samples_seen_ + len(values)
+            if self._norm_buffer is None or len(self._norm_buffer) < last:
+                buffer = np.empty((max(2 * first, last), values.shape[1]))
+                buffer[:first] = self.norm_
+                self._norm_buffer = buffer
+            self._norm_buffer[first:last] = norm
+            self.norm_ = self._norm_buffer[:last]
+
+            # The rows which inverse_transform() cannot rebuild from their transformed values
+            seeds = np.flatnonzero(np.isnan(transformed).any(axis=1))
+            self.seed_rows_ = np.concatenate([self.seed_rows_, first + seeds])
+            self.seed_values_ = (
+                values[seeds]
+                if self.seed_values_ is None
+                else np.vstack([self.seed_values_, values[seeds]])
+            )
+
+            if not isinstance(X, (pd.Series, pd.DataFrame)):
+                self._index_chunks = None
+            elif self._index_chunks is not None:
+                self._index_chunks.append(X.index)
+            self.n_features_in_ = values.shape[1]
+            self.n_samples_seen_ = last
+            return transformed
+
+        def _positions(self, X):
+            """
+            Returns:
+            np.ndarray: Fitted row of each row of X, matched by index, -1 for rows not fitted. All rows are -1
+                unless X and all the fitted rows are pandas objects.
+            """
+            if (
+                not isinstance(X, (pd.Series, pd.DataFrame))
+                or self._index_chunks is None
+            ):
+                return np.full(len(X), -1)
+            if len(self._index_chunks) > 1:
+                self._index_chunks = [
+                    self._index_chunks[0].append(self._index_chunks[1:])
+                ]
+            if not self._index_chunks:
+                return np.full(len(X), -1)
+            return self._index_chunks[0].get_indexer(X.index)
+
+    # Found by pickle and clone as an attribute of this module
+    ImosTransformer.__qualname__ = "ImosTransformer"
+    return ImosTransformer
+
+
+def _values(X):
+    """
+    Returns:
+    np.ndarray: 2-D float64 array of X, one series per column.
+    """
+    values = np.asarray(X, dtype=np.float64)
+    return values.reshape(len(values), -1)
+
+
+def _output(X, values):
+    """
     Returns:
-    pd.Series: The transformed time series data.
-    pd.Series: The rolling norm values used for normalization.
+    array-like: 2-D array values of the type and shape of X.
     """
-    norm = s.rolling(H).apply(lambda x: np.linalg.norm(x, ord=2)).dropna()
-    normalized = s / norm
-    return normalized.rolling(H).sum(), norm
+    if isinstance(X, (pd.Series, pd.DataFrame)):
+        return _like(X, values.reshape(X.shape))
+    return values.reshape(np.shape(X))
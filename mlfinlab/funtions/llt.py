@@ -1,60 +1,87 @@
+import functools
+import os
+from statistics import NormalDist
 import numpy as np
 import pandas as pd
 from dataclasses import dataclass
-import statsmodels.api as sm
-import matplotlib.pyplot as plt
-from sklearn.preprocessing import StandardScaler
-
+from numba import njit
+from mlfinlab.util.multiprocess import process_pool
 
 """
 Univariate Local Linear Trend Model
 """
 
+# Design and transition matrices of the level and trend states
+_DESIGN = np.array([1.0, 0.0])
+_TRANSITION = np.array([[1.0, 1.0], [0.0, 1.0]])
 
-class LocalLinearTrend(sm.tsa.statespace.MLEModel):
-    def __init__(self, endog):
-        # Model order
-        k_states = k_posdef = 2
+# Variance of the states at the start, that of the approximate_diffuse initialization of statsmodels
+_DIFFUSE_VARIANCE = 1e6
 
-        # Initialize the statespace
-        super(LocalLinearTrend, self).__init__(
-            endog,
-            k_states=k_states,
-            k_posdef=k_posdef,
-            initialization="approximate_diffuse",
-            loglikelihood_burn=k_states,
-        )
 
-        # Initialize the matrices
-        self.ssm["design"] = np.array([1, 0])
-        self.ssm["transition"] = np.array([[1, 1], [0, 1]])
-        self.ssm["selection"] = np.eye(k_states)
+def __getattr__(name):
+    # statsmodels takes a second and ~80MB to import, so the model class is only built on first use
+    if name == "LocalLinearTrend":
+        return _local_linear_trend()
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+
+
+@functools.cache
+def _local_linear_trend():
+    """
+    Returns:
+        type: The LocalLinearTrend statsmodels model class.
+    """
+    from statsmodels.tsa.statespace.mlemodel import MLEModel
+
+    class LocalLinearTrend(MLEModel):
+        def __init__(self, endog):
+            # Model order
+            k_states = k_posdef = 2
 
-        # Cache some indices
-        self._state_cov_idx = ("state_cov",) + np.diag_indices(k_posdef)
+            # Initialize the statespace
+            super(LocalLinearTrend, self).__init__(
+                endog,
+                k_states=k_states,
+                k_posdef=k_posdef,
+                initialization="approximate_diffuse",
+                loglikelihood_burn=k_states,
+            )
 
-    @property
-    def param_names(self):
-        return ["sigma2.measurement", "sigma2.level", "sigma2.trend"]
+            # Initialize the matrices
+            self.ssm["design"] = _DESIGN
+            self.ssm["transition"] = _TRANSITION
+            self.ssm["selection"] = np.eye(k_states)
 
-    @property
-    def start_params(self):
-        return [np.std(self.endog)] * 3
+            # Cache some indices
+            self._state_cov_idx = ("state_cov",) + np.diag_indices(k_posdef)
 
-    def transform_params(self, unconstrained):
-        return unconstrained**2
+        @property
+        def param_names(self):
+            return ["sigma2.measurement", "sigma2.level", "sigma2.trend"]
 
-    def untransform_params(self, constrained):
-        return constrained**0.5
+        @property
+        def start_params(self):
+            return [np.std(self.endog)] * 3
 
-    def update(self, params, *args, **kwargs):
-        params = super(LocalLinearTrend, self).update(params, *args, **kwargs)
+        def transform_params(self, unconstrained):
+            return unconstrained**2
 
-        # Observation covariance
-        self.ssm["obs_cov", 0, 0] = params[0]
+        def untransform_params(self, constrained):
+            return constrained**0.5
 
-        # State covariance
-        self.ssm[self._state_cov_idx] = params[1:]
+        def update(self, params, *args, **kwargs):
+            params = super(LocalLinearTrend, self).update(params, *args, **kwargs)
+
+            # Observation covariance
+            self.ssm["obs_cov", 0, 0] = params[0]
+
+            # State covariance
+            self.ssm[self._state_cov_idx] = params[1:]
+
+    # Found by pickle as an attribute of this module
+    LocalLinearTrend.__qualname__ = "LocalLinearTrend"
+    return LocalLinearTrend
 
 
 @dataclass
@@ -65,8 +92,11 @@ class LocalLinearTrendResult:
     predicted_conf: pd.DataFrame
     forecast_mean: pd.Series
     forecast_conf: pd.DataFrame
+    params: np.ndarray = None
 
     def plot(self, ylim=None):
+        import matplotlib.pyplot as plt
+
         fig, ax = plt.subplots(figsize=(10, 4))
 
         # Plot the results
@@ -98,8 +128,30 @@ class LocalLinearTrendResult:
 
 
 def llt_transform(
-    s: pd.Series, scaler=None, forecast=100, alpha=0.05
+    s: pd.Series,
+    scaler=None,
+    forecast=100,
+    alpha=0.05,
+    params=None,
+    start_params=None,
 ) -> LocalLinearTrendResult:
+    """
+    Fits a local linear trend model to a series, with its one-step-ahead predictions and a forecast.
+
+    Args:
+        s (pd.Series): The series.
+        scaler (optional): Class of a scikit-learn scaler the series is scaled with first. Defaults to None.
+        forecast (int, optional): Number of steps to forecast. Defaults to 100.
+        alpha (float, optional): Significance level of the confidence intervals of the predictions. Defaults to 0.05.
+        params (array-like, optional): Variances sigma2.measurement, sigma2.level and sigma2.trend to reuse, e.g.
+            the params of the result of the previous day. The model is only filtered with them, without fitting.
+            Defaults to None.
+        start_params (array-like, optional): Variances the MLE fit starts from, e.g. the params of the result of
+            the previous day. Defaults to None, which starts from the standard deviation of the series.
+
+    Returns:
+        LocalLinearTrendResult: The predictions and forecast, and the variances in params.
+    """
     _s = s.reset_index(drop=True)
 
     if scaler:
@@ -117,10 +169,13 @@ def llt_transform(
         )
 
     # Setup the model
-    mod = LocalLinearTrend(y)
+    mod = _local_linear_trend()(y)
 
-    # Fit it using MLE (recall that we are fitting the three variance parameters)
-    res = mod.fit(disp=False)
+    if params is not None:
+        res = mod.filter(np.asarray(params, dtype=float))
+    else:
+        # Fit it using MLE (recall that we are fitting the three variance parameters)
+        res = mod.fit(start_params=start_params, disp=False)
     # print(res.summary())
 
     # Perform prediction and forecasting
@@ -134,4 +189,223 @@ def llt_transform(
         predicted_conf=predict.conf_int(alpha=alpha),
         forecast_mean=forecast.predicted_mean,
         forecast_conf=forecast.conf_int(),
+        params=np.asarray(res.params),
     )
+
+
+@njit(nogil=True, cache=True)
+def _kalman_kernel(ys, state, cov, obs_var, state_var, design, transition):
+    """
+    Kalman filter of a linear Gaussian state space model with an identity selection matrix, for a few new
+    observations.
+
+    Args:
+        ys (np.ndarray): The new observations, NaN for missing ones.
+        state (np.ndarray): Predicted state before the first observation, updated in place.
+        cov (np.ndarray): Covariance of the predicted state, updated in place.
+        obs_var (float): Variance of the observation noise.
+        state_var (np.ndarray): Variance of the noise of each state.
+        design (np.ndarray): Design vector.
+        transition (np.ndarray): Transition matrix.
+
+    Returns:
+        np.ndarray: One-step-ahead prediction of each observation.
+        np.ndarray: Variance of each prediction.
+    """
+    k = state.shape[0]
+    mean = np.empty(ys.shape[0])
+    var = np.empty(ys.shape[0])
+    pz = np.empty(k)
+    filtered = np.empty((k, k))
+    for t in range(ys.shape[0]):
+        # Prediction of the observation
+        m = 0.0
+        for i in range(k):
+            m += design[i] * state[i]
+            pz[i] = 0.0
+            for j in range(k):
+                pz[i] += cov[i, j] * design[j]
+        f = obs_var
+        for i in range(k):
+            f += design[i] * pz[i]
+        mean[t] = m
+        var[t] = f
+
+        # Update with the observation
+        if not np.isnan(ys[t]):
+            v = ys[t] - m
+            for i in range(k):
+                state[i] += pz[i] * v / f
+                for j in range(k):
+                    cov[i, j] -= pz[i] * pz[j] / f
+
+        # Prediction of the next state
+        for i in range(k):
+            pz[i] = 0.0
+            for j in range(k):
+                pz[i] += transition[i, j] * state[j]
+        state[:] = pz
+        for i in range(k):
+            for j in range(k):
+                filtered[i, j] = 0.0
+                for l in range(k):
+                    filtered[i, j] += transition[i, l] * cov[l, j]
+        for i in range(k):
+            for j in range(i, k):
+                c = 0.0
+                for l in range(k):
+                    c += filtered[i, l] * transition[j, l]
+                if i == j:
+                    c += state_var[i]
+                cov[i, j] = c
+                cov[j, i] = c
+    return mean, var
+
+
+class LocalLinearTrendFilter:
+    """
+    Online Kalman filter of the local linear trend model with known variances, e.g. the params of a
+    LocalLinearTrendResult. Each update() costs O(1), and the predictions and confidence intervals are those of
+    llt_transform(), whose statsmodels filter starts from the same approximate diffuse state.
+    """
+
+    def __init__(self, params, alpha=0.05):
+        """
+        Args:
+            params (array-like): Variances sigma2.measurement, sigma2.level and sigma2.trend.
+            alpha (float, optional): Significance level of the confidence intervals. Defaults to 0.05.
+        """
+        params = np.asarray(params, dtype=np.float64)
+        self.obs_var = params[0]
+        self.state_var = params[1:].copy()
+        self.alpha = alpha
+        self.state = np.zeros(len(_DESIGN))
+        self.cov = np.eye(len(_DESIGN)) * _DIFFUSE_VARIANCE
+
+    @classmethod
+    def from_result(cls, result: LocalLinearTrendResult, alpha=0.05):
+        """
+        Filter with the variances of result, having filtered its series y, to go on with the next observations.
+        """
+        llt_filter = cls(result.params, alpha)
+        llt_filter.filter(result.y)
+        return llt_filter
+
+    def update(self, y):
+        """
+        Args:
+            y (float): The next observation, NaN if it is missing.
+
+        Returns:
+            float: One-step-ahead prediction of y, made before seeing it.
+            float: Lower bound of the confidence interval of the prediction.
+            float: Upper bound of the confidence interval of the prediction.
+        """
+        mean, lower, upper = self.filter(np.array([y], dtype=np.float64))
+        return mean[0], lower[0], upper[0]
+
+    def filter(self, ys):
+        """
+        Args:
+            ys (array-like): The next observations, NaN for missing ones.
+
+        Returns:
+            np.ndarray: One-step-ahead prediction of each observation.
+            np.ndarray: Lower bound of the confidence interval of each prediction.
+            np.ndarray: Upper bound of the confidence interval of each prediction.
+        """
+        mean, var = _kalman_kernel(
+            np.asarray(ys, dtype=np.float64),
+            self.state,
+            self.cov,
+            self.obs_var,
+            self.state_var,
+            _DESIGN,
+            _TRANSITION,
+        )
+        return self._interval(mean, var)
+
+    def forecast(self, h):
+        """
+        Args:
+            h (int): Number of steps to forecast.
+
+        Returns:
+            np.ndarray: Forecast of the next h observations.
+            np.ndarray: Lower bound of the confidence interval of each forecast.
+            np.ndarray: Upper bound of the confidence interval of each forecast.
+        """
+        mean, var = _kalman_kernel(
+            np.full(h, np.nan),
+            self.state.copy(),
+            self.cov.copy(),
+            self.obs_var,
+            self.state_var,
+            _DESIGN,
+            _TRANSITION,
+        )
+        return self._interval(mean, var)
+
+    def _interval(self, mean, var):
+        q = NormalDist().inv_cdf(1 - self.alpha / 2)
+        width = q * np.sqrt(var)
+        return mean, mean - width, mean + width
+
+
+def llt_transform_many(
+    series, params=None, start_params=None, n_jobs=None, chunksize=16, **kwargs
+):
+    """
+    Fits a local linear trend model to each of many series, spreading them across a process pool.
+
+    Args:
+        series: Dict of key to pd.Series, or a list of pd.Series.
+        params (optional): Variances to reuse without fitting, see llt_transform(): a dict of key to variances,
+            a list with the variances of each series, or one array for all. A series with None variances is fitted.
+            Defaults to None.
+        start_params (optional): Variances the fits start from, given like params. Defaults to None.
+        n_jobs (int, optional): Number of processes, None for the number of CPUs. 1 fits the series in this
+            process. Defaults to None.
+        chunksize (int, optional): Number of series sent to a process at once. Defaults to 16.
+        **kwargs: Other parameters of llt_transform(), e.g. scaler, forecast or alpha.
+
+    Returns:
+        Dict of key to LocalLinearTrendResult for a dict of series, else a list in the order of the series.
+    """
+    keys = list(series) if isinstance(series, dict) else None
+    values = [series[key] for key in keys] if keys is not None else list(series)
+    tasks = [
+        (s, _nth(params, keys, k), _nth(start_params, keys, k), kwargs)
+        for k, s in enumerate(values)
+    ]
+    n_jobs = os.cpu_count() if n_jobs is None else n_jobs
+    if n_jobs == 1:
+        results = [_llt_task(task) for task in tasks]
+    else:
+        with process_pool(n_jobs) as executor:
+            results = list(executor.map(_llt_task, tasks, chunksize=chunksize))
+    return dict(zip(keys, results)) if keys is not None else results
+
+
+def _nth(params, keys, k):
+    """
+    Returns:
+        The variances of the k-th series, from a dict by key, a list by position or one array for all.
+    """
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        return params.get(keys[k]) if keys is not None else params.get(k)
+    if isinstance(params, np.ndarray):
+        return params if params.ndim == 1 else params[k]
+    if all(np.isscalar(p) for p in params):
+        return params
+    return params[k]
+
+
+def _llt_task(task):
+    """
+    Fits one series of llt_transform_many(), in a worker process.
+    """
+    s, params, start_params, kwargs = task
+    return llt_transform(s, params=params, start_params=start_params, **kwargs)
@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+import pytest
+from mlfinlab.funtions.heikin_ashi import HeikinAshiState, heikin_ashi
+
+
+def _legacy_heikin_ashi(df):
+    ha = pd.DataFrame(
+        index=df.index,
+        columns=["ha_Open", "ha_High", "ha_Low", "ha_Close"],
+        dtype=float,
+    )
+    ha["ha_Close"] = (df["Open"] + df["High"] + df["Low"] + df["Close"]) / 4
+    for i in range(len(df)):
+        if i == 0:
+            ha.iat[0, 0] = df["Open"].iloc[0]
+        else:
+            ha.iat[i, 0] = (ha.iat[i - 1, 0] + ha.iat[i - 1, 3]) / 2
+    ha["ha_High"] = ha.loc[:, ["ha_Open", "ha_Close"]].join(df["High"]).max(axis=1)
+    ha["ha_Low"] = ha.loc[:, ["ha_Open", "ha_Close"]].join(df["Low"]).min(axis=1)
+    return ha
+
+
+def _ohlc(num_bars, seed):
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(size=num_bars))
+    open = np.roll(close, 1) + rng.normal(scale=0.1, size=num_bars)
+    spread = rng.exponential(size=(2, num_bars))
+    return pd.DataFrame(
+        {
+            "Open": open,
+            "High": np.maximum(open, close) + spread[0],
+            "Low": np.minimum(open, close) - spread[1],
+            "Close": close,
+        },
+        index=pd.date_range("2024-01-01", periods=num_bars, freq="min"),
+    )
+
+
+def test_heikin_ashi_matches_legacy():
+    df = _ohlc(500, 0)
+    df.iloc[10, 2] = np.nan
+    pd.testing.assert_frame_equal(heikin_ashi(df), _legacy_heikin_ashi(df))
+
+
+def test_heikin_ashi_many_symbols():
+    symbols = {symbol: _ohlc(200, seed) for seed, symbol in enumerate("ABC")}
+    expected = {symbol: heikin_ashi(df) for symbol, df in symbols.items()}
+
+    wide = heikin_ashi(pd.concat(symbols, axis=1).swaplevel(axis=1))
+    for symbol in symbols:
+        pd.testing.assert_frame_equal(
+            wide.xs(symbol, axis=1, level=1), expected[symbol], check_names=False
+        )
+
+    # Long frame with the symbols interleaved in time
+    long = pd.concat(symbols, names=["symbol", "date_time"]).sort_index(level=1)
+    grouped = heikin_ashi(long, by="symbol")
+    for symbol in symbols:
+        pd.testing.assert_frame_equal(
+            grouped.xs(symbol), expected[symbol], check_names=False
+        )
+
+
+@pytest.mark.parametrize("start", [0, 50])
+def test_heikin_ashi_update(start):
+    df = _ohlc(100, 1)
+    expected = heikin_ashi(df)
+    state = (
+        HeikinAshiState.from_frame(expected.iloc[:start])
+        if start
+        else HeikinAshiState()
+    )
+    for i in range(start, len(df)):
+        bar, state = state.update(df.iloc[i])
+        assert list(bar.values()) == expected.iloc[i].tolist()
+
+
+def test_heikin_ashi_update_carries_nan_like_batch():
+    df = _ohlc(30, 2)
+    df.iloc[10, 3] = np.nan
+    expected = heikin_ashi(df)
+    state = HeikinAshiState()
+    for i in range(len(df)):
+        bar, state = state.update(df.iloc[i])
+        np.testing.assert_array_equal(list(bar.values()), expected.iloc[i].to_numpy())
+    assert np.isnan(state.ha_open)
+
+    # Many symbols, the NaN bar of one of them does not reset the others
+    wide = pd.concat({"A": _ohlc(30, 3), "B": df}, axis=1).swaplevel(axis=1)
+    expected = heikin_ashi(wide)
+    state = HeikinAshiState()
+    for i in range(len(wide)):
+        bar, state = state.update(wide.iloc[i].unstack(0))
+        np.testing.assert_array_equal(bar["ha_Open"], expected["ha_Open"].iloc[i])
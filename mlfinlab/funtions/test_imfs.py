@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import pytest
+from mlfinlab.funtions.imfs import (
+    IMFCache,
+    decompose_imfs,
+    decompose_imfs_many,
+    rolling_decompose_imfs,
+)
+
+
+@pytest.mark.filterwarnings("ignore")
+@pytest.mark.parametrize("n_jobs, chunksize", [(1, 2), (2, 2), (2, 1)])
+def test_decompose_imfs_many(n_jobs, chunksize):
+    rng = np.random.default_rng(0)
+    block = np.cumsum(rng.normal(size=(5, 400)), axis=1)
+    block[4] = np.sin(np.arange(400) / 10)
+
+    imfs = decompose_imfs_many(block, num_imfs=4, n_jobs=n_jobs, chunksize=chunksize)
+    assert imfs.shape == (5, 400, 4)
+    np.testing.assert_allclose(imfs.sum(axis=2), block, atol=1e-10)
+    for k in range(5):
+        single = decompose_imfs(pd.Series(block[k]), max_imf=3).to_numpy()
+        np.testing.assert_array_equal(imfs[k, :, : single.shape[1]], single)
+        assert not imfs[k, :, single.shape[1] :].any()
+
+
+def test_decompose_imfs_many_series_list():
+    series = [pd.Series(np.arange(10.0)), pd.Series(np.ones(10))]
+    imfs = decompose_imfs_many(series, num_imfs=1, n_jobs=1)
+    np.testing.assert_array_equal(imfs[:, :, 0], np.vstack(series))
+    with pytest.raises(ValueError):
+        decompose_imfs_many([np.ones(3), np.ones(4)], num_imfs=2)
+
+
+@pytest.mark.filterwarnings("ignore")
+def test_rolling_decompose_imfs_cache(tmp_path, monkeypatch):
+    import emd
+
+    sift, calls = emd.sift.sift, []
+    monkeypatch.setattr(
+        emd.sift,
+        "sift",
+        lambda *args, **kwargs: calls.append(1) or sift(*args, **kwargs),
+    )
+    z = pd.Series(np.cumsum(np.random.default_rng(1).normal(size=300)))
+
+    expected = rolling_decompose_imfs(z, window=200, step=50)
+    assert list(expected) == [199, 249, 299]
+    assert len(calls) == 3
+
+    for _ in range(2):
+        cached = rolling_decompose_imfs(z, window=200, step=50, cache=tmp_path)
+        for end, imfs in expected.items():
+            pd.testing.assert_frame_equal(cached[end], imfs)
+    assert len(calls) == 6
+    assert len(list(tmp_path.glob("*.npy"))) == 3
+
+
+def test_imf_cache_evicts_least_recently_used(tmp_path):
+    imfs = np.zeros((100, 2))
+    cache = IMFCache(tmp_path, max_bytes=2 * (imfs.nbytes + 128) + 64)
+    keys = [cache.key(np.full(100, k), max_imf=-1) for k in range(3)]
+    cache.put(keys[0], imfs)
+    cache.put(keys[1], imfs)
+    assert cache.get(keys[0]) is not None
+    cache.put(keys[2], imfs)
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) is not None and cache.get(keys[2]) is not None
+    assert cache.nbytes <= cache.max_bytes
@@ -0,0 +1,128 @@
+import pickle
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.base import clone
+from mlfinlab.funtions.imos_transform import (
+    ImosStream,
+    ImosTransformer,
+    imos_transform,
+    rolling_norm,
+)
+
+
+def _legacy_imos_transform(s, H):
+    norm = s.rolling(H).apply(lambda x: np.linalg.norm(x, ord=2)).dropna()
+    normalized = s / norm
+    return normalized.rolling(H).sum(), norm
+
+
+@pytest.mark.parametrize("compensated", [True, False])
+def test_imos_transform_matches_legacy(compensated):
+    s = pd.Series(np.random.default_rng(0).normal(size=2000), name="x")
+    s.iloc[700] = np.nan
+    transformed, norm = imos_transform(s, H=64, compensated=compensated)
+    expected_transformed, expected_norm = _legacy_imos_transform(s, 64)
+    pd.testing.assert_series_equal(norm, expected_norm, rtol=1e-12)
+    pd.testing.assert_series_equal(transformed, expected_transformed, rtol=1e-10)
+
+
+def test_rolling_norm_frame():
+    df = pd.DataFrame(
+        np.random.default_rng(1).normal(size=(500, 3)), columns=list("abc")
+    )
+    norm = rolling_norm(df, H=32)
+    for column in df:
+        pd.testing.assert_series_equal(norm[column], rolling_norm(df[column], H=32))
+
+
+def test_rolling_norm_compensated_after_large_values():
+    # Small values after a burst of large ones, which an uncompensated running sum loses
+    large = np.random.default_rng(2).uniform(1e7, 1e8, size=10)
+    s = pd.Series(np.r_[large, np.full(100, 1e-3)])
+    norm = rolling_norm(s, H=10)
+    assert np.allclose(norm.iloc[20:], np.sqrt(10) * 1e-3, rtol=1e-6)
+
+
+def test_imos_stream_matches_batch():
+    df = pd.DataFrame(
+        np.random.default_rng(3).normal(size=(300, 2)), columns=list("ab")
+    )
+    df.iloc[100, 1] = np.nan
+    transformed, norm = imos_transform(df, H=16)
+    norm = norm.reindex(df.index)
+
+    stream = ImosStream(H=16)
+    first, first_norm = stream.extend(df.iloc[:50])
+    np.testing.assert_array_equal(first, transformed.iloc[:50])
+    np.testing.assert_array_equal(first_norm, norm.iloc[:50])
+    for i in range(50, len(df)):
+        value, value_norm = stream.update(df.iloc[i])
+        np.testing.assert_array_equal(value, transformed.iloc[i])
+        np.testing.assert_array_equal(value_norm, norm.iloc[i])
+
+    series = ImosStream(H=16)
+    values = [series.update(x)[0] for x in df["a"]]
+    np.testing.assert_array_equal(values, imos_transform(df["a"], H=16)[0])
+
+
+def test_imos_transformer():
+    df = pd.DataFrame(
+        np.random.default_rng(4).normal(size=(400, 2)),
+        columns=list("ab"),
+        index=pd.date_range("2024-01-01", periods=400, freq="min"),
+    )
+    transformer = ImosTransformer(H=16)
+    transformed = transformer.fit_transform(df)
+    pd.testing.assert_frame_equal(transformed, imos_transform(df, H=16)[0])
+    pd.testing.assert_frame_equal(transformer.transform(df), transformed)
+    pd.testing.assert_frame_equal(
+        transformer.inverse_transform(transformed), df, rtol=1e-9
+    )
+
+    # Rows not fitted get their own norms
+    new = df.iloc[200:].to_numpy()
+    np.testing.assert_array_equal(
+        transformer.transform(new), imos_transform(pd.DataFrame(new), H=16)[0]
+    )
+
+    partial = ImosTransformer(H=16)
+    for first in range(0, len(df), 70):
+        partial.partial_fit(df.iloc[first : first + 70])
+    np.testing.assert_array_equal(partial.norm_, transformer.norm_)
+    np.testing.assert_array_equal(partial.seed_rows_, transformer.seed_rows_)
+    np.testing.assert_array_equal(partial.seed_values_, transformer.seed_values_)
+
+    restored = pickle.loads(pickle.dumps(clone(transformer).fit(df)))
+    pd.testing.assert_frame_equal(restored.transform(df), transformed)
+
+
+def test_imos_transformer_inverse_after_nan_gaps():
+    values = np.random.default_rng(6).normal(size=(300, 2))
+    values[100, 0] = np.nan
+    values[180:200, 1] = 0.0
+    transformer = ImosTransformer(H=8)
+    transformed = transformer.fit_transform(values)
+    assert np.isnan(transformed[100:115, 0]).all()
+    np.testing.assert_allclose(
+        transformer.inverse_transform(transformed), values, rtol=1e-9, atol=1e-12
+    )
+
+    transformed[250, 1] = np.nan
+    with pytest.raises(ValueError):
+        transformer.inverse_transform(transformed)
+
+
+def test_imos_transformer_pickle_keeps_fitted_state():
+    values = np.random.default_rng(5).normal(size=(100, 2))
+    transformer = ImosTransformer(H=8).partial_fit(values[:60])
+    buffer = transformer._norm_buffer
+    pickle.dumps(transformer)
+    assert transformer._norm_buffer is buffer
+
+    with pytest.raises(ValueError):
+        transformer.transform(values[:, :1])
+    with pytest.raises(ValueError):
+        transformer.inverse_transform(values[:, :1])
+    with pytest.raises(ValueError):
+        transformer.partial_fit(values[60:, :1])
@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+import pytest
+from mlfinlab.funtions.llt import (
+    LocalLinearTrendFilter,
+    llt_transform,
+    llt_transform_many,
+)
+
+
+def _series(num_series, seed):
+    rng = np.random.default_rng(seed)
+    trend = np.cumsum(rng.normal(scale=0.05, size=(num_series, 200)), axis=1)
+    level = np.cumsum(trend + rng.normal(scale=0.5, size=trend.shape), axis=1)
+    return [pd.Series(y + rng.normal(size=y.shape)) for y in level]
+
+
+def test_llt_transform_reuses_params():
+    s = _series(1, 0)[0]
+    fitted = llt_transform(s, forecast=10)
+    assert fitted.params.shape == (3,)
+
+    reused = llt_transform(s, forecast=10, params=fitted.params)
+    np.testing.assert_allclose(reused.params, fitted.params)
+    pd.testing.assert_series_equal(reused.predicted_mean, fitted.predicted_mean)
+    pd.testing.assert_frame_equal(reused.forecast_conf, fitted.forecast_conf)
+
+    warm = llt_transform(s, forecast=10, start_params=fitted.params)
+    np.testing.assert_allclose(warm.params, fitted.params, rtol=1e-3)
+
+
+@pytest.mark.parametrize("n_jobs", [1, 2])
+def test_llt_transform_many(n_jobs):
+    series = dict(enumerate(_series(3, 1)))
+    fitted = llt_transform(series[0], forecast=5)
+    results = llt_transform_many(
+        series, params={1: fitted.params}, n_jobs=n_jobs, forecast=5
+    )
+    assert list(results) == [0, 1, 2]
+    np.testing.assert_allclose(results[0].params, fitted.params)
+    np.testing.assert_array_equal(results[1].params, fitted.params)
+    pd.testing.assert_series_equal(
+        results[2].predicted_mean, llt_transform(series[2], forecast=5).predicted_mean
+    )
+
+
+def test_llt_filter_matches_statsmodels():
+    s = _series(1, 2)[0]
+    params = llt_transform(s, forecast=10).params
+    s.iloc[50] = np.nan
+    result = llt_transform(s, forecast=10, params=params)
+
+    llt_filter = LocalLinearTrendFilter(result.params)
+    updates = np.array([llt_filter.update(y) for y in s])
+    np.testing.assert_allclose(updates[:, 0], result.predicted_mean, atol=1e-6)
+    np.testing.assert_allclose(updates[:, 1:], result.predicted_conf, atol=1e-6)
+
+    forecast = np.column_stack(LocalLinearTrendFilter.from_result(result).forecast(10))
+    np.testing.assert_allclose(forecast[:, 0], result.forecast_mean, atol=1e-6)
+    np.testing.assert_allclose(forecast[:, 1:], result.forecast_conf, atol=1e-6)
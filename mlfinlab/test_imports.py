@@ -0,0 +1,58 @@
+import json
+import os
+import pathlib
+import subprocess
+import sys
+import pytest
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+
+# Imported on first use only, as they take up to a second and ~100MB each
+LAZY = ("emd", "matplotlib", "pyarrow", "sklearn", "statsmodels")
+
+# Peak RSS added by importing a submodule, numba and pandas take about 200MB
+MAX_RSS_MB = 300
+
+SUBMODULES = sorted(
+    ".".join(path.relative_to(ROOT).with_suffix("").parts)
+    for path in (ROOT / "mlfinlab").rglob("*.py")
+    if not path.name.startswith("test_")
+)
+
+_MEASURE = """
+import importlib, json, resource, sys, time
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+rss = peak_rss_mb()
+start = time.perf_counter()
+importlib.import_module(sys.argv[1])
+print(json.dumps({
+    "seconds": time.perf_counter() - start,
+    "rss_mb": peak_rss_mb() - rss,
+    "packages": sorted({name.split(".")[0] for name in sys.modules}),
+}))
+"""
+
+
+def _measure_import(module):
+    env = dict(os.environ, PYTHONPATH=str(ROOT))
+    output = subprocess.run(
+        [sys.executable, "-c", _MEASURE, module],
+        env=env,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return json.loads(output)
+
+
+@pytest.mark.parametrize("module", SUBMODULES)
+def test_import_cost(module, record_property):
+    cost = _measure_import(module)
+    record_property("import_seconds", cost["seconds"])
+    record_property("import_rss_mb", cost["rss_mb"])
+    assert not set(LAZY) & set(cost["packages"])
+    assert cost["rss_mb"] < MAX_RSS_MB
@@ -0,0 +1,84 @@
+"""
+Process pools and shared memory arrays of the functions which spread their work across processes.
+
+The parent copies its inputs once into SharedArrays and passes the workers their layout and block names, so no
+large array is pickled on the way in; workers attach to the same blocks and write their outputs in place.
+"""
+
+# Imports
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+import numpy as np
+
+
+def process_pool(n_jobs):
+    """
+    :param n_jobs: Number of processes.
+    :return: ProcessPoolExecutor of spawned processes. Forked workers could inherit the locks of numba's threading
+             layer held by another thread.
+    """
+    context = multiprocessing.get_context("spawn")
+    return ProcessPoolExecutor(n_jobs, mp_context=context)
+
+
+class SharedArrays:
+    """
+    Named np.ndarray views on SharedMemory blocks, one block per array.
+
+    The parent creates the blocks from a layout and passes ``layout`` and ``names`` to the workers, which attach to
+    them with SharedArrays(layout, names). Used as a context manager, the blocks are closed on exit and unlinked by
+    the process which created them. The views are only handed out by indexing, e.g. ``shared["price"][rows]``, so
+    that no view outlives the blocks.
+    """
+
+    def __init__(self, layout, names=None):
+        """
+        :param layout: Dict of name to the (shape, dtype) of each array.
+        :param names: Dict of name to the name of the SharedMemory block to attach to, None to create the blocks.
+        """
+        self.layout = layout
+        self._owner = names is None
+        self._arrays, self._blocks = {}, {}
+        try:
+            for name, (shape, dtype) in layout.items():
+                if self._owner:
+                    size = int(np.prod(shape)) * np.dtype(dtype).itemsize
+                    self._blocks[name] = SharedMemory(create=True, size=max(size, 1))
+                else:
+                    self._blocks[name] = SharedMemory(name=names[name])
+        except BaseException:
+            self.close()
+            raise
+        self._arrays = {
+            name: np.ndarray(shape, dtype=dtype, buffer=self._blocks[name].buf)
+            for name, (shape, dtype) in layout.items()
+        }
+
+    @property
+    def names(self):
+        """
+        :return: Dict of name to the name of its SharedMemory block, to attach to it from a worker.
+        """
+        return {name: block.name for name, block in self._blocks.items()}
+
+    def __getitem__(self, name):
+        return self._arrays[name]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """
+        Closes the blocks, and unlinks them if they were created here.
+        """
+        # The views must be released before the blocks are closed
+        self._arrays = {}
+        for block in self._blocks.values():
+            block.close()
+            if self._owner:
+                block.unlink()
+        self._blocks = {}
@@ -0,0 +1,18 @@
+import numpy as np
+import pytest
+from mlfinlab.util.multiprocess import SharedArrays
+
+
+def test_shared_arrays_attach_and_unlink():
+    layout = {"price": ((3, 2), np.float64), "date_time": (4, np.int64)}
+    with SharedArrays(layout) as shared:
+        shared["price"][:] = np.arange(6.0).reshape(3, 2)
+        with SharedArrays(layout, shared.names) as attached:
+            np.testing.assert_array_equal(attached["price"], shared["price"])
+            attached["date_time"][:] = 7
+        assert (shared["date_time"] == 7).all()
+        names = shared.names
+
+    # Only the process which created the blocks unlinks them
+    with pytest.raises(FileNotFoundError):
+        SharedArrays(layout, names)